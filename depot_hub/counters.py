@@ -0,0 +1,188 @@
+"""Write-coalescing counters for hot paths (video views, document downloads).
+
+Increments collect in process memory and reach the counted rows in two steps.
+Every ``COUNTER_SPILL_SECONDS``, or sooner once ``COUNTER_MAX_PENDING`` rows
+are waiting, a process spills its buffer into the shared ``CounterIncrement``
+journal with one INSERT. Every ``COUNTER_FLUSH_SECONDS`` the journal, which
+holds every process's increments, is folded into the rows: one ``F()`` UPDATE
+per model and field, in the same transaction that deletes the journal rows.
+With ``COUNTER_FLUSH_SECONDS = 0`` every increment is written straight through.
+
+Only increments still in memory can be lost. If a process is killed before its
+exit handler runs (SIGKILL, OOM, a worker recycle), at most its last
+``COUNTER_SPILL_SECONDS`` of increments go. Spilled increments are folded by
+whichever process flushes next. Readers add ``pending()`` to the stored
+count, so other processes see an increment once it is spilled.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import CounterIncrement
+
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE; keeps the CASE expression a reasonable size
+FLUSH_BATCH_SIZE = 500
+# Journal rows folded per transaction
+FOLD_BATCH_SIZE = 5000
+
+_pending = defaultdict(Counter)
+_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+
+
+def increment(model, pk, field, amount=1):
+    """Add ``amount`` to ``model.field`` of row ``pk``, eventually"""
+    increment_many(model, [pk], field, amount)
+
+
+def increment_many(model, pks, field, amount=1):
+    """Add ``amount`` to ``model.field`` of every row in ``pks``.
+
+    Written straight through as a single UPDATE when coalescing is off.
+    """
+    if settings.COUNTER_FLUSH_SECONDS <= 0:
+        model.objects.filter(pk__in=list(pks)).update(**{field: F(field) + amount})
+        return
+    with _lock:
+        counts = _pending[(model, field)]
+        for pk in pks:
+            counts[pk] += amount
+        full = len(counts) >= settings.COUNTER_MAX_PENDING
+    _start_flusher()
+    if full:
+        _wake.set()
+
+
+def pending(model, pk, field):
+    """Increments of ``pk`` not yet folded into its row.
+
+    Sums this process's buffer and every process's journaled increments, so
+    the total a reader sees never drops back when a spill moves increments
+    out of memory.
+    """
+    with _lock:
+        counts = _pending.get((model, field))
+        buffered = counts[pk] if counts else 0
+    if settings.COUNTER_FLUSH_SECONDS <= 0:
+        # Written straight through; nothing is journaled
+        return buffered
+    journaled = CounterIncrement.objects.filter(
+        model=model._meta.label_lower, field=field, object_id=pk
+    ).aggregate(total=Sum('amount'))['total']
+    return buffered + (journaled or 0)
+
+
+def spill():
+    """Move this process's buffered increments into the journal; returns the rows written"""
+    with _lock:
+        batches = dict(_pending)
+        _pending.clear()
+
+    rows = [
+        CounterIncrement(model=model._meta.label_lower, field=field, object_id=pk, amount=amount)
+        for (model, field), counts in batches.items()
+        for pk, amount in counts.items() if amount
+    ]
+    if not rows:
+        return 0
+    try:
+        CounterIncrement.objects.bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+    except Exception:
+        logger.exception('Spilling counters failed; will retry')
+        with _lock:
+            for key, counts in batches.items():
+                _pending[key].update(counts)
+        return 0
+    return len(rows)
+
+
+def fold():
+    """Add every process's journaled increments to their rows; returns the increments added"""
+    written = 0
+    while True:
+        with transaction.atomic():
+            # Concurrent folds take disjoint rows
+            rows = list(
+                CounterIncrement.objects.select_for_update(skip_locked=True)
+                .values_list('id', 'model', 'field', 'object_id', 'amount')[:FOLD_BATCH_SIZE]
+            )
+            if not rows:
+                return written
+            batches = defaultdict(Counter)
+            for _, label, field, pk, amount in rows:
+                batches[(label, field)][pk] += amount
+            for (label, field), counts in batches.items():
+                items = list(counts.items())
+                for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                    _write(apps.get_model(label), field, dict(items[start:start + FLUSH_BATCH_SIZE]))
+            CounterIncrement.objects.filter(id__in=[row[0] for row in rows]).delete()
+        written += sum(row[4] for row in rows)
+
+
+def flush():
+    """Spill this process's increments and fold the journal; returns the increments added"""
+    spill()
+    return fold()
+
+
+def _write(model, field, counts):
+    amounts = set(counts.values())
+    if len(amounts) == 1:
+        delta = Value(amounts.pop())
+    else:
+        delta = Case(
+            *[When(pk=pk, then=Value(amount)) for pk, amount in counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    model.objects.filter(pk__in=list(counts)).update(**{field: F(field) + delta})
+
+
+def _flush_loop():
+    next_fold = time.monotonic() + settings.COUNTER_FLUSH_SECONDS
+    while True:
+        _wake.wait(min(settings.COUNTER_SPILL_SECONDS, settings.COUNTER_FLUSH_SECONDS))
+        _wake.clear()
+        try:
+            spill()
+            if time.monotonic() >= next_fold:
+                next_fold = time.monotonic() + settings.COUNTER_FLUSH_SECONDS
+                fold()
+        except Exception:
+            logger.exception('Folding counters failed; will retry')
+        finally:
+            connection.close()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name='depot-hub-counters', daemon=True)
+            _flusher.start()
+
+
+def _reset_after_fork():
+    # A forked worker must not write its parent's increments a second time
+    global _lock, _flusher
+    _pending.clear()
+    _lock = threading.Lock()
+    _flusher = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+# The journal is durable, so exiting only needs to spill
+atexit.register(spill)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterIncrement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='app_label.model_name of the counted row', max_length=100)),
+                ('field', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('amount', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'depot_hub_counterincrement',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['model', 'field', 'object_id'], name='counterincrement_target_idx')],
+            },
+        ),
+    ]
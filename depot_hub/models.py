@@ -0,0 +1,25 @@
+from django.db import models
+
+
+class CounterIncrement(models.Model):
+    """Counter increments spilled by one process, not yet added to their rows.
+
+    Any process folds these into the counter columns (see ``depot_hub.counters``).
+    """
+
+    model = models.CharField(max_length=100, help_text='app_label.model_name of the counted row')
+    field = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    amount = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'depot_hub_counterincrement'
+        ordering = ['id']
+        indexes = [
+            # Unfolded increments of one row, added to the totals readers see
+            models.Index(fields=['model', 'field', 'object_id'], name='counterincrement_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}.{self.field} #{self.object_id} +{self.amount}"
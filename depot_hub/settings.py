@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'drf_spectacular',
+    'depot_hub',
     'staff',
     'documents',
     'news',
@@ -239,4 +240,58 @@ GOOGLE_CLIENT_SECRET = config('GOOGLE_CLIENT_SECRET', default='')
 
 # YouTube API
 YOUTUBE_API_KEY = config('YOUTUBE_API_KEY', default='')
-YOUTUBE_CHANNEL_ID = config('CHANNEL_ID', default='')
\ No newline at end of file
+YOUTUBE_CHANNEL_ID = config('CHANNEL_ID', default='')
+
+# Depot auto-checkout: visitors still checked in this many hours after
+# checking in are treated as forgotten check-outs
+DEPOT_AUTO_CHECKOUT_HOURS = config('DEPOT_AUTO_CHECKOUT_HOURS', default=12, cast=int)
+
+# Document downloads: '' streams from Django; 'x-accel-redirect' (nginx) or
+# 'x-sendfile' (Apache/lighttpd) lets the front proxy send the file instead.
+# With X-Accel-Redirect, DOCUMENT_SENDFILE_PREFIX must be an internal
+# location that maps to MEDIA_ROOT.
+DOCUMENT_SENDFILE = config('DOCUMENT_SENDFILE', default='')
+DOCUMENT_SENDFILE_PREFIX = config('DOCUMENT_SENDFILE_PREFIX', default='/protected-media/')
+
+# Chunked document uploads: partial files live here until completed
+DOCUMENT_UPLOAD_TEMP_DIR = config('DOCUMENT_UPLOAD_TEMP_DIR', default=str(BASE_DIR / 'tmp' / 'uploads'))
+DOCUMENT_UPLOAD_MAX_SIZE = config('DOCUMENT_UPLOAD_MAX_SIZE', default=4 * 1024 ** 3, cast=int)
+DOCUMENT_UPLOAD_EXPIRY_HOURS = config('DOCUMENT_UPLOAD_EXPIRY_HOURS', default=48, cast=int)
+
+# Store document files once per distinct content, under blobs/<sha256>
+DOCUMENT_CONTENT_ADDRESSED = config('DOCUMENT_CONTENT_ADDRESSED', default=True, cast=bool)
+
+# In-process background jobs (depot_hub.tasks)
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=2, cast=int)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+# Processes for CPU-bound image rendering
+RENDER_WORKERS = config('RENDER_WORKERS', default=2, cast=int)
+
+# Longest extracted text kept per document for full-text search
+DOCUMENT_TEXT_MAX_CHARS = config('DOCUMENT_TEXT_MAX_CHARS', default=2_000_000, cast=int)
+
+# Document thumbnails/previews: JPEG widths in pixels
+DOCUMENT_THUMBNAIL_WIDTH = config('DOCUMENT_THUMBNAIL_WIDTH', default=240, cast=int)
+DOCUMENT_PREVIEW_WIDTH = config('DOCUMENT_PREVIEW_WIDTH', default=800, cast=int)
+
+# Most documents one ZIP bundle download may contain
+DOCUMENT_BUNDLE_MAX_FILES = config('DOCUMENT_BUNDLE_MAX_FILES', default=200, cast=int)
+
+# Keep a precompressed download variant only if it is at most this
+# fraction of the original size
+DOCUMENT_VARIANT_MAX_RATIO = config('DOCUMENT_VARIANT_MAX_RATIO', default=0.9, cast=float)
+
+# Widths (px) of the WebP/JPEG copies made of each video thumbnail
+VIDEO_THUMBNAIL_WIDTHS = [int(width) for width in config('VIDEO_THUMBNAIL_WIDTHS', default='320,640,1280').split(',')]
+
+# Write-coalescing counters (depot_hub.counters): seconds between batched
+# writes to the counted rows (0 writes every increment at once), seconds an
+# increment may stay in process memory before it is spilled to the shared
+# journal table (the most a killed process can lose), and the number of
+# pending rows that triggers an early spill
+COUNTER_FLUSH_SECONDS = config('COUNTER_FLUSH_SECONDS', default=5, cast=float)
+COUNTER_SPILL_SECONDS = config('COUNTER_SPILL_SECONDS', default=1, cast=float)
+COUNTER_MAX_PENDING = config('COUNTER_MAX_PENDING', default=10_000, cast=int)
+
+# Most YouTube API requests in flight at once during a channel sync
+YOUTUBE_MAX_CONCURRENT_REQUESTS = config('YOUTUBE_MAX_CONCURRENT_REQUESTS', default=4, cast=int)
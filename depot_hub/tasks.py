@@ -0,0 +1,85 @@
+"""A small in-process pool for work that should not hold up a request.
+
+Jobs are handed over only once the surrounding transaction commits, so they
+always see the rows the request wrote. Each job closes its own database
+connection when it finishes. Jobs are lost if the process exits first, so
+anything they produce must also be rebuildable by a management command.
+
+CPU-bound steps (image rendering) go on to a separate process pool. Functions
+sent there must live in modules that do not import Django models.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_process_pool = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='depot-hub-task'
+            )
+        return _executor
+
+
+def get_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # spawn, not fork: the web process has threads and open connections
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_pool
+
+
+def completed_in_processes(func, jobs):
+    """Run ``func(*args)`` on the process pool for each ``(key, args)`` in ``jobs``.
+
+    Yields ``(key, future)`` as results finish. ``jobs`` is consumed lazily,
+    with at most two jobs per worker in flight, so queued arguments stay
+    bounded.
+    """
+    pool = get_process_pool()
+    limit = settings.RENDER_WORKERS * 2
+    pending = {}
+    for key, args in jobs:
+        pending[pool.submit(func, *args)] = key
+        if len(pending) >= limit:
+            for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                yield pending.pop(future), future
+    while pending:
+        for future in wait(pending, return_when=FIRST_COMPLETED).done:
+            yield pending.pop(future), future
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__name__', func))
+    finally:
+        connection.close()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the pool after the current transaction commits.
+
+    With ``BACKGROUND_TASKS_EAGER`` the job runs inline instead, which helps
+    in tests and one-off scripts.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run, func, args, kwargs))
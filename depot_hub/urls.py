@@ -20,7 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from videos.views import youtube_list
-from staff.views import depot_checkin, depot_checkout, depot_recheckin
+from staff.views import depot_checkin, depot_checkin_batch, depot_checkout, depot_recheckin, depot_occupancy, depot_analytics, depot_rollcall, depot_visitor_autocomplete, depot_checkin_history, depot_visitor_timeline, depot_event_stream
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,8 +33,16 @@ urlpatterns = [
     path('api/youtube/list/', youtube_list, name='youtube-list'),
     # Depot specific endpoints
     path('api/depot/checkin/', depot_checkin, name='depot-checkin'),
+    path('api/depot/checkin/batch/', depot_checkin_batch, name='depot-checkin-batch'),
     path('api/depot/checkin/<int:record_id>/checkout/', depot_checkout, name='depot-checkout'),
     path('api/depot/checkin/<int:record_id>/checkin/', depot_recheckin, name='depot-recheckin'),
+    path('api/depot/checkin/<int:record_id>/history/', depot_checkin_history, name='depot-checkin-history'),
+    path('api/depot/occupancy/', depot_occupancy, name='depot-occupancy'),
+    path('api/depot/analytics/', depot_analytics, name='depot-analytics'),
+    path('api/depot/rollcall/', depot_rollcall, name='depot-rollcall'),
+    path('api/depot/visitors/autocomplete/', depot_visitor_autocomplete, name='depot-visitor-autocomplete'),
+    path('api/depot/visitors/<int:visitor_id>/timeline/', depot_visitor_timeline, name='depot-visitor-timeline'),
+    path('api/depot/events/', depot_event_stream, name='depot-events'),
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -0,0 +1,95 @@
+import logging
+import os
+import zipfile
+
+from django.utils import timezone
+
+from .downloads import STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Already-compressed formats gain nothing from compression; they are
+# deflated at level 0, which only wraps the bytes in stored blocks
+STORED_EXTENSIONS = {
+    '.7z', '.docx', '.gif', '.gz', '.jpeg', '.jpg', '.mp4', '.pdf', '.png', '.pptx', '.webp', '.xlsx', '.zip',
+}
+
+
+class _ChunkWriter:
+    """Write-only, unseekable sink that hands written bytes back in pieces.
+
+    zipfile notices it cannot seek and writes data descriptors after each
+    member instead of going back to patch headers. Streaming readers can
+    only find the end of such a member when its data is self-delimiting,
+    so every member is deflated; a ZIP_STORED one would be unreadable.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_names(documents):
+    """Unique file names inside the archive, in document order"""
+    seen = set()
+    names = []
+    for document in documents:
+        name = document.filename or os.path.basename(document.file.name)
+        stem, extension = os.path.splitext(name)
+        candidate, number = name, 2
+        while candidate.lower() in seen:
+            candidate = f'{stem} ({number}){extension}'
+            number += 1
+        seen.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+
+def stream_zip(documents):
+    """Yield a ZIP archive of ``documents``' files as it is built.
+
+    Only one read chunk (plus its compressed form) is held at a time; the
+    archive is never assembled in memory or on disk. A file that vanished
+    after the request was validated is left out.
+    """
+    return (chunk for chunk in _zip_chunks(documents) if chunk)
+
+
+def _zip_chunks(documents):
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w') as archive:
+        for document, name in zip(documents, archive_names(documents)):
+            info = zipfile.ZipInfo(name, date_time=timezone.localtime(document.updated_at).timetuple()[:6])
+            extension = os.path.splitext(name)[1].lower()
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # ZipFile.open() has no per-member level argument
+            info._compresslevel = 0 if extension in STORED_EXTENSIONS else None
+            info.file_size = document.file_size
+            try:
+                source = document.file.storage.open(document.file.name, 'rb')
+            except OSError:
+                logger.warning('Skipping missing file for document %s in ZIP bundle', document.pk)
+                continue
+            with source, archive.open(info, 'w', force_zip64=document.file_size >= zipfile.ZIP64_LIMIT) as member:
+                for piece in iter(lambda: source.read(STREAM_CHUNK_SIZE), b''):
+                    member.write(piece)
+                    yield writer.take()
+            yield writer.take()
+    # The central directory is written on close
+    yield writer.take()
@@ -0,0 +1,142 @@
+"""Precompressed gzip/Brotli copies of compressible documents.
+
+Compression happens once, in the background after upload. Downloads then
+pick a stored variant by ``Accept-Encoding`` instead of compressing on every
+request. Variant files are named by the source file's hash, so documents
+with identical bytes share them.
+"""
+import gzip
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from depot_hub.tasks import run_in_background
+
+from .downloads import STREAM_CHUNK_SIZE
+from .models import Document, DocumentVariant
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+VARIANT_PREFIX = 'variants'
+# Text and legacy binary Office formats. DOCX/XLSX/PPTX are ZIP containers
+# and rarely shrink, but they are tried too: only worthwhile results are kept.
+COMPRESSIBLE_EXTENSIONS = {
+    '.csv', '.doc', '.docx', '.htm', '.html', '.json', '.log', '.md', '.ppt', '.pptx', '.rtf', '.svg',
+    '.txt', '.xls', '.xlsx', '.xml',
+}
+SUFFIXES = {DocumentVariant.GZIP: 'gz', DocumentVariant.BROTLI: 'br'}
+
+
+def variant_path(sha256, encoding):
+    return f'{VARIANT_PREFIX}/{sha256[:2]}/{sha256}.{SUFFIXES[encoding]}'
+
+
+def is_compressible(filename):
+    return os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def available_encodings():
+    return [DocumentVariant.BROTLI, DocumentVariant.GZIP] if brotli else [DocumentVariant.GZIP]
+
+
+def _compress(source, target, encoding):
+    if encoding == DocumentVariant.GZIP:
+        # mtime=0 keeps the output identical for identical input
+        with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=9, mtime=0) as packed:
+            for piece in iter(lambda: source.read(STREAM_CHUNK_SIZE), b''):
+                packed.write(piece)
+    else:
+        compressor = brotli.Compressor(quality=11)
+        for piece in iter(lambda: source.read(STREAM_CHUNK_SIZE), b''):
+            target.write(compressor.process(piece))
+        target.write(compressor.finish())
+
+
+def compress_document(document_id):
+    """Store the variants worth keeping for a document's current file"""
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None or not document.sha256 or not is_compressible(document.filename or document.file.name):
+        return
+    limit = document.file_size * settings.DOCUMENT_VARIANT_MAX_RATIO
+
+    for encoding in available_encodings():
+        if DocumentVariant.objects.filter(document=document, encoding=encoding, sha256=document.sha256).exists():
+            continue
+        path = variant_path(document.sha256, encoding)
+        if not default_storage.exists(path):
+            with document.file.storage.open(document.file.name, 'rb') as source, tempfile.TemporaryFile() as target:
+                _compress(source, target, encoding)
+                if target.tell() > limit:
+                    continue
+                target.seek(0)
+                path = default_storage.save(path, File(target))
+        size = default_storage.size(path)
+        if size > limit:
+            continue
+        with transaction.atomic():
+            # Skip if the file was replaced or the document deleted meanwhile
+            if Document.objects.filter(pk=document.pk, sha256=document.sha256).exists():
+                DocumentVariant.objects.update_or_create(
+                    document=document, encoding=encoding,
+                    defaults={'sha256': document.sha256, 'file': path, 'size': size},
+                )
+
+
+def queue_compression(document):
+    """Drop the document's variants and compress its file once the transaction commits"""
+    DocumentVariant.objects.filter(document=document).delete()
+    if is_compressible(document.filename or document.file.name):
+        run_in_background(compress_document, document.pk)
+
+
+def accepted_encodings(header):
+    """Content codings with a non-zero q-value in ``Accept-Encoding``"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def pick_variant(document, header):
+    """The smallest stored variant of the current file the client accepts, or None"""
+    accepted = accepted_encodings(header)
+    if not accepted:
+        return None
+    variants = [
+        variant for variant in document.variants.all()
+        if variant.sha256 == document.sha256 and (variant.encoding in accepted or '*' in accepted)
+    ]
+    return min(variants, key=lambda variant: variant.size, default=None)
+
+
+def collect_variants(dry_run=False):
+    """Delete variant files whose hash no document has any more; returns the count"""
+    live = set(Document.objects.exclude(sha256='').values_list('sha256', flat=True))
+    removed = 0
+    if not default_storage.exists(VARIANT_PREFIX):
+        return removed
+    for shard in default_storage.listdir(VARIANT_PREFIX)[0]:
+        for name in default_storage.listdir(f'{VARIANT_PREFIX}/{shard}')[1]:
+            if name.split('.', 1)[0] in live:
+                continue
+            if not dry_run:
+                default_storage.delete(f'{VARIANT_PREFIX}/{shard}/{name}')
+            removed += 1
+    return removed
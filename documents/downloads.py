@@ -0,0 +1,158 @@
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(document):
+    """Strong ETag for the stored bytes: changes whenever the file is replaced"""
+    if document.sha256:
+        return f'"{document.sha256}"'
+    storage = document.file.storage
+    try:
+        modified = storage.get_modified_time(document.file.name).timestamp()
+    except (NotImplementedError, OSError):
+        modified = document.updated_at.timestamp()
+    fingerprint = f"{document.file.name}:{document.file_size}:{modified}"
+    return f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+
+
+def etag_matches(header, etag):
+    """``If-None-Match`` check; weak comparison, as RFC 9110 asks for GET"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in candidates
+
+
+def parse_range(header, size):
+    """Parse a single-range ``Range`` header against a file of ``size`` bytes.
+
+    Returns ``(start, end)`` inclusive, ``None`` when the header should be
+    ignored (absent, malformed or multi-range: the whole file is served), or
+    raises ``ValueError`` when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def _read_range(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _offload(stored, response):
+    """Hand the byte copying to the front proxy, if configured"""
+    mode = settings.DOCUMENT_SENDFILE
+    if mode == 'x-accel-redirect':
+        # nginx decodes the URI; a raw space, '%', '?' or non-ASCII name would
+        # break the internal redirect or point it elsewhere
+        response['X-Accel-Redirect'] = settings.DOCUMENT_SENDFILE_PREFIX.rstrip('/') + '/' + quote(stored.name)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = stored.path
+    return response
+
+
+def document_file_response(request, document, variant=None):
+    """Serve a document's file without reading it into memory.
+
+    Answers ``If-None-Match`` with 304 and a single-range ``Range`` (honouring
+    ``If-Range``) with 206. With ``DOCUMENT_SENDFILE`` set, the body is left to
+    the proxy via ``X-Accel-Redirect``/``X-Sendfile``. A precompressed
+    ``variant`` is sent as-is with ``Content-Encoding``; ranges and offloaded
+    downloads always come from the original bytes. Raises ``OSError`` when the file is missing.
+    Returns ``(response, counts_as_download)``.
+    """
+    # The proxy keeps only a few of our headers across an internal redirect
+    # (nginx drops Content-Encoding), so offloaded variants would arrive
+    # compressed but unlabelled
+    if variant is not None and (request.headers.get('Range') or settings.DOCUMENT_SENDFILE):
+        variant = None
+    stored = variant.file if variant is not None else document.file
+    etag = f'"{variant.sha256}-{variant.encoding}"' if variant is not None else file_etag(document)
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response, False
+
+    # Content-addressed files are named by hash; send the uploaded name
+    filename = document.filename or os.path.basename(document.file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition_header(True, filename),
+        'Vary': 'Accept-Encoding',
+    }
+    if variant is not None:
+        headers['Content-Encoding'] = variant.encoding
+
+    if settings.DOCUMENT_SENDFILE:
+        if not stored.storage.exists(stored.name):
+            raise FileNotFoundError(stored.name)
+        response = HttpResponse(content_type=content_type, headers=headers)
+        requested = RANGE_RE.match(request.headers.get('Range', '').strip())
+        return _offload(stored, response), not requested or requested.group(1) == '0'
+
+    handle = stored.storage.open(stored.name, 'rb')
+    size = stored.storage.size(stored.name)
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            handle.close()
+            response = HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}', 'ETag': etag})
+            return response, False
+
+    start, end = byte_range or (0, size - 1)
+    length = max(end - start + 1, 0)
+    response = StreamingHttpResponse(
+        _read_range(handle, start, length),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+        headers=headers,
+    )
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    # Resumed transfers are the same download; count only the first request
+    return response, start == 0
@@ -0,0 +1,148 @@
+import logging
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import transaction
+from depot_hub.tasks import run_in_background
+
+from .models import Document, DocumentText
+
+try:
+    import pypdf
+except ImportError:  # PDF text extraction is optional
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+# Office Open XML parts that hold the visible text, and the element holding it
+OFFICE_PARTS = {
+    '.docx': (re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$'), 't'),
+    '.pptx': (re.compile(r'^ppt/(slides/slide|notesSlides/notesSlide)\d+\.xml$'), 't'),
+    '.xlsx': (re.compile(r'^xl/sharedStrings\.xml$'), 't'),
+}
+# Block-level elements whose end separates words
+OFFICE_BREAKS = {'p', 'br', 'tab', 'si', 'tr'}
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _office_text(handle, extension, limit):
+    pattern, text_tag = OFFICE_PARTS[extension]
+    pieces = []
+    size = 0
+    with zipfile.ZipFile(handle) as archive:
+        names = sorted(
+            (name for name in archive.namelist() if pattern.match(name)),
+            key=lambda name: [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)],
+        )
+        for name in names:
+            with archive.open(name) as part:
+                # iterparse keeps memory flat on large workbooks
+                for event, element in ElementTree.iterparse(part, events=('end',)):
+                    tag = _local(element.tag)
+                    if tag == text_tag and element.text:
+                        pieces.append(element.text)
+                        size += len(element.text)
+                    elif tag in OFFICE_BREAKS:
+                        pieces.append('\n' if tag in ('p', 'tr', 'si') else ' ')
+                    element.clear()
+                    if size >= limit:
+                        return ''.join(pieces)
+            pieces.append('\n')
+    return ''.join(pieces)
+
+
+def _pdf_text(handle, limit):
+    if pypdf is None:
+        raise UnsupportedFormat('PDF extraction needs the pypdf package')
+    reader = pypdf.PdfReader(handle)
+    pieces = []
+    size = 0
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        pieces.append(text)
+        size += len(text)
+        if size >= limit:
+            break
+    return '\n'.join(pieces)
+
+
+def _plain_text(handle, limit):
+    raw = handle.read(limit * 4)
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def extract_text(handle, filename, limit):
+    """Return up to about ``limit`` characters of text from an open binary file"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in OFFICE_PARTS:
+        text = _office_text(handle, extension, limit)
+    elif extension == '.pdf':
+        text = _pdf_text(handle, limit)
+    elif extension in ('.txt', '.csv', '.md', '.log'):
+        text = _plain_text(handle, limit)
+    else:
+        raise UnsupportedFormat(f"No text extractor for '{extension or filename}' files")
+    # NUL bytes are not allowed in PostgreSQL text columns
+    return re.sub(r'[ \t\r\f\v]+', ' ', text.replace('\x00', '')).strip()[:limit]
+
+
+def index_document(document_id):
+    """Extract a document's text into DocumentText; safe to re-run"""
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None:
+        return
+
+    # Identical bytes were already extracted for another document
+    if document.sha256:
+        twin = (
+            DocumentText.objects.filter(document__sha256=document.sha256, status=DocumentText.DONE)
+            .exclude(document_id=document_id)
+            .values_list('content', flat=True)
+            .first()
+        )
+        if twin is not None:
+            _save_text(document_id, DocumentText.DONE, content=twin)
+            return
+
+    filename = document.filename or document.file.name
+    try:
+        with document.file.storage.open(document.file.name, 'rb') as handle:
+            content = extract_text(handle, filename, settings.DOCUMENT_TEXT_MAX_CHARS)
+    except UnsupportedFormat as e:
+        _save_text(document_id, DocumentText.UNSUPPORTED, error=str(e))
+    except Exception as e:
+        logger.warning('Text extraction failed for document %s: %s', document_id, e)
+        _save_text(document_id, DocumentText.FAILED, error=str(e))
+    else:
+        _save_text(document_id, DocumentText.DONE, content=content)
+
+
+def _save_text(document_id, status, content='', error=''):
+    with transaction.atomic():
+        # The document may have been deleted while we were reading it
+        if Document.objects.filter(pk=document_id).exists():
+            DocumentText.objects.update_or_create(
+                document_id=document_id,
+                defaults={'status': status, 'content': content, 'error': error},
+            )
+
+
+def queue_indexing(document):
+    """Mark ``document`` pending and extract its text once the transaction commits"""
+    DocumentText.objects.update_or_create(
+        document=document, defaults={'status': DocumentText.PENDING, 'content': '', 'error': ''}
+    )
+    run_in_background(index_document, document.pk)
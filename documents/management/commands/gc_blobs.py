@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from documents.compression import collect_variants
+from documents.previews import collect_previews
+from documents.storage import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed document blobs, previews and compressed variants that no document references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        # Deletes outside the API (admin, shell) do not release references
+        fixed = recount_references()
+        if fixed:
+            self.stdout.write(f"Corrected reference counts on {fixed} blob(s)")
+
+        blobs, files = collect_garbage(dry_run=options['dry_run'])
+        previews = collect_previews(dry_run=options['dry_run'])
+        variants = collect_variants(dry_run=options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {verb} {blobs} unreferenced blob(s), {files} stray file(s), "
+                f"{previews} stale preview set(s) and {variants} compressed variant(s)"
+            )
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from documents.extraction import index_document
+from documents.models import Document, DocumentText
+
+
+class Command(BaseCommand):
+    help = 'Extract document text into the full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-extract every document, not only unindexed, pending or failed ones',
+        )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.all()
+        if not options['all']:
+            # Pending rows are jobs lost to a restart
+            documents = documents.filter(
+                Q(text__isnull=True) | Q(text__status__in=[DocumentText.PENDING, DocumentText.FAILED])
+            )
+
+        counts = {}
+        for document_id in documents.order_by('id').values_list('id', flat=True).iterator():
+            index_document(document_id)
+            status = DocumentText.objects.filter(document_id=document_id).values_list('status', flat=True).first()
+            counts[status] = counts.get(status, 0) + 1
+
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items(), key=str)) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f"✓ Indexed documents: {summary}"))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from documents.models import UploadSession
+from documents.uploads import discard_session
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads (and their partial files) that have gone idle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.DOCUMENT_UPLOAD_EXPIRY_HOURS,
+            help='Hours since the last chunk (default DOCUMENT_UPLOAD_EXPIRY_HOURS)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = UploadSession.objects.filter(document__isnull=True, updated_at__lt=cutoff)
+        purged = 0
+        for session in stale.iterator():
+            discard_session(session)
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f"✓ Purged {purged} idle upload(s)"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from documents.models import Document
+from documents.previews import generate_many
+
+
+class Command(BaseCommand):
+    help = 'Render document thumbnails and previews across the process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render even documents whose images are up to date',
+        )
+
+    def handle(self, *args, **options):
+        # Up-to-date documents are skipped cheaply inside generate_many
+        document_ids = list(Document.objects.order_by('id').values_list('id', flat=True))
+        rendered = generate_many(document_ids, force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Rendered previews for {rendered} document(s)"))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:36
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_alter_document_uploaded_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='Hex SHA-256 of the file, when known', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='file_size',
+            field=models.PositiveBigIntegerField(help_text='File size in bytes'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(choices=[('maintenance', 'Maintenance'), ('operation', 'Operation'), ('safety', 'Safety'), ('training', 'Training')], max_length=20)),
+                ('document_type', models.CharField(choices=[('PDF', 'PDF'), ('DOC', 'Word Document'), ('PPT', 'PowerPoint'), ('XLS', 'Excel'), ('TXT', 'Text')], max_length=10)),
+                ('uploaded_by', models.CharField(blank=True, help_text='Name of uploader', max_length=100)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.PositiveBigIntegerField(help_text='Final file size in bytes')),
+                ('received', models.PositiveBigIntegerField(default=0, help_text='Contiguous bytes stored so far')),
+                ('sha256', models.CharField(blank=True, help_text='Expected hex SHA-256, checked on completion', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='documents.document')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
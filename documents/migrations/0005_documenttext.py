@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Stored so neither the @@ filter nor ts_rank re-parses the text. The
+# configuration must stay in step with documents.search.SEARCH_CONFIG.
+POSTGRES_SEARCH_INDEX = [
+    "ALTER TABLE documents_documenttext ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED",
+    "CREATE INDEX documenttext_search_vector_gin ON documents_documenttext USING gin (search_vector)",
+]
+
+# External-content FTS5 table kept in step with documents_documenttext by
+# triggers. A later migration that makes SQLite rebuild that table drops the
+# triggers and must recreate them.
+SQLITE_SEARCH_TABLE = [
+    "CREATE VIRTUAL TABLE documents_documenttext_fts USING fts5("
+    "content, content='documents_documenttext', content_rowid='document_id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER documents_documenttext_fts_ai AFTER INSERT ON documents_documenttext BEGIN "
+    "INSERT INTO documents_documenttext_fts(rowid, content) VALUES (new.document_id, new.content); END",
+    "CREATE TRIGGER documents_documenttext_fts_ad AFTER DELETE ON documents_documenttext BEGIN "
+    "INSERT INTO documents_documenttext_fts(documents_documenttext_fts, rowid, content) "
+    "VALUES ('delete', old.document_id, old.content); END",
+    "CREATE TRIGGER documents_documenttext_fts_au AFTER UPDATE ON documents_documenttext BEGIN "
+    "INSERT INTO documents_documenttext_fts(documents_documenttext_fts, rowid, content) "
+    "VALUES ('delete', old.document_id, old.content); "
+    "INSERT INTO documents_documenttext_fts(rowid, content) VALUES (new.document_id, new.content); END",
+]
+
+
+def sqlite_has_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for statement in POSTGRES_SEARCH_INDEX:
+            schema_editor.execute(statement)
+    elif vendor == 'sqlite' and sqlite_has_fts5(schema_editor):
+        for statement in SQLITE_SEARCH_TABLE:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS documenttext_search_vector_gin")
+        schema_editor.execute("ALTER TABLE documents_documenttext DROP COLUMN IF EXISTS search_vector")
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS documents_documenttext_fts_{suffix}")
+        schema_editor.execute("DROP TABLE IF EXISTS documents_documenttext_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_documentblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text', serialize=False, to='documents.document')),
+                ('content', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('unsupported', 'Unsupported format'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_documenttext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPreview',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='preview', serialize=False, to='documents.document')),
+                ('sha256', models.CharField(blank=True, help_text='Hash of the file the images were rendered from', max_length=64)),
+                ('thumbnail', models.FileField(blank=True, max_length=255, upload_to='')),
+                ('image', models.FileField(blank=True, max_length=255, upload_to='')),
+                ('source', models.CharField(blank=True, help_text="'image' if taken from the file, 'text' for a text card", max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_documentpreview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('encoding', models.CharField(choices=[('gzip', 'gzip'), ('br', 'Brotli')], max_length=10)),
+                ('sha256', models.CharField(help_text='Hash of the file this was compressed from', max_length=64)),
+                ('file', models.FileField(max_length=255, upload_to='')),
+                ('size', models.PositiveBigIntegerField(help_text='Compressed size in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='documents.document')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('document', 'encoding'), name='unique_document_variant')],
+            },
+        ),
+    ]
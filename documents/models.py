@@ -1,5 +1,20 @@
+import uuid
+
 from django.db import models
 
+class DocumentBlob(models.Model):
+    """One stored copy of a file's bytes, shared by every Document with the same SHA-256"""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0, help_text='Documents pointing at this blob')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} ref)"
+
+
 class Document(models.Model):
     CATEGORY_CHOICES = [
         ('maintenance', 'Maintenance'),
@@ -20,8 +35,13 @@ class Document(models.Model):
     description = models.TextField(blank=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     document_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
-    file = models.FileField(upload_to='documents/%Y/%m/')
-    file_size = models.PositiveIntegerField(help_text='File size in bytes')
+    file = models.FileField(upload_to='documents/%Y/%m/', max_length=255)
+    filename = models.CharField(max_length=255, blank=True, help_text='Original file name')
+    blob = models.ForeignKey(
+        DocumentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='documents'
+    )
+    file_size = models.PositiveBigIntegerField(help_text='File size in bytes')
+    sha256 = models.CharField(max_length=64, blank=True, help_text='Hex SHA-256 of the file, when known')
     uploaded_by = models.CharField(max_length=100, blank=True, help_text='Name of uploader')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -42,3 +62,108 @@ class Document(models.Model):
                 return f"{size:.1f} {unit}"
             size /= 1024.0
         return f"{size:.1f} TB"
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload that becomes a Document once complete"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=20, choices=Document.CATEGORY_CHOICES)
+    document_type = models.CharField(max_length=10, choices=Document.TYPE_CHOICES)
+    uploaded_by = models.CharField(max_length=100, blank=True, help_text='Name of uploader')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField(help_text='Final file size in bytes')
+    received = models.PositiveBigIntegerField(default=0, help_text='Contiguous bytes stored so far')
+    sha256 = models.CharField(max_length=64, blank=True, help_text='Expected hex SHA-256, checked on completion')
+    document = models.OneToOneField(
+        Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.document_id is not None
+
+
+class DocumentText(models.Model):
+    """Text extracted from a document's file, kept in the full-text index"""
+
+    PENDING = 'pending'
+    DONE = 'done'
+    UNSUPPORTED = 'unsupported'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (UNSUPPORTED, 'Unsupported format'),
+        (FAILED, 'Failed'),
+    ]
+
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, primary_key=True, related_name='text')
+    content = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Text of {self.document_id} ({self.status})"
+
+
+class DocumentPreview(models.Model):
+    """Thumbnail and preview images rendered from a document's file"""
+
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, primary_key=True, related_name='preview')
+    sha256 = models.CharField(max_length=64, blank=True, help_text='Hash of the file the images were rendered from')
+    thumbnail = models.FileField(max_length=255, blank=True)
+    image = models.FileField(max_length=255, blank=True)
+    source = models.CharField(max_length=10, blank=True, help_text="'image' if taken from the file, 'text' for a text card")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Preview of {self.document_id} ({self.status})"
+
+
+class DocumentVariant(models.Model):
+    """A precompressed copy of a document's file, served by Accept-Encoding"""
+
+    GZIP = 'gzip'
+    BROTLI = 'br'
+    ENCODING_CHOICES = [
+        (GZIP, 'gzip'),
+        (BROTLI, 'Brotli'),
+    ]
+
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='variants')
+    encoding = models.CharField(max_length=10, choices=ENCODING_CHOICES)
+    sha256 = models.CharField(max_length=64, help_text='Hash of the file this was compressed from')
+    file = models.FileField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text='Compressed size in bytes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'encoding'], name='unique_document_variant'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} ({self.encoding})"
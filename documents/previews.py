@@ -0,0 +1,169 @@
+"""Thumbnail and preview images for documents.
+
+Rendering is CPU-bound, so it runs in a process pool (``documents.rendering``
+stays free of Django for that reason). The images are stored under
+``previews/<sha256>/`` and keyed by the file's hash. They are rendered once
+per distinct file and re-rendered only when the file changes.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from depot_hub.tasks import completed_in_processes, get_process_pool, run_in_background
+
+from . import rendering
+from .extraction import extract_text
+from .models import Document, DocumentPreview, DocumentText
+from .storage import content_sha256
+
+PREVIEW_PREFIX = 'previews'
+# Enough text to fill a card
+CARD_TEXT_CHARS = 2000
+
+
+def preview_sizes():
+    return {'image': settings.DOCUMENT_PREVIEW_WIDTH, 'thumbnail': settings.DOCUMENT_THUMBNAIL_WIDTH}
+
+
+def preview_path(sha256, name):
+    return f'{PREVIEW_PREFIX}/{sha256[:2]}/{sha256}/{name}.jpg'
+
+
+def _card_text(document, filename):
+    text = DocumentText.objects.filter(document=document, status=DocumentText.DONE).values_list('content', flat=True).first()
+    if text is not None:
+        return text[:CARD_TEXT_CHARS]
+    try:
+        with document.file.open('rb') as handle:
+            return extract_text(handle, filename, CARD_TEXT_CHARS)
+    except Exception:
+        return ''
+
+
+def _render_args(document):
+    """Arguments for ``rendering.render_previews``; the file goes by path when
+    the storage has one, so the worker reads it itself"""
+    filename = document.filename or document.file.name
+    try:
+        source = document.file.path
+    except NotImplementedError:
+        with document.file.open('rb') as handle:
+            source = handle.read()
+    extension = os.path.splitext(filename)[1].lower()
+    return source, extension, document.title, _card_text(document, filename), preview_sizes()
+
+
+def _claim(document_id, force):
+    """Decide what a render of ``document_id`` needs.
+
+    Returns ``(document, args)`` when images must be rendered, and
+    ``(None, None)`` when they are current or could be reused.
+    """
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None or not document.file:
+        return None, None
+    if not document.sha256:
+        # Files stored before hashes were recorded
+        with document.file.open('rb') as handle:
+            document.sha256 = content_sha256(handle)
+        Document.objects.filter(pk=document.pk).update(sha256=document.sha256)
+
+    if not force:
+        current = DocumentPreview.objects.filter(
+            document=document, status=DocumentPreview.DONE, sha256=document.sha256
+        ).exists()
+        if current:
+            return None, None
+        # Another document with the same bytes was rendered already
+        twin = (
+            DocumentPreview.objects.filter(sha256=document.sha256, status=DocumentPreview.DONE)
+            .exclude(document=document)
+            .first()
+        )
+        if twin is not None and default_storage.exists(twin.thumbnail.name):
+            _save(document.pk, sha256=document.sha256, thumbnail=twin.thumbnail.name,
+                  image=twin.image.name, source=twin.source, status=DocumentPreview.DONE)
+            return None, None
+    return document, _render_args(document)
+
+
+def _store(document, rendered, source):
+    paths = {}
+    for name, data in rendered.items():
+        path = preview_path(document.sha256, name)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        paths[name] = default_storage.save(path, ContentFile(data))
+    _save(document.pk, sha256=document.sha256, source=source, status=DocumentPreview.DONE, **paths)
+
+
+def _save(document_id, **fields):
+    with transaction.atomic():
+        # The document may have been deleted while we were rendering
+        if Document.objects.filter(pk=document_id).exists():
+            DocumentPreview.objects.update_or_create(document_id=document_id, defaults={'error': '', **fields})
+
+
+def _failed(document_id, error):
+    _save(document_id, status=DocumentPreview.FAILED, error=str(error))
+
+
+def generate_previews(document_id, force=False):
+    """Render one document's images in the process pool and wait for them"""
+    try:
+        document, args = _claim(document_id, force)
+        if document is None:
+            return
+        rendered, source = get_process_pool().submit(rendering.render_previews, *args).result()
+        _store(document, rendered, source)
+    except Exception as e:
+        _failed(document_id, e)
+        raise
+
+
+def generate_many(document_ids, force=False):
+    """Render many documents in parallel across the pool; returns the count rendered"""
+    def jobs():
+        for document_id in document_ids:
+            try:
+                document, args = _claim(document_id, force)
+            except Exception as e:
+                _failed(document_id, e)
+                continue
+            if document is not None:
+                yield document, args
+
+    rendered_count = 0
+    for document, future in completed_in_processes(rendering.render_previews, jobs()):
+        try:
+            _store(document, *future.result())
+            rendered_count += 1
+        except Exception as e:
+            _failed(document.pk, e)
+    return rendered_count
+
+
+def queue_previews(document):
+    """Mark ``document``'s images pending and render them once the transaction commits"""
+    DocumentPreview.objects.update_or_create(document=document, defaults={'status': DocumentPreview.PENDING, 'error': ''})
+    run_in_background(generate_previews, document.pk)
+
+
+def collect_previews(dry_run=False):
+    """Delete preview folders whose hash no document has any more; returns the count"""
+    live = set(Document.objects.exclude(sha256='').values_list('sha256', flat=True))
+    removed = 0
+    if not default_storage.exists(PREVIEW_PREFIX):
+        return removed
+    for shard in default_storage.listdir(PREVIEW_PREFIX)[0]:
+        for sha256 in default_storage.listdir(f'{PREVIEW_PREFIX}/{shard}')[0]:
+            if sha256 in live:
+                continue
+            if not dry_run:
+                folder = f'{PREVIEW_PREFIX}/{shard}/{sha256}'
+                for name in default_storage.listdir(folder)[1]:
+                    default_storage.delete(f'{folder}/{name}')
+            removed += 1
+    return removed
@@ -0,0 +1,126 @@
+"""Pure image rendering for document previews.
+
+Nothing here imports Django, so these functions can run in a spawned
+process pool without setting the project up.
+"""
+import io
+import textwrap
+import zipfile
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+try:
+    import pypdf
+except ImportError:  # PDF images are optional
+    pypdf = None
+
+IMAGE_EXTENSIONS = {'.bmp', '.gif', '.jpeg', '.jpg', '.png', '.tif', '.tiff', '.webp'}
+OFFICE_THUMBNAILS = ('docProps/thumbnail.jpeg', 'docProps/thumbnail.jpg', 'docProps/thumbnail.png')
+# Portrait card, roughly A4 proportions
+CARD_RATIO = 1.414
+CARD_COLOURS = {'.pdf': '#c0392b', '.docx': '#2b579a', '.pptx': '#d24726', '.xlsx': '#217346'}
+
+
+def _office_image(path):
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        for name in OFFICE_THUMBNAILS:
+            if name in names:
+                return Image.open(io.BytesIO(archive.read(name)))
+    return None
+
+
+def _pdf_image(path):
+    if pypdf is None:
+        return None
+    page = pypdf.PdfReader(path).pages[0]
+    # A scanned page is one large image; pick the biggest one on the page
+    images = sorted(page.images, key=lambda image: len(image.data), reverse=True)
+    return Image.open(io.BytesIO(images[0].data)) if images else None
+
+
+def source_image(path, extension, width):
+    """The document's own first-page picture, decoded at about ``width``
+    pixels wide, or None when it has none"""
+    try:
+        if extension in IMAGE_EXTENSIONS:
+            image = Image.open(path)
+        elif extension in ('.docx', '.pptx', '.xlsx'):
+            image = _office_image(path)
+        elif extension == '.pdf':
+            image = _pdf_image(path)
+        else:
+            return None
+        if image is not None:
+            # JPEG decoding can skip straight to a reduced scale
+            image.draft('RGB', (width, width * 2))
+            image.load()
+        return image
+    except Exception:
+        # Damaged or exotic files (e.g. EMF thumbnails) fall back to a text card
+        return None
+
+
+def text_card(width, title, text, extension):
+    """Draw a page-like card with the title and the first lines of text"""
+    height = int(width * CARD_RATIO)
+    scale = width / 400
+    card = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(card)
+    band = int(56 * scale)
+    draw.rectangle([0, 0, width, band], fill=CARD_COLOURS.get(extension, '#555555'))
+    label = (extension.lstrip('.') or 'file').upper()
+    draw.text((int(16 * scale), int(14 * scale)), label, fill='white', font=ImageFont.load_default(int(24 * scale)))
+
+    font = ImageFont.load_default(int(14 * scale))
+    margin = int(20 * scale)
+    line_height = int(20 * scale)
+    y = band + margin
+    columns = 44
+    lines = textwrap.wrap(title, columns)[:2] + [''] + [
+        line for paragraph in text.splitlines() for line in (textwrap.wrap(paragraph, columns) or [''])
+    ]
+    for line in lines:
+        if y + line_height > height - margin:
+            break
+        draw.text((margin, y), line, fill='#222222', font=font)
+        y += line_height
+    draw.rectangle([0, 0, width - 1, height - 1], outline='#cccccc')
+    return card
+
+
+def _encode(image, quality):
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def render_previews(path, extension, title, text, sizes, quality=82):
+    """Render JPEG bytes for every ``{name: width}`` in ``sizes``.
+
+    ``path`` is a file path or the file's bytes. Returns
+    ``({name: bytes}, source)``, source being ``'image'`` or ``'text'``.
+    """
+    if isinstance(path, bytes):
+        path = io.BytesIO(path)
+    widest = max(sizes.values())
+    image = source_image(path, extension, widest)
+    if image is not None:
+        source = 'image'
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+    else:
+        source = 'text'
+        image = text_card(widest, title, text, extension)
+
+    rendered = {}
+    # Largest first, so each smaller size resamples the previous result
+    for name, width in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        rendered[name] = _encode(image, quality)
+    return rendered, source
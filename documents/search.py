@@ -0,0 +1,123 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+from .models import DocumentText
+
+# Also baked into the stored search_vector column; change both together
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'documents_documenttext_fts'
+
+# Placeholders the database wraps matches in; swapped for <mark> after the
+# snippet itself has been HTML-escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+SNIPPET_WORDS = 16
+
+
+def search_backend():
+    """'postgresql' (tsvector + GIN), 'fts5' (SQLite) or 'basic' (LIKE scan)"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        return 'fts5'
+    return 'basic'
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def _fts5_query(text):
+    # Quote each term so user input cannot use FTS5 query syntax; terms AND together
+    terms = re.findall(r'\w+', text)
+    # the last term is a prefix so results follow the user as they type
+    quoted = [f'"{term}"' for term in terms]
+    if quoted:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _postgres_hits(text, limit, category):
+    # search_vector is a stored, GIN-indexed to_tsvector(SEARCH_CONFIG, content)
+    # column (migration 0005), used for both matching and ranking
+    category_sql = 'AND d.category = %s' if category else ''
+    sql = f"""
+        SELECT hit.document_id, hit.rank,
+               ts_headline(%s, t.content, hit.query, %s) AS snippet
+        FROM (
+            SELECT t.document_id, ts_rank(t.search_vector, q) AS rank, q AS query
+            FROM documents_documenttext t
+            JOIN documents_document d ON d.id = t.document_id,
+                 websearch_to_tsquery(%s, %s) q
+            WHERE t.search_vector @@ q AND d.is_active {category_sql}
+            ORDER BY rank DESC, t.document_id DESC
+            LIMIT %s
+        ) hit
+        JOIN documents_documenttext t ON t.document_id = hit.document_id
+        ORDER BY hit.rank DESC, hit.document_id DESC
+    """
+    options = f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxFragments=2, MaxWords={SNIPPET_WORDS}, MinWords=6'
+    params = [SEARCH_CONFIG, options, SEARCH_CONFIG, text]
+    params += [category] if category else []
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _fts5_hits(text, limit, category):
+    query = _fts5_query(text)
+    if not query:
+        return []
+    category_sql = 'AND d.category = %s' if category else ''
+    # bm25() is lower-is-better; negate it so higher means more relevant everywhere
+    sql = f"""
+        SELECT {FTS_TABLE}.rowid, -bm25({FTS_TABLE}) AS rank,
+               snippet({FTS_TABLE}, 0, %s, %s, '…', %s) AS snippet
+        FROM {FTS_TABLE}
+        JOIN documents_document d ON d.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s AND d.is_active {category_sql}
+        ORDER BY rank DESC, {FTS_TABLE}.rowid DESC
+        LIMIT %s
+    """
+    params = [MATCH_START, MATCH_END, SNIPPET_WORDS, query]
+    params += [category] if category else []
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _basic_hits(text, limit, category):
+    texts = DocumentText.objects.filter(
+        status=DocumentText.DONE, content__icontains=text, document__is_active=True
+    )
+    if category:
+        texts = texts.filter(document__category=category)
+    hits = []
+    for document_id, content in texts.order_by('-document_id').values_list('document_id', 'content')[:limit]:
+        position = content.lower().find(text.lower())
+        start = max(position - 80, 0)
+        snippet = (
+            content[start:position] + MATCH_START + content[position:position + len(text)]
+            + MATCH_END + content[position + len(text):position + len(text) + 80]
+        )
+        hits.append((document_id, 1.0, ('…' if start else '') + snippet))
+    return hits
+
+
+def search_documents(text, limit=20, category=None):
+    """Ranked ``(document_id, rank, snippet_html)`` hits for ``text``, best first.
+
+    Reads only the text index, never the stored files.
+    """
+    backend = search_backend()
+    if backend == 'postgresql':
+        hits = _postgres_hits(text, limit, category)
+    elif backend == 'fts5':
+        hits = _fts5_hits(text, limit, category)
+    else:
+        hits = _basic_hits(text, limit, category)
+    return [(document_id, float(rank), _highlight(snippet or '')) for document_id, rank, snippet in hits]
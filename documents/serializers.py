@@ -1,11 +1,70 @@
+import os
+
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Document
+from depot_hub import counters
+from .models import Document, DocumentPreview, UploadSession
 
 class DocumentSerializer(serializers.ModelSerializer):
     formatted_file_size = serializers.CharField(read_only=True)
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Document
         fields = '__all__'
-        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at', 'download_count']
\ No newline at end of file
+        read_only_fields = [
+            'id', 'uploaded_by', 'created_at', 'updated_at', 'download_count',
+            'file_size', 'filename', 'sha256', 'blob',
+        ]
+
+    def to_representation(self, document):
+        data = super().to_representation(document)
+        # Include downloads still waiting to be written
+        data['download_count'] += counters.pending(Document, document.pk, 'download_count')
+        return data
+
+    def _image_url(self, document, route):
+        preview = getattr(document, 'preview', None)
+        if preview is None or preview.status != DocumentPreview.DONE:
+            return None
+        # Versioned by file hash so the image can be cached forever
+        url = f"{reverse(route, args=[document.pk])}?v={preview.sha256[:16]}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_thumbnail_url(self, document):
+        return self._image_url(document, 'document_thumbnail')
+
+    def get_preview_url(self, document):
+        return self._image_url(document, 'document_preview')
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    is_complete = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'title', 'description', 'category', 'document_type', 'uploaded_by',
+            'filename', 'total_size', 'sha256', 'received', 'is_complete', 'document',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'received', 'document', 'created_at', 'updated_at']
+
+    def validate_filename(self, value):
+        name = os.path.basename(value.replace('\\', '/'))
+        if not name:
+            raise serializers.ValidationError('A file name is required.')
+        return name
+
+    def validate_total_size(self, value):
+        if value > settings.DOCUMENT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'At most {settings.DOCUMENT_UPLOAD_MAX_SIZE} bytes per document.')
+        return value
+
+    def validate_sha256(self, value):
+        if value and (len(value) != 64 or any(c not in '0123456789abcdefABCDEF' for c in value)):
+            raise serializers.ValidationError('Must be a 64-character hex SHA-256 digest.')
+        return value.lower()
@@ -0,0 +1,143 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Document, DocumentBlob
+
+BLOB_PREFIX = 'blobs'
+
+
+class Sha256UploadHandler(FileUploadHandler):
+    """Hash multipart file uploads as they stream in.
+
+    Sits first in ``request.upload_handlers`` and passes every chunk on
+    untouched; the hex digests land in ``request.upload_digests`` keyed by
+    form field name.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_digests'):
+            self.request.upload_digests = {}
+        self.request.upload_digests[self.field_name] = self.digest.hexdigest()
+        return None
+
+
+def blob_path(sha256):
+    return f'{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def content_sha256(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def acquire_blob(content, sha256, size):
+    """Return the blob for ``sha256`` with one more reference, storing
+    ``content`` only if these bytes are not stored yet.
+
+    Call inside the transaction that saves the referencing Document, so a
+    rollback takes the reference back with it.
+    """
+    with transaction.atomic():
+        blob, _ = DocumentBlob.objects.select_for_update().get_or_create(
+            sha256=sha256, defaults={'size': size}
+        )
+        if not blob.file:
+            name = blob_path(sha256)
+            # A blob file without a row (e.g. a crash mid-upload) already
+            # holds exactly these bytes
+            if not default_storage.exists(name):
+                name = default_storage.save(name, content)
+            blob.file.name = name
+            blob.save(update_fields=['file'])
+        DocumentBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    return blob
+
+
+def release_blob(blob_id):
+    """Drop one reference; the bytes stay until ``gc_blobs`` runs"""
+    if blob_id is not None:
+        DocumentBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+
+def store_document_file(content, filename, sha256=None):
+    """Store uploaded ``content`` the way ``DOCUMENT_CONTENT_ADDRESSED`` asks.
+
+    Returns the Document field values to save: the shared blob path and blob
+    in content-addressed mode, otherwise the upload itself under
+    ``upload_to``. Either way ``sha256`` is recorded. Like ``acquire_blob``,
+    call it inside the transaction that saves the Document.
+    """
+    sha256 = sha256 or content_sha256(content)
+    fields = {'filename': filename, 'file_size': content.size, 'sha256': sha256}
+    if not settings.DOCUMENT_CONTENT_ADDRESSED:
+        return {**fields, 'file': content, 'blob': None}
+    blob = acquire_blob(content, sha256, content.size)
+    return {**fields, 'file': blob.file.name, 'blob': blob}
+
+
+def recount_references():
+    """Reset every blob's ``ref_count`` to its real number of documents"""
+    fixed = 0
+    for blob in DocumentBlob.objects.annotate(actual=Count('documents')).exclude(ref_count=F('actual')):
+        DocumentBlob.objects.filter(pk=blob.pk).update(ref_count=blob.actual)
+        fixed += 1
+    return fixed
+
+
+def collect_garbage(dry_run=False, grace=timedelta(hours=1)):
+    """Delete unreferenced blobs and stray blob files; returns ``(blobs, files)``.
+
+    Stray files younger than ``grace`` are left alone, since an upload may
+    be storing them right now.
+    """
+    blobs = 0
+    for blob_id in DocumentBlob.objects.filter(ref_count=0).values_list('id', flat=True):
+        with transaction.atomic():
+            blob = DocumentBlob.objects.select_for_update().filter(pk=blob_id, ref_count=0).first()
+            # Re-check under the lock: an upload may have just claimed it
+            if blob is None or Document.objects.filter(blob=blob).exists():
+                continue
+            if not dry_run:
+                name = blob.file.name
+                blob.delete()
+                transaction.on_commit(lambda name=name: name and default_storage.delete(name))
+            blobs += 1
+
+    known = set(DocumentBlob.objects.values_list('file', flat=True))
+    files = 0
+    settled = timezone.now() - grace
+    for name in _walk(BLOB_PREFIX):
+        if name not in known and default_storage.get_modified_time(name) < settled:
+            if not dry_run:
+                default_storage.delete(name)
+            files += 1
+    return blobs, files
+
+
+def _walk(path):
+    if not default_storage.exists(path):
+        return
+    directories, files = default_storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name).replace(os.sep, '/')
+    for directory in directories:
+        yield from _walk(os.path.join(path, directory))
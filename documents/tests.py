@@ -1,3 +1,447 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+from xml.sax.saxutils import escape
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from depot_hub import tasks
+from PIL import Image
+
+from . import compression, rendering, search, uploads
+from .downloads import file_etag
+from .models import Document, DocumentBlob, DocumentPreview, DocumentText, DocumentVariant, UploadSession
+from .serializers import DocumentSerializer
+
+CONTENT = b'0123456789' * 10
+
+
+class DocumentTestMixin:
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        # Counters are written straight through, so tests can read them back
+        self.enterContext(override_settings(
+            MEDIA_ROOT=media_root, DOCUMENT_UPLOAD_TEMP_DIR=f'{media_root}/uploads', COUNTER_FLUSH_SECONDS=0
+        ))
+
+    def create_document(self, content=CONTENT, name='documents/2026/10/rules 100%.txt', **fields):
+        path = default_storage.save(name, ContentFile(content))
+        fields = {'title': 'Rules', 'category': 'safety', 'document_type': 'TXT', **fields}
+        return Document.objects.create(file=path, file_size=len(content), **fields)
+
+    def upload(self, content=CONTENT, name='rules.txt', client=None, **fields):
+        return (client or self.client).post('/api/documents/', {
+            'title': 'Rules', 'category': 'safety', 'document_type': 'TXT', 'is_active': True,
+            'file': SimpleUploadedFile(name, content), **fields,
+        })
+
+
+@override_settings(DOCUMENT_SENDFILE='')
+class DownloadTests(DocumentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.document = self.create_document()
+        self.url = f'/api/documents/{self.document.pk}/download/'
+        self.etag = file_etag(self.document)
+
+    def download_count(self):
+        self.document.refresh_from_db()
+        return self.document.download_count
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(self.download_count(), 1)
+
+    def test_range_resume_is_not_counted_again(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+        self.assertEqual(self.download_count(), 0)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+        self.assertEqual(self.download_count(), 0)
+
+    def test_if_range_with_old_etag_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_if_none_match(self):
+        for header in (self.etag, f'W/{self.etag}', f'"other", {self.etag}', '*'):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.download_count(), 0)
+
+    def test_missing_file(self):
+        default_storage.delete(self.document.file.name)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(DOCUMENT_SENDFILE='x-accel-redirect', DOCUMENT_SENDFILE_PREFIX='/protected-media/')
+    def test_x_accel_redirect_path_is_quoted(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/documents/2026/10/rules%20100%25.txt')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.download_count(), 1)
+
+
+class ChunkedUploadTests(DocumentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post('/api/documents/uploads/', {
+            'title': 'Rules', 'category': 'safety', 'document_type': 'TXT', 'filename': 'rules.txt',
+            'total_size': len(CONTENT), 'sha256': hashlib.sha256(CONTENT).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/documents/uploads/{response.json()['id']}/"
+
+    def put(self, start, end, body=None, **headers):
+        body = CONTENT[start:end + 1] if body is None else body
+        return self.client.put(
+            self.url, body, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(CONTENT)}', **headers,
+        )
+
+    def complete(self):
+        return self.client.post(f'{self.url}complete/')
+
+    def test_resume_from_received_and_complete(self):
+        self.assertEqual(self.put(0, 39).json()['received'], 40)
+        self.assertEqual(self.put(60, 99).status_code, 409)
+        self.assertEqual(self.complete().status_code, 409)
+
+        self.assertEqual(self.client.get(self.url).json()['received'], 40)
+        # Resending overlapping bytes is harmless
+        self.assertEqual(self.put(30, 99).json()['received'], len(CONTENT))
+
+        response = self.complete()
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(pk=response.json()['id'])
+        with document.file.open('rb') as handle:
+            self.assertEqual(handle.read(), CONTENT)
+        self.assertEqual(document.sha256, hashlib.sha256(CONTENT).hexdigest())
+        # Completing again returns the same document
+        self.assertEqual(self.complete().json()['id'], document.pk)
+        self.assertEqual(self.put(0, 9).status_code, 409)
+
+    def test_rejected_chunks(self):
+        self.assertEqual(self.put(0, 9, body=b'').status_code, 400)
+        self.assertEqual(self.client.put(self.url, CONTENT[:10], content_type='application/octet-stream').status_code, 400)
+        self.assertEqual(self.put(0, len(CONTENT)).status_code, 416)
+        self.assertEqual(self.put(0, 9, HTTP_X_CHUNK_SHA256='0' * 64).status_code, 422)
+
+    def test_checksum_mismatch_on_complete(self):
+        self.put(0, 99, body=CONTENT[::-1])
+        self.assertEqual(self.complete().status_code, 422)
+        self.assertFalse(Document.objects.exists())
+
+    def test_chunk_written_during_the_hash_aborts_completion(self):
+        self.put(0, 99)
+        session = UploadSession.objects.get()
+        real_sha256 = uploads.file_sha256
+
+        def hash_then_resend(path):
+            digest = real_sha256(path)
+            self.put(0, 9)
+            return digest
+
+        with mock.patch.object(uploads, 'file_sha256', hash_then_resend):
+            self.assertEqual(self.complete().status_code, 409)
+        self.assertFalse(Document.objects.exists())
+        self.assertEqual(self.complete().status_code, 201)
+        session.refresh_from_db()
+        self.assertTrue(session.is_complete)
+
+    def test_abandon(self):
+        self.put(0, 39)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(UploadSession.objects.exists())
+
+
+@override_settings(DOCUMENT_CONTENT_ADDRESSED=True)
+class BlobStoreTests(DocumentTestMixin, TestCase):
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload().json()
+        second = self.upload(name='copy.txt').json()
+
+        blob = DocumentBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.sha256, hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(Document.objects.get(pk=first['id']).file.name, Document.objects.get(pk=second['id']).file.name)
+        self.assertEqual(second['filename'], 'copy.txt')
+        self.assertEqual(second['file_size'], len(CONTENT))
+
+    def test_deleting_documents_releases_and_gc_removes_the_blob(self):
+        ids = [self.upload().json()['id'] for _ in range(2)]
+        blob = DocumentBlob.objects.get()
+
+        self.assertEqual(self.client.delete(f'/api/documents/{ids[0]}/').status_code, 204)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        call_command('gc_blobs', stdout=StringIO())
+        self.assertTrue(DocumentBlob.objects.exists())
+
+        self.client.delete(f'/api/documents/{ids[1]}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_blobs', stdout=StringIO())
+        self.assertFalse(DocumentBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.file.name))
+
+    def test_failed_save_takes_no_reference(self):
+        self.upload()
+        client = Client(raise_request_exception=False)
+        with mock.patch.object(DocumentSerializer, 'save', side_effect=RuntimeError):
+            self.assertEqual(self.upload(client=client).status_code, 500)
+
+        self.assertEqual(DocumentBlob.objects.get().ref_count, 1)
+
+    def test_gc_recounts_references_first(self):
+        self.upload()
+        DocumentBlob.objects.update(ref_count=0)
+        out = StringIO()
+        call_command('gc_blobs', '--dry-run', stdout=out)
+
+        self.assertIn('Corrected reference counts on 1 blob(s)', out.getvalue())
+        self.assertEqual(DocumentBlob.objects.get().ref_count, 1)
+
+
+def docx(*paragraphs):
+    """A minimal .docx holding ``paragraphs``"""
+    body = ''.join(f'<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(
+            'word/document.xml',
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>',
+        )
+    return buffer.getvalue()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class SearchTests(DocumentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.forklift = self.upload(b'Forklift inspection before every shift.', name='forklift.txt').json()['id']
+            self.manual = self.upload(docx('Pallet racking', 'Inspect the racking <weekly>'), name='racking.docx').json()['id']
+            self.upload(b'\x00\x01', name='photo.bin', category='training')
+
+    def search(self, **params):
+        response = self.client.get('/api/documents/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_text_is_extracted_in_the_background(self):
+        statuses = dict(DocumentText.objects.values_list('document__filename', 'status'))
+        self.assertEqual(statuses, {
+            'forklift.txt': DocumentText.DONE, 'racking.docx': DocumentText.DONE, 'photo.bin': DocumentText.UNSUPPORTED,
+        })
+        self.assertIn('Inspect the racking', DocumentText.objects.get(document_id=self.manual).content)
+
+    def test_search_ranks_and_highlights(self):
+        for backend in ('basic', search.search_backend()):
+            with self.subTest(backend=backend), mock.patch.object(search, 'search_backend', return_value=backend):
+                results = self.search(q='inspect')
+                self.assertEqual({result['id'] for result in results}, {self.forklift, self.manual})
+                self.assertIn('<mark>', results[0]['snippet'])
+                self.assertNotIn('<weekly>', ''.join(result['snippet'] for result in results))
+                self.assertEqual(self.search(q='inspect', category='training'), [])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get('/api/documents/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/documents/search/', {'q': 'x', 'limit': 'all'}).status_code, 400)
+
+    def test_index_command_retries_pending_documents(self):
+        DocumentText.objects.filter(document_id=self.forklift).update(status=DocumentText.PENDING, content='')
+        out = StringIO()
+        call_command('index_documents', stdout=out)
+
+        self.assertIn('1 done', out.getvalue())
+        self.assertEqual(DocumentText.objects.get(document_id=self.forklift).status, DocumentText.DONE)
+
+
+def png(width=1200, height=600):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class RenderingTests(TestCase):
+    sizes = {'image': 400, 'thumbnail': 100}
+
+    def test_embedded_image_is_scaled_to_each_size(self):
+        rendered, source = rendering.render_previews(png(), '.png', 'Floor plan', '', self.sizes)
+        self.assertEqual(source, 'image')
+        widths = {name: Image.open(io.BytesIO(data)).size for name, data in rendered.items()}
+        self.assertEqual(widths, {'image': (400, 200), 'thumbnail': (100, 50)})
+
+    def test_text_card_without_an_image(self):
+        text = 'Lift with your legs'
+        rendered, source = rendering.render_previews(text.encode(), '.txt', 'Rules', text, self.sizes)
+        self.assertEqual(source, 'text')
+        self.assertEqual(Image.open(io.BytesIO(rendered['thumbnail'])).format, 'JPEG')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PreviewTests(DocumentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Render in threads; a spawned pool would start a fresh interpreter per test
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        self.enterContext(mock.patch.object(tasks, '_process_pool', pool))
+
+    def upload_image(self, name='plan.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.upload(png(), name=name).json()['id']
+
+    def test_upload_renders_previews(self):
+        document_id = self.upload_image()
+        preview = DocumentPreview.objects.get(document_id=document_id)
+        self.assertEqual((preview.status, preview.source), (DocumentPreview.DONE, 'image'))
+
+        data = self.client.get(f'/api/documents/{document_id}/').json()
+        self.assertTrue(data['thumbnail_url'].endswith(f'?v={preview.sha256[:16]}'))
+        response = self.client.get(data['thumbnail_url'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).width, 240)
+
+        etag = response['ETag'].replace('thumbnail', 'image')
+        response = self.client.get(f'/api/documents/{document_id}/preview/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_same_file_reuses_images(self):
+        first = DocumentPreview.objects.get(document_id=self.upload_image())
+        with mock.patch.object(rendering, 'render_previews', wraps=rendering.render_previews) as render:
+            second = DocumentPreview.objects.get(document_id=self.upload_image(name='copy.png'))
+        render.assert_not_called()
+        self.assertEqual(second.thumbnail.name, first.thumbnail.name)
+
+    def test_missing_preview_is_404(self):
+        document = self.create_document()
+        self.assertEqual(self.client.get(f'/api/documents/{document.pk}/thumbnail/').status_code, 404)
+
+    def test_command_renders_missing_previews(self):
+        documents = [self.create_document(), self.create_document(name='documents/notes.txt')]
+        out = StringIO()
+        call_command('render_previews', stdout=out)
+
+        self.assertIn('2 document', out.getvalue())
+        self.assertEqual(
+            set(DocumentPreview.objects.values_list('document_id', 'source')), {(d.pk, 'text') for d in documents}
+        )
+
+
+class BundleTests(DocumentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.rules = self.create_document(b'Wear boots', name='documents/rules.txt', filename='rules.txt')
+        self.manual = self.create_document(b'%PDF-1.4' * 100, name='documents/manual.pdf', filename='manual.pdf')
+        self.other = self.create_document(b'Other rules', name='documents/rules2.txt', filename='rules.txt',
+                                          category='training')
+
+    def bundle(self, response):
+        self.assertEqual(response.status_code, 200)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_ids_in_every_shape(self):
+        ids = [self.other.pk, self.rules.pk]
+        responses = {
+            'comma': self.client.get('/api/documents/bundle/', {'ids': f'{ids[0]},{ids[1]}'}),
+            'repeated': self.client.get('/api/documents/bundle/', {'ids': ids}),
+            'form': self.client.post('/api/documents/bundle/', {'ids': ids}),
+            'json': self.client.post('/api/documents/bundle/', {'ids': ids}, content_type='application/json'),
+        }
+        for shape, response in responses.items():
+            with self.subTest(shape=shape):
+                archive = self.bundle(response)
+                self.assertEqual(archive.namelist(), ['rules.txt', 'rules (2).txt'])
+                self.assertEqual(archive.read('rules (2).txt'), b'Wear boots')
+
+    def test_members_are_self_delimiting(self):
+        archive = self.bundle(self.client.get('/api/documents/bundle/', {'category': 'safety'}))
+        self.assertEqual(archive.testzip(), None)
+        # Data descriptors follow every member, so none may be stored
+        self.assertEqual({info.compress_type for info in archive.infolist()}, {zipfile.ZIP_DEFLATED})
+        self.assertEqual(archive.read('manual.pdf'), b'%PDF-1.4' * 100)
+
+    def test_counts_each_document_once(self):
+        self.bundle(self.client.get('/api/documents/bundle/', {'ids': f'{self.rules.pk},{self.rules.pk}'}))
+        self.rules.refresh_from_db()
+        self.assertEqual(self.rules.download_count, 1)
+
+    def test_rejects_unknown_ids_before_streaming(self):
+        response = self.client.get('/api/documents/bundle/', {'ids': f'{self.rules.pk},999'})
+        self.assertEqual((response.status_code, response.json()['missing']), (404, [999]))
+        self.assertEqual(self.client.get('/api/documents/bundle/', {'ids': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/documents/bundle/').status_code, 400)
+
+    @override_settings(DOCUMENT_BUNDLE_MAX_FILES=1)
+    def test_caps_the_number_of_files(self):
+        self.assertEqual(self.client.get('/api/documents/bundle/', {'category': 'safety'}).status_code, 400)
+
+
+class VariantTests(DocumentTestMixin, TestCase):
+    text = b'Forklifts give way to pedestrians. ' * 200
+
+    def setUp(self):
+        super().setUp()
+        self.document = self.create_document(
+            self.text, name='documents/rules.txt', filename='rules.txt', sha256=hashlib.sha256(self.text).hexdigest()
+        )
+        compression.compress_document(self.document.pk)
+
+    def download(self, accept_encoding='gzip, br', **headers):
+        return self.client.get(f'/api/documents/{self.document.pk}/download/', HTTP_ACCEPT_ENCODING=accept_encoding,
+                               **headers)
+
+    def test_smallest_accepted_variant_is_served(self):
+        self.assertEqual(
+            set(self.document.variants.values_list('encoding', flat=True)), set(compression.available_encodings())
+        )
+        response = self.download('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.text)
+
+        self.assertNotIn('Content-Encoding', self.download('gzip;q=0, identity'))
+        self.assertNotIn('Content-Encoding', self.download(HTTP_RANGE='bytes=0-9'))
+
+    def test_stale_variant_is_ignored(self):
+        DocumentVariant.objects.update(sha256='0' * 64)
+        self.assertNotIn('Content-Encoding', self.download())
+
+    @override_settings(DOCUMENT_SENDFILE='x-accel-redirect')
+    def test_offloaded_downloads_send_the_original(self):
+        response = self.download()
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/documents/rules.txt')
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .compression import queue_compression
+from .downloads import STREAM_CHUNK_SIZE
+from .extraction import queue_indexing
+from .models import Document, UploadSession
+from .previews import queue_previews
+from .storage import store_document_file
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """Raised with a client-facing message when a chunk or completion is rejected"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _PartFile(File):
+    # FileSystemStorage moves a file exposing temporary_file_path() into
+    # place instead of copying it
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def part_path(session):
+    return os.path.join(settings.DOCUMENT_UPLOAD_TEMP_DIR, f'{session.pk}.part')
+
+
+def start_session(**fields):
+    session = UploadSession.objects.create(**fields)
+    os.makedirs(settings.DOCUMENT_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def parse_content_range(header, session):
+    """Return ``(start, end)`` from ``Content-Range: bytes start-end/total``"""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise UploadError("Content-Range must look like 'bytes start-end/total'")
+    start, end, total = (int(value) for value in match.groups())
+    if total != session.total_size:
+        raise UploadError(f'Total size {total} does not match the session ({session.total_size})')
+    if start > end or end >= total:
+        raise UploadError('Content-Range is out of bounds', status=416)
+    if start > session.received:
+        # A gap would leave a hole in the file; the client resumes from received
+        raise UploadError(f'Expected a chunk starting at or before byte {session.received}', status=409)
+    return start, end
+
+
+def write_chunk(session, stream, start, end, chunk_sha256=''):
+    """Write request body bytes ``start..end`` into the part file.
+
+    The body is copied straight from the request stream in fixed-size
+    pieces and hashed on the way. Returns the new contiguous byte count.
+    """
+    if stream is None:
+        # DRF gives no stream for a request without a body
+        raise UploadError('Chunk body is empty')
+    expected = end - start + 1
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        part = open(part_path(session), 'r+b')
+    except FileNotFoundError:
+        # complete_session moved the part file into storage meanwhile
+        raise UploadError('Upload already completed', status=409)
+    with part:
+        part.seek(start)
+        while written < expected:
+            piece = stream.read(min(STREAM_CHUNK_SIZE, expected - written))
+            if not piece:
+                break
+            part.write(piece)
+            digest.update(piece)
+            written += len(piece)
+
+    if chunk_sha256:
+        if written != expected or digest.hexdigest() != chunk_sha256.lower():
+            raise UploadError('Chunk checksum mismatch; resend this chunk', status=422)
+    # Never move the offset backwards if a concurrent chunk got further.
+    # updated_at moves on every write, resent bytes included, which is how
+    # complete_session notices a write that raced its hash
+    UploadSession.objects.filter(pk=session.pk).update(
+        received=Greatest('received', Value(start + written)), updated_at=timezone.now()
+    )
+    session.refresh_from_db(fields=['received', 'updated_at'])
+    return session.received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for piece in iter(lambda: handle.read(STREAM_CHUNK_SIZE), b''):
+            digest.update(piece)
+    return digest.hexdigest()
+
+
+def complete_session(session_id):
+    """Verify the part file and turn it into a Document.
+
+    The file is hashed before the session row is locked; the lock only
+    covers checking that no chunk landed meanwhile and creating the Document.
+    """
+    session = UploadSession.objects.get(pk=session_id)
+    if session.is_complete:
+        return session.document
+    if session.received != session.total_size:
+        raise UploadError(
+            f'Upload incomplete: {session.received} of {session.total_size} bytes received', status=409
+        )
+
+    path = part_path(session)
+    try:
+        sha256 = file_sha256(path)
+    except FileNotFoundError:
+        # A concurrent completion already moved the file into storage
+        session.refresh_from_db()
+        if session.is_complete:
+            return session.document
+        raise
+    if session.sha256 and sha256 != session.sha256.lower():
+        raise UploadError('File checksum does not match the expected sha256', status=422)
+
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session_id)
+        if locked.is_complete:
+            return locked.document
+        if locked.updated_at != session.updated_at:
+            raise UploadError('A chunk arrived while completing; complete the upload again', status=409)
+
+        with open(path, 'rb') as handle:
+            document = Document.objects.create(
+                title=session.title,
+                description=session.description,
+                category=session.category,
+                document_type=session.document_type,
+                uploaded_by=session.uploaded_by,
+                **store_document_file(_PartFile(handle, name=session.filename), session.filename, sha256),
+            )
+        session.document = document
+        session.save(update_fields=['document', 'updated_at'])
+        queue_indexing(document)
+        queue_previews(document)
+        queue_compression(document)
+
+    if os.path.exists(path):
+        os.remove(path)
+    return document
+
+
+def discard_session(session):
+    if os.path.exists(part_path(session)):
+        os.remove(part_path(session))
+    session.delete()
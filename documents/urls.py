@@ -3,7 +3,14 @@ from . import views
 
 urlpatterns = [
     path('', views.DocumentListView.as_view(), name='document_list'),
+    path('bundle/', views.download_bundle, name='download_bundle'),
+    path('search/', views.document_search, name='document_search'),
     path('<int:pk>/', views.DocumentDetailView.as_view(), name='document_detail'),
     path('<int:pk>/download/', views.download_document, name='download_document'),
+    path('<int:pk>/thumbnail/', views.document_thumbnail, name='document_thumbnail'),
+    path('<int:pk>/preview/', views.document_preview, name='document_preview'),
+    path('uploads/', views.upload_session_create, name='upload_session_create'),
+    path('uploads/<uuid:session_id>/', views.upload_session_detail, name='upload_session_detail'),
+    path('uploads/<uuid:session_id>/complete/', views.upload_session_complete, name='upload_session_complete'),
     path('categories/', views.document_categories, name='document_categories'),
 ]
\ No newline at end of file
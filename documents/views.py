@@ -1,56 +1,260 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.http import Http404, HttpResponse
+from django.db import transaction
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from depot_hub import counters
 from django.shortcuts import get_object_or_404
-from .models import Document
-from .serializers import DocumentSerializer
+from .bundles import stream_zip
+from .compression import pick_variant, queue_compression
+from .downloads import document_file_response, etag_matches
+from .extraction import queue_indexing
+from .models import Document, DocumentPreview, UploadSession
+from .previews import queue_previews
+from .search import search_documents
+from .serializers import DocumentSerializer, UploadSessionSerializer
+from .storage import Sha256UploadHandler, release_blob, store_document_file
+from .uploads import UploadError, complete_session, discard_session, parse_content_range, start_session, write_chunk
 
-class DocumentListView(generics.ListCreateAPIView):
+class HashedUploadMixin:
+    """Hash uploaded files while they stream in and store them by content"""
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers.insert(0, Sha256UploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
+    def stored_file_fields(self):
+        file_obj = self.request.FILES.get('file')
+        if not file_obj:
+            return {}
+        digest = getattr(self.request, 'upload_digests', {}).get('file')
+        return store_document_file(file_obj, file_obj.name, digest)
+
+class DocumentListView(HashedUploadMixin, generics.ListCreateAPIView):
     serializer_class = DocumentSerializer
     
     def get_queryset(self):
-        queryset = Document.objects.filter(is_active=True)
+        queryset = Document.objects.filter(is_active=True).select_related('preview')
         category = self.request.query_params.get('category', None)
         if category:
             queryset = queryset.filter(category=category)
         return queryset
     
     def perform_create(self, serializer):
-        # Calculate file size
-        file_obj = self.request.FILES.get('file')
-        if file_obj:
-            serializer.save(
-                file_size=file_obj.size
-            )
+        # Size and hash come from the stored bytes, not the client. The blob
+        # reference is taken in the save's transaction, so a failed save
+        # leaves no extra ref_count behind
+        with transaction.atomic():
+            fields = self.stored_file_fields()
+            if fields:
+                document = serializer.save(**fields)
+                queue_indexing(document)
+                queue_previews(document)
+                queue_compression(document)
 
-class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Document.objects.filter(is_active=True)
+class DocumentDetailView(HashedUploadMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Document.objects.filter(is_active=True).select_related('preview')
     serializer_class = DocumentSerializer
 
-@api_view(['POST'])
+    def perform_update(self, serializer):
+        previous_blob = serializer.instance.blob_id
+        with transaction.atomic():
+            fields = self.stored_file_fields()
+            document = serializer.save(**fields)
+            if fields:
+                release_blob(previous_blob)
+                queue_indexing(document)
+                queue_previews(document)
+                queue_compression(document)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            release_blob(instance.blob_id)
+
+@api_view(['GET', 'POST'])
 def download_document(request, pk):
-    """Download a document and increment download count"""
-    document = get_object_or_404(Document, pk=pk, is_active=True)
-    
-    # Increment download count
-    document.download_count += 1
-    document.save(update_fields=['download_count'])
-    
-    # Return file response
+    """Download a document and increment download count.
+
+    Streams the file (or hands it to the proxy, see ``DOCUMENT_SENDFILE``),
+    with ETag/``If-None-Match`` revalidation and ``Range`` requests for resume.
+    """
+    document = get_object_or_404(Document.objects.prefetch_related('variants'), pk=pk, is_active=True)
+    variant = pick_variant(document, request.headers.get('Accept-Encoding'))
+
     try:
-        response = HttpResponse(
-            document.file.read(),
-            content_type='application/octet-stream'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{document.file.name.split("/")[-1]}"'
-        return response
-    except Exception as e:
+        response, counts = document_file_response(request, document, variant)
+    except OSError:
         return Response(
-            {'error': 'File not found'}, 
+            {'error': 'File not found'},
             status=status.HTTP_404_NOT_FOUND
         )
 
+    if counts:
+        counters.increment(Document, document.pk, 'download_count')
+    return response
+
+@api_view(['GET', 'POST'])
+def download_bundle(request):
+    """Download several documents as one ZIP archive, streamed as it is built.
+
+    Pass ``ids`` (a list, or comma-separated in the query string) or a
+    ``category``. Every included document counts as one download.
+    """
+    params = request.data if request.method == 'POST' else request.query_params
+    category = params.get('category')
+    if hasattr(params, 'getlist'):
+        # Query strings and form posts: ids=1&ids=2 or ids=1,2
+        ids = [value for raw in params.getlist('ids') for value in raw.split(',') if value.strip()]
+    else:
+        ids = params.get('ids')
+        if isinstance(ids, str):
+            ids = [value for value in ids.split(',') if value.strip()]
+    if not ids and not category:
+        return Response({'error': 'Pass ids or a category'}, status=status.HTTP_400_BAD_REQUEST)
+
+    documents = Document.objects.filter(is_active=True)
+    if ids:
+        try:
+            ids = list(dict.fromkeys(int(value) for value in ids))
+        except (TypeError, ValueError):
+            return Response({'error': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        documents = documents.filter(pk__in=ids)
+    if category:
+        documents = documents.filter(category=category)
+    documents = list(documents.order_by('title', 'id')[:settings.DOCUMENT_BUNDLE_MAX_FILES + 1])
+
+    if ids:
+        found = {document.pk for document in documents}
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            return Response({'error': 'Documents not found', 'missing': missing}, status=status.HTTP_404_NOT_FOUND)
+        # Keep the order the client asked for
+        documents.sort(key=lambda document: ids.index(document.pk))
+    if not documents:
+        return Response({'error': 'No documents to bundle'}, status=status.HTTP_404_NOT_FOUND)
+    if len(documents) > settings.DOCUMENT_BUNDLE_MAX_FILES:
+        return Response(
+            {'error': f'At most {settings.DOCUMENT_BUNDLE_MAX_FILES} documents per bundle'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # One UPDATE for the whole bundle, now or at the next counter flush
+    counters.increment_many(Document, [document.pk for document in documents], 'download_count')
+    filename = f"documents-{category or 'bundle'}-{timezone.localdate():%Y%m%d}.zip"
+    response = StreamingHttpResponse(stream_zip(documents), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    # Let nginx pass bytes on as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _preview_image(request, pk, field):
+    preview = get_object_or_404(
+        DocumentPreview, document_id=pk, document__is_active=True, status=DocumentPreview.DONE
+    )
+    etag = f'"{preview.sha256}-{field}"'
+    # URLs from the serializer carry the file hash, so their content never changes
+    if request.query_params.get('v') and preview.sha256.startswith(request.query_params['v']):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = 'public, max-age=300'
+
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+    else:
+        image = getattr(preview, field)
+        try:
+            response = FileResponse(image.storage.open(image.name, 'rb'), content_type='image/jpeg')
+        except OSError:
+            return Response({'error': 'Preview not found'}, status=status.HTTP_404_NOT_FOUND)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+@api_view(['GET'])
+def document_thumbnail(request, pk):
+    """First-page thumbnail (JPEG) of a document"""
+    return _preview_image(request, pk, 'thumbnail')
+
+@api_view(['GET'])
+def document_preview(request, pk):
+    """Larger first-page preview (JPEG) of a document"""
+    return _preview_image(request, pk, 'image')
+
+@api_view(['POST'])
+def upload_session_create(request):
+    """Start a resumable upload; send the bytes with PUT to the session"""
+    serializer = UploadSessionSerializer(data=request.data)
+    if serializer.is_valid():
+        session = start_session(**serializer.validated_data)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+def upload_session_detail(request, session_id):
+    """
+    GET: Session progress; resume from ``received``
+    PUT: Store one chunk. Needs ``Content-Range: bytes start-end/total``;
+         ``X-Chunk-SHA256`` optionally verifies the chunk
+    DELETE: Abandon the upload
+    """
+    session = get_object_or_404(UploadSession, pk=session_id)
+
+    if request.method == 'GET':
+        return Response(UploadSessionSerializer(session).data)
+
+    if session.is_complete:
+        return Response({'error': 'Upload already completed'}, status=status.HTTP_409_CONFLICT)
+
+    if request.method == 'DELETE':
+        discard_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    try:
+        start, end = parse_content_range(request.headers.get('Content-Range'), session)
+        received = write_chunk(session, request.stream, start, end, request.headers.get('X-Chunk-SHA256', ''))
+    except UploadError as e:
+        return Response({'error': str(e), 'received': session.received}, status=e.status)
+    return Response({'received': received, 'total_size': session.total_size})
+
+@api_view(['POST'])
+def upload_session_complete(request, session_id):
+    """Verify the uploaded bytes and create the Document"""
+    get_object_or_404(UploadSession, pk=session_id)
+    try:
+        document = complete_session(session_id)
+    except UploadError as e:
+        return Response({'error': str(e)}, status=e.status)
+    return Response(DocumentSerializer(document).data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+def document_search(request):
+    """Full-text search inside document contents.
+
+    ``q`` is the query, ``limit`` caps the hits (default 20, max 100) and
+    ``category`` narrows them. Results are ranked best first, each with an
+    HTML snippet whose matches are wrapped in ``<mark>``.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    hits = search_documents(query, limit, request.query_params.get('category'))
+    documents = Document.objects.select_related('preview').in_bulk([document_id for document_id, _, _ in hits])
+    results = [
+        {**DocumentSerializer(documents[document_id]).data, 'rank': rank, 'snippet': snippet}
+        for document_id, rank, snippet in hits
+        if document_id in documents
+    ]
+    return Response({'query': query, 'count': len(results), 'results': results})
+
 @api_view(['GET'])
 def document_categories(request):
     """Get list of available document categories"""
@@ -0,0 +1,31 @@
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import NewsFeedSnapshot
+
+# Query parameters that change the feed; anything else is ignored
+FEED_PARAMS = ('category', 'priority', 'page')
+
+
+def snapshot_key(request):
+    params = {name: request.query_params.get(name, '') for name in FEED_PARAMS}
+    params['page'] = params['page'] or '1'
+    # Pagination links are absolute, so the host is part of the key
+    return f"{request.scheme}://{request.get_host()}/?{urlencode(params)}"[:255]
+
+
+def cached_feed(key):
+    """The stored JSON body for ``key``, or None when missing or stale"""
+    now = timezone.now()
+    return (
+        NewsFeedSnapshot.objects.filter(key=key)
+        .filter(Q(valid_until__isnull=True) | Q(valid_until__gt=now))
+        .values_list('body', flat=True)
+        .first()
+    )
+
+
+def store_feed(key, body, valid_until):
+    NewsFeedSnapshot.objects.update_or_create(key=key, defaults={'body': body, 'valid_until': valid_until})
@@ -0,0 +1,51 @@
+"""Pure Pillow resizing for video thumbnails.
+
+Nothing here imports Django, so it can run in the spawned process pool.
+"""
+import io
+
+from PIL import Image, ImageOps, features
+
+# MIME subtype -> Pillow save options
+FORMAT_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def supported_formats():
+    """WebP when this Pillow build can write it, always JPEG as the fallback"""
+    return [name for name in FORMAT_OPTIONS if name != 'webp' or features.check('webp')]
+
+
+def render_variants(source, widths, formats):
+    """Resize an image to each width in ``widths``, encoded in each of ``formats``.
+
+    ``source`` is a local path or the image bytes. Images are never
+    enlarged: widths above the original collapse to one variant at the
+    original width. Returns ``{format: {width: bytes}}``.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with Image.open(source) as original:
+        # JPEG decoding can skip straight to a reduced scale
+        original.draft('RGB', (max(widths), max(widths) * 2))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+
+        rendered = {name: {} for name in formats}
+        # Largest first, so each smaller size resamples the previous result
+        for width in targets:
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for name in formats:
+                frame = image
+                if name == 'jpeg' and frame.mode == 'RGBA':
+                    frame = Image.new('RGB', frame.size, 'white')
+                    frame.paste(image, mask=image.getchannel('A'))
+                output = io.BytesIO()
+                frame.save(output, **FORMAT_OPTIONS[name])
+                rendered[name][width] = output.getvalue()
+    return rendered
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from news.models import Video
+from news.thumbnails import generate_many
+
+
+class Command(BaseCommand):
+    help = 'Render resized WebP/JPEG copies of video thumbnails across the process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render even videos whose variants are up to date',
+        )
+
+    def handle(self, *args, **options):
+        video_ids = list(Video.objects.exclude(thumbnail='').exclude(thumbnail=None).order_by('id').values_list('id', flat=True))
+        rendered = generate_many(video_ids, force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Rendered thumbnail variants for {rendered} video(s)"))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_published_at(apps, schema_editor):
+    # Items were shown from creation until now; keep them visible and in order
+    NewsItem = apps.get_model('news', 'NewsItem')
+    NewsItem.objects.filter(published_at__isnull=True).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_alter_newsitem_author_alter_video_uploaded_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsFeedSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Host, filters and page of the request', max_length=255, unique=True)),
+                ('body', models.TextField(help_text='Rendered JSON response')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='newsitem',
+            options={'ordering': ['-published_at', '-created_at'], 'verbose_name': 'News Item', 'verbose_name_plural': 'News Items'},
+        ),
+        migrations.AddField(
+            model_name='newsitem',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Hidden again from this time on', null=True),
+        ),
+        migrations.AlterField(
+            model_name='newsitem',
+            name='published_at',
+            field=models.DateTimeField(blank=True, help_text='Shown from this time on; set to now when left empty', null=True),
+        ),
+        migrations.RunPython(fill_published_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='newsitem',
+            index=models.Index(fields=['is_published', '-published_at'], name='newsitem_feed_idx'),
+        ),
+    ]
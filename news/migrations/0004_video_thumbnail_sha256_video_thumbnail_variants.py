@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_newsfeedsnapshot_alter_newsitem_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_sha256',
+            field=models.CharField(blank=True, help_text='Hash of the thumbnail the variants were made from', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized copies: {format: {width: path}}'),
+        ),
+    ]
@@ -1,4 +1,27 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+
+class NewsItemQuerySet(models.QuerySet):
+    def live(self, now=None):
+        """Published items whose publish time has come and whose expiry has not"""
+        now = now or timezone.now()
+        return self.filter(is_published=True, published_at__lte=now).filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+        )
+
+    def next_change(self, now=None):
+        """When the live set next changes on its own: the earliest future
+        publish or expiry time, or None"""
+        now = now or timezone.now()
+        published = self.filter(is_published=True)
+        times = [
+            published.filter(published_at__gt=now).aggregate(at=Min('published_at'))['at'],
+            published.filter(expires_at__gt=now).aggregate(at=Min('expires_at'))['at'],
+        ]
+        return min((at for at in times if at is not None), default=None)
+
 
 class NewsItem(models.Model):
     CATEGORY_CHOICES = [
@@ -22,18 +45,62 @@ class NewsItem(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     author = models.CharField(max_length=100, blank=True, help_text='Author name')
     is_published = models.BooleanField(default=True)
-    published_at = models.DateTimeField(null=True, blank=True)
+    published_at = models.DateTimeField(
+        null=True, blank=True, help_text='Shown from this time on; set to now when left empty'
+    )
+    expires_at = models.DateTimeField(null=True, blank=True, help_text='Hidden again from this time on')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = NewsItemQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-published_at', '-created_at']
         verbose_name = 'News Item'
         verbose_name_plural = 'News Items'
+        indexes = [
+            models.Index(fields=['is_published', '-published_at'], name='newsitem_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.published_at is None:
+            self.published_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'published_at'}
+        super().save(*args, **kwargs)
+        NewsFeedSnapshot.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        NewsFeedSnapshot.invalidate()
+        return result
+
+
+class NewsFeedSnapshot(models.Model):
+    """A rendered page of the news feed, served as-is until it goes stale.
+
+    Saving or deleting a NewsItem drops every snapshot. ``valid_until`` is the
+    next scheduled publish or expiry time for that feed.
+    """
+
+    key = models.CharField(max_length=255, unique=True, help_text='Host, filters and page of the request')
+    body = models.TextField(help_text='Rendered JSON response')
+    built_at = models.DateTimeField(auto_now=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.key
+
+    @classmethod
+    def invalidate(cls):
+        cls.objects.all().delete()
+        # Again after commit, in case a reader rebuilt from the old rows meanwhile
+        transaction.on_commit(lambda: cls.objects.all().delete())
+
 class Video(models.Model):
     VIDEO_TYPE_CHOICES = [
         ('training', 'Training'),
@@ -47,6 +114,8 @@ class Video(models.Model):
     description = models.TextField()
     video_type = models.CharField(max_length=20, choices=VIDEO_TYPE_CHOICES)
     thumbnail = models.ImageField(upload_to='video_thumbnails/', null=True, blank=True)
+    thumbnail_sha256 = models.CharField(max_length=64, blank=True, help_text='Hash of the thumbnail the variants were made from')
+    thumbnail_variants = models.JSONField(default=dict, blank=True, help_text='Resized copies: {format: {width: path}}')
     video_url = models.URLField(blank=True, help_text='External video URL (YouTube, Vimeo, etc.)')
     video_file = models.FileField(upload_to='videos/', null=True, blank=True, help_text='Local video file')
     duration = models.DurationField(null=True, blank=True)
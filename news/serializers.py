@@ -1,4 +1,6 @@
+from django.urls import reverse
 from rest_framework import serializers
+from depot_hub import counters
 from .models import NewsItem, Video
 
 class NewsItemSerializer(serializers.ModelSerializer):
@@ -9,10 +11,36 @@ class NewsItemSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
 
+    def validate(self, attrs):
+        published_at = attrs.get('published_at', getattr(self.instance, 'published_at', None))
+        expires_at = attrs.get('expires_at', getattr(self.instance, 'expires_at', None))
+        if published_at and expires_at and expires_at <= published_at:
+            raise serializers.ValidationError({'expires_at': 'Must be after published_at.'})
+        return attrs
+
 class VideoSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
+    thumbnail_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Video
         fields = '__all__'
-        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at', 'view_count']
\ No newline at end of file
+        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at', 'view_count', 'thumbnail_sha256']
+
+    def to_representation(self, video):
+        data = super().to_representation(video)
+        # Include views still waiting to be written
+        data['view_count'] += counters.pending(Video, video.pk, 'view_count')
+        return data
+
+    def get_thumbnail_variants(self, video):
+        """``{format: {width: url}}``; URLs carry the image hash and can be cached forever"""
+        request = self.context.get('request')
+        variants = {}
+        for image_format, sizes in video.thumbnail_variants.items():
+            variants[image_format] = {}
+            for width in sorted(sizes, key=int):
+                url = reverse('video_thumbnail', args=[video.pk, int(width), image_format])
+                url = f'{url}?v={video.thumbnail_sha256[:16]}'
+                variants[image_format][width] = request.build_absolute_uri(url) if request else url
+        return variants
\ No newline at end of file
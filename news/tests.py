@@ -1,3 +1,115 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from depot_hub import tasks
+from PIL import Image
+
+from . import thumbnails
+from .models import NewsFeedSnapshot, NewsItem, Video
+
+
+class NewsFeedSnapshotTests(TestCase):
+    def setUp(self):
+        self.item = NewsItem.objects.create(title='Yard closed', summary='North yard', category='info')
+
+    def titles(self):
+        response = self.client.get('/api/news/')
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.json()['results']]
+
+    def test_feed_is_served_from_its_snapshot(self):
+        self.assertEqual(self.titles(), ['Yard closed'])
+        snapshot = NewsFeedSnapshot.objects.get()
+        self.assertIsNone(snapshot.valid_until)
+
+        NewsItem.objects.filter(pk=self.item.pk).update(title='Not seen')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(), ['Yard closed'])
+
+    def test_saving_or_deleting_an_item_drops_snapshots(self):
+        self.titles()
+        self.item.title = 'Yard open'
+        self.item.save()
+        self.assertEqual(self.titles(), ['Yard open'])
+
+        self.item.delete()
+        self.assertEqual(self.titles(), [])
+
+    def test_snapshot_expires_when_a_scheduled_item_goes_live(self):
+        publish_at = timezone.now() + timedelta(hours=1)
+        NewsItem.objects.create(title='Track works', summary='Line 2', category='maintenance', published_at=publish_at)
+        self.assertEqual(self.titles(), ['Yard closed'])
+        self.assertEqual(NewsFeedSnapshot.objects.get().valid_until, publish_at)
+
+        with mock.patch('django.utils.timezone.now', return_value=publish_at + timedelta(minutes=1)):
+            self.assertEqual(self.titles(), ['Track works', 'Yard closed'])
+
+
+class VideoThumbnailTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        path = default_storage.save('video_thumbnails/variants/ab/abc/320.jpg', ContentFile(b'jpeg bytes'))
+        self.video = Video.objects.create(
+            title='Induction', description='Site induction', video_type='training',
+            thumbnail_sha256='abc', thumbnail_variants={'jpeg': {'320': path}},
+        )
+        self.url = f'/api/news/videos/{self.video.pk}/thumbnails/320.jpeg'
+        self.etag = '"abc-320-jpeg"'
+
+    def test_revalidation_accepts_lists_weak_tags_and_star(self):
+        for header in (self.etag, f'"other", {self.etag}', f'W/{self.etag}', '*'):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], self.etag)
+
+    def test_stale_tag_gets_the_image(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"abc-640-jpeg"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'jpeg bytes')
+
+
+class ThumbnailVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, VIDEO_THUMBNAIL_WIDTHS=[320, 640]))
+        # Render in threads; a spawned pool would start a fresh interpreter per test
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        self.enterContext(mock.patch.object(tasks, '_process_pool', pool))
+
+    def create_video(self, width=480):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, width // 2), 'blue').save(buffer, 'PNG')
+        path = default_storage.save('video_thumbnails/induction.png', ContentFile(buffer.getvalue()))
+        return Video.objects.create(title='Induction', description='Site induction', video_type='training', thumbnail=path)
+
+    def test_variants_are_never_enlarged(self):
+        video = self.create_video()
+        thumbnails.generate_thumbnail_variants(video.pk)
+        video.refresh_from_db()
+
+        # 640 px collapses to the 480 px original
+        self.assertEqual(set(video.thumbnail_variants['jpeg']), {'320', '480'})
+        with default_storage.open(video.thumbnail_variants['jpeg']['320']) as handle:
+            self.assertEqual(Image.open(handle).size, (320, 160))
+
+    def test_same_image_reuses_variants(self):
+        first = self.create_video()
+        thumbnails.generate_many([first.pk])
+        second = self.create_video()
+        self.assertEqual(thumbnails.generate_many([second.pk]), 0)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.thumbnail_variants, first.thumbnail_variants)
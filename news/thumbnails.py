@@ -0,0 +1,124 @@
+"""Resized WebP/JPEG copies of video thumbnails.
+
+The originals are often several megabytes; cards only need a few hundred
+pixels. Copies are rendered in the process pool and named by the
+original's hash, so their URLs can be cached forever.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from depot_hub.tasks import completed_in_processes, get_process_pool, run_in_background
+
+from . import imaging
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PREFIX = 'video_thumbnails/variants'
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def variant_path(sha256, width, image_format):
+    return f'{VARIANT_PREFIX}/{sha256[:2]}/{sha256}/{width}.{EXTENSIONS[image_format]}'
+
+
+def _thumbnail_sha256(video):
+    digest = hashlib.sha256()
+    with video.thumbnail.open('rb') as handle:
+        for chunk in handle.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _claim(video_id, force):
+    """Return ``(video, sha256, args)`` when variants must be rendered, else Nones"""
+    video = Video.objects.filter(pk=video_id).first()
+    if video is None or not video.thumbnail:
+        return None, None, None
+    sha256 = _thumbnail_sha256(video)
+    if not force:
+        if video.thumbnail_variants and video.thumbnail_sha256 == sha256:
+            return None, None, None
+        # Another video already uses the same image
+        twin = (
+            Video.objects.filter(thumbnail_sha256=sha256).exclude(pk=video.pk).exclude(thumbnail_variants={})
+            .values_list('thumbnail_variants', flat=True).first()
+        )
+        if twin:
+            _save(video, sha256, twin)
+            return None, None, None
+    try:
+        source = video.thumbnail.path
+    except NotImplementedError:
+        with video.thumbnail.open('rb') as handle:
+            source = handle.read()
+    return video, sha256, (source, settings.VIDEO_THUMBNAIL_WIDTHS, imaging.supported_formats())
+
+
+def _store(video, sha256, rendered):
+    variants = {}
+    for image_format, sizes in rendered.items():
+        variants[image_format] = {}
+        for width, data in sizes.items():
+            path = variant_path(sha256, width, image_format)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            variants[image_format][str(width)] = default_storage.save(path, ContentFile(data))
+    _save(video, sha256, variants)
+
+
+def _save(video, sha256, variants):
+    previous = video.thumbnail_sha256
+    # Only if the thumbnail was not replaced again while we rendered
+    Video.objects.filter(pk=video.pk, thumbnail=video.thumbnail.name).update(
+        thumbnail_sha256=sha256, thumbnail_variants=variants
+    )
+    if previous and previous != sha256 and not Video.objects.filter(thumbnail_sha256=previous).exists():
+        _delete_variants(previous)
+
+
+def _delete_variants(sha256):
+    folder = f'{VARIANT_PREFIX}/{sha256[:2]}/{sha256}'
+    if default_storage.exists(folder):
+        for name in default_storage.listdir(folder)[1]:
+            default_storage.delete(f'{folder}/{name}')
+
+
+def generate_thumbnail_variants(video_id, force=False):
+    """Render one video's thumbnail variants in the process pool and wait for them"""
+    video, sha256, args = _claim(video_id, force)
+    if video is not None:
+        _store(video, sha256, get_process_pool().submit(imaging.render_variants, *args).result())
+
+
+def generate_many(video_ids, force=False):
+    """Render many videos' variants in parallel across the pool; returns the count rendered"""
+    def jobs():
+        for video_id in video_ids:
+            try:
+                video, sha256, args = _claim(video_id, force)
+            except OSError as e:
+                logger.warning('Cannot read thumbnail of video %s: %s', video_id, e)
+                continue
+            if video is not None:
+                yield (video, sha256), args
+
+    rendered = 0
+    for (video, sha256), future in completed_in_processes(imaging.render_variants, jobs()):
+        try:
+            _store(video, sha256, future.result())
+            rendered += 1
+        except Exception as e:
+            logger.warning('Thumbnail variants failed for video %s: %s', video.pk, e)
+    return rendered
+
+
+def queue_thumbnail_variants(video):
+    """Drop ``video``'s variants and render new ones once the transaction commits"""
+    Video.objects.filter(pk=video.pk).update(thumbnail_variants={})
+    video.thumbnail_variants = {}
+    if video.thumbnail:
+        run_in_background(generate_thumbnail_variants, video.pk)
@@ -6,6 +6,7 @@ urlpatterns = [
     path('<int:pk>/', views.NewsDetailView.as_view(), name='news_detail'),
     path('videos/', views.VideoListView.as_view(), name='video_list'),
     path('videos/<int:pk>/', views.VideoDetailView.as_view(), name='video_detail'),
+    path('videos/<int:pk>/thumbnails/<int:width>.<slug:image_format>', views.video_thumbnail, name='video_thumbnail'),
     path('videos/<int:pk>/view/', views.increment_video_views, name='increment_video_views'),
     path('videos/featured/', views.featured_videos, name='featured_videos'),
 ]
\ No newline at end of file
@@ -1,15 +1,22 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.core.files.storage import default_storage
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from depot_hub import counters
+from documents.downloads import etag_matches
+from .feed import cached_feed, snapshot_key, store_feed
 from .models import NewsItem, Video
 from .serializers import NewsItemSerializer, VideoSerializer
+from .thumbnails import queue_thumbnail_variants
 
 class NewsListView(generics.ListCreateAPIView):
     serializer_class = NewsItemSerializer
     
-    def get_queryset(self):
-        queryset = NewsItem.objects.filter(is_published=True)
+    def filter_feed(self, queryset):
         category = self.request.query_params.get('category', None)
         priority = self.request.query_params.get('priority', None)
         
@@ -19,14 +26,34 @@ class NewsListView(generics.ListCreateAPIView):
             queryset = queryset.filter(priority=priority)
             
         return queryset
+
+    def get_queryset(self):
+        return self.filter_feed(NewsItem.objects.live())
+
+    def list(self, request, *args, **kwargs):
+        """Serve the feed page from its snapshot, rebuilding it when missing or stale"""
+        key = snapshot_key(request)
+        body = cached_feed(key)
+        if body is None:
+            now = timezone.now()
+            response = super().list(request, *args, **kwargs)
+            body = JSONRenderer().render(response.data).decode()
+            # Rebuild again when a scheduled item of this feed goes live or expires
+            store_feed(key, body, self.filter_feed(NewsItem.objects.all()).next_change(now))
+        return HttpResponse(body, content_type='application/json')
     
     def perform_create(self, serializer):
         serializer.save()
 
 class NewsDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = NewsItem.objects.filter(is_published=True)
     serializer_class = NewsItemSerializer
 
+    def get_queryset(self):
+        # Scheduled and unpublished items stay editable
+        if self.request.method == 'GET':
+            return NewsItem.objects.live()
+        return NewsItem.objects.all()
+
 class VideoListView(generics.ListCreateAPIView):
     serializer_class = VideoSerializer
     
@@ -40,19 +67,53 @@ class VideoListView(generics.ListCreateAPIView):
         return queryset
     
     def perform_create(self, serializer):
-        serializer.save()
+        video = serializer.save()
+        queue_thumbnail_variants(video)
 
 class VideoDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Video.objects.filter(is_active=True)
     serializer_class = VideoSerializer
 
+    def perform_update(self, serializer):
+        video = serializer.save()
+        if 'thumbnail' in serializer.validated_data:
+            queue_thumbnail_variants(video)
+
 @api_view(['POST'])
 def increment_video_views(request, pk):
     """Increment video view count"""
+    video = get_object_or_404(Video.objects.only('pk', 'view_count'), pk=pk, is_active=True)
+    # Coalesced with other views and written in a batch
+    counters.increment(Video, video.pk, 'view_count')
+    view_count = video.view_count + counters.pending(Video, video.pk, 'view_count')
+    return Response({'message': 'View count updated', 'view_count': view_count})
+
+@api_view(['GET'])
+def video_thumbnail(request, pk, width, image_format):
+    """A resized WebP/JPEG copy of a video's thumbnail"""
     video = get_object_or_404(Video, pk=pk, is_active=True)
-    video.view_count += 1
-    video.save(update_fields=['view_count'])
-    return Response({'message': 'View count updated'})
+    path = video.thumbnail_variants.get(image_format, {}).get(str(width))
+    if not path:
+        return Response({'error': 'Thumbnail variant not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    etag = f'"{video.thumbnail_sha256}-{width}-{image_format}"'
+    # URLs from the serializer carry the image hash, so their content never changes
+    version = request.query_params.get('v')
+    if version and video.thumbnail_sha256.startswith(version):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = 'public, max-age=300'
+
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            response = FileResponse(default_storage.open(path, 'rb'), content_type=f'image/{image_format}')
+        except OSError:
+            return Response({'error': 'Thumbnail variant not found'}, status=status.HTTP_404_NOT_FOUND)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
 
 @api_view(['GET'])
 def featured_videos(request):
@@ -1,9 +1,70 @@
-from django.contrib import admin
-from .models import CheckInRecord
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.utils import timezone
+from .models import CheckInRecord, Company, EmployeeAttendance, Reason, Visitor
+from .services import CHECK_OUT, RE_CHECK_IN, apply_transition_to_queryset, check_out_stale
 
 @admin.register(CheckInRecord)
 class CheckInRecordAdmin(admin.ModelAdmin):
-    list_display = ('name', 'company', 'status', 'check_in_time', 'check_out_time', 'reason')
+    list_display = ('visitor', 'company', 'status', 'check_in_time', 'check_out_time', 'reason')
+    list_filter = ('status', 'created_at')
+    list_select_related = ('visitor', 'company', 'reason')
+    search_fields = ('visitor__name', 'company__name', 'reason__label')
+    autocomplete_fields = ('visitor', 'company', 'reason')
+    # State changes go only through the actions below, the same transitions
+    # the API uses
+    readonly_fields = ('status', 'check_in_time', 'check_out_time', 'created_at', 'updated_at')
+    actions = ['check_out_selected', 're_check_in_selected', 'check_out_stale_selected']
+
+    def _apply_transition(self, request, queryset, transition, label):
+        updated = apply_transition_to_queryset(queryset, transition)
+        skipped = queryset.count() - updated
+        self.message_user(request, f'{label} {updated} visitor(s); {skipped} skipped.', messages.SUCCESS)
+
+    @admin.action(description='Check out selected visitors')
+    def check_out_selected(self, request, queryset):
+        self._apply_transition(request, queryset, CHECK_OUT, 'Checked out')
+
+    @admin.action(description='Re-check in selected visitors')
+    def re_check_in_selected(self, request, queryset):
+        self._apply_transition(request, queryset, RE_CHECK_IN, 'Re-checked in')
+
+    @admin.action(description=f'Check out selected visitors checked in over {settings.DEPOT_AUTO_CHECKOUT_HOURS}h ago')
+    def check_out_stale_selected(self, request, queryset):
+        cutoff = timezone.now() - timedelta(hours=settings.DEPOT_AUTO_CHECKOUT_HOURS)
+        started = time.monotonic()
+        checked_out, _ = check_out_stale(cutoff, queryset=queryset)
+        self.message_user(
+            request,
+            f'Checked out {checked_out} stale visitor(s) in {time.monotonic() - started:.2f}s.',
+            messages.SUCCESS
+        )
+
+
+@admin.register(Company)
+class CompanyAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(Reason)
+class ReasonAdmin(admin.ModelAdmin):
+    search_fields = ('label',)
+
+
+@admin.register(Visitor)
+class VisitorAdmin(admin.ModelAdmin):
+    list_display = ('name', 'company')
+    list_select_related = ('company',)
+    search_fields = ('name', 'company__name')
+    autocomplete_fields = ('company',)
+
+
+@admin.register(EmployeeAttendance)
+class EmployeeAttendanceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'employee_id', 'status', 'check_in_time', 'check_out_time')
     list_filter = ('status', 'created_at')
-    search_fields = ('name', 'company', 'reason')
+    search_fields = ('employee_id', 'name')
     readonly_fields = ('created_at', 'updated_at')
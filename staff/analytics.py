@@ -0,0 +1,202 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import connection
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When, Window
+from django.db.models.functions import ExtractHour, Lead
+from django.utils import timezone
+
+from .models import CheckInEvent, DepotDailyStats, DepotOccupancy
+
+ARRIVAL_TYPES = [CheckInEvent.CHECK_IN, CheckInEvent.RE_CHECK_IN]
+
+# Upper bounds in minutes; visits still open after a day fall into 'open'
+DWELL_BUCKETS = [
+    ('<15m', 15),
+    ('15-30m', 30),
+    ('30-60m', 60),
+    ('1-2h', 120),
+    ('2-4h', 240),
+    ('4-8h', 480),
+    ('8h+', None),
+]
+
+OCCUPANCY_DELTA = Case(
+    When(event_type=CheckInEvent.CHECK_OUT, then=Value(-1)),
+    default=Value(1),
+    output_field=IntegerField(),
+)
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def is_closed(day):
+    """A day's stats are final once the dwell look-ahead window has passed"""
+    _, end = day_bounds(day)
+    return timezone.now() >= end + timedelta(days=1)
+
+
+def _opening_occupancy(day, start):
+    previous = DepotDailyStats.objects.filter(day=day - timedelta(days=1)).first()
+    if previous is not None:
+        return previous.payload['closing_occupancy']
+    # Walk back from the live projection; cheap for the recent days we
+    # are usually asked about
+    on_site = DepotOccupancy.objects.aggregate(total=Sum('count'))['total'] or 0
+    since = CheckInEvent.objects.filter(occurred_at__gte=start).aggregate(total=Sum(OCCUPANCY_DELTA))['total']
+    return on_site - (since or 0)
+
+
+def _minutes_between(start, end):
+    """SQL for the minutes from column ``start`` to column ``end``"""
+    if connection.vendor == 'postgresql':
+        return f'EXTRACT(EPOCH FROM ({end} - {start})) / 60'
+    return f'(julianday({end}) - julianday({start})) * 1440'
+
+
+def _hourly_levels(events):
+    """``{local hour: (peak running total, net change)}`` for the hours with events.
+
+    The running total comes from a window function; the outer query folds
+    it into one row per hour so only those rows leave the database.
+    """
+    running = (
+        events.annotate(
+            hour=ExtractHour('occurred_at'),
+            delta=OCCUPANCY_DELTA,
+            running=Window(Sum(OCCUPANCY_DELTA), order_by=[F('occurred_at').asc(), F('id').asc()]),
+        )
+        .order_by()
+        .values('hour', 'delta', 'running')
+    )
+    sql, params = running.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT hour, MAX(running), SUM(delta) FROM ({sql}) running GROUP BY hour",
+            params,
+        )
+        return {hour: (peak, delta) for hour, peak, delta in cursor.fetchall()}
+
+
+def _dwell_counts(start, end):
+    """Visits that began in ``[start, end)`` per dwell bucket, counted in SQL"""
+    # Pair each arrival with the record's next event; look one day ahead
+    # so overnight visits still get a dwell time
+    order = [F('occurred_at').asc(), F('id').asc()]
+    visits = (
+        CheckInEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=end + timedelta(days=1))
+        .annotate(
+            next_type=Window(Lead('event_type'), partition_by=[F('record_id')], order_by=order),
+            next_at=Window(Lead('occurred_at'), partition_by=[F('record_id')], order_by=order),
+        )
+        .order_by()
+        .values('event_type', 'occurred_at', 'next_type', 'next_at')
+    )
+    sql, params = visits.query.sql_with_params()
+    minutes = _minutes_between('visit.occurred_at', 'visit.next_at')
+    buckets = ' '.join(
+        f"WHEN {minutes} < {upper} THEN '{label}'" if upper is not None else f"ELSE '{label}'"
+        for label, upper in DWELL_BUCKETS
+    )
+    arrivals = ', '.join(str(event_type) for event_type in ARRIVAL_TYPES)
+    # Filtered outside the window so LEAD still sees every event
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT CASE WHEN visit.next_type = {CheckInEvent.CHECK_OUT} THEN CASE {buckets} END "
+            f"ELSE 'open' END AS bucket, COUNT(*) "
+            f"FROM ({sql}) visit "
+            f"WHERE visit.event_type IN ({arrivals}) AND visit.occurred_at < %s "
+            f"GROUP BY 1",
+            [*params, connection.ops.adapt_datetimefield_value(end)],
+        )
+        counts = dict(cursor.fetchall())
+    return {label: counts.get(label, 0) for label in [*(label for label, _ in DWELL_BUCKETS), 'open']}
+
+
+def compute_day(day):
+    """Aggregate one day's visits straight from the event log"""
+    start, end = day_bounds(day)
+    events = CheckInEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=end)
+    opening = _opening_occupancy(day, start)
+
+    per_company = Counter()
+    company_rows = (
+        events.filter(event_type__in=ARRIVAL_TYPES)
+        .values('record__company__name')
+        .annotate(visits=Count('id'))
+        .order_by()
+    )
+    for row in company_rows:
+        per_company[row['record__company__name'] or 'Unknown'] += row['visits']
+
+    # Peak and closing level per hour, from the per-hour aggregates
+    hourly = _hourly_levels(events)
+    curve = []
+    level = opening
+    for hour in range(24):
+        if hour in hourly:
+            peak, delta = hourly[hour]
+            curve.append({'hour': hour, 'peak': opening + peak, 'end': level + delta})
+            level += delta
+        else:
+            curve.append({'hour': hour, 'peak': level, 'end': level})
+    closing = level
+
+    dwell = _dwell_counts(start, end)
+
+    return {
+        'date': day.isoformat(),
+        'visits': sum(per_company.values()),
+        'opening_occupancy': opening,
+        'closing_occupancy': closing,
+        'peak_occupancy': max(bucket['peak'] for bucket in curve),
+        'hourly_occupancy': curve,
+        'dwell': dwell,
+        'per_company': dict(per_company),
+    }
+
+
+def _compute_and_cache(day):
+    payload = compute_day(day)
+    if is_closed(day):
+        DepotDailyStats.objects.update_or_create(day=day, defaults={'payload': payload})
+    return payload
+
+
+def daily_stats(day):
+    """Stats for ``day``, served from the cache once the day is closed"""
+    cached = DepotDailyStats.objects.filter(day=day).first()
+    if cached is not None:
+        return cached.payload
+    return _compute_and_cache(day)
+
+
+def range_stats(first_day, last_day):
+    """Per-day stats for ``first_day..last_day`` inclusive, plus range totals"""
+    cached = {
+        stats.day: stats.payload
+        for stats in DepotDailyStats.objects.filter(day__gte=first_day, day__lte=last_day)
+    }
+    days = []
+    day = first_day
+    while day <= last_day:
+        days.append(cached[day] if day in cached else _compute_and_cache(day))
+        day += timedelta(days=1)
+
+    per_company = Counter()
+    dwell = Counter()
+    for stats in days:
+        per_company.update(stats['per_company'])
+        dwell.update(stats['dwell'])
+    return {
+        'days': days,
+        'totals': {
+            'visits': sum(stats['visits'] for stats in days),
+            'peak_occupancy': max((stats['peak_occupancy'] for stats in days), default=0),
+            'per_company': dict(per_company.most_common()),
+            'dwell': dict(dwell),
+        },
+    }
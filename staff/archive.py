@@ -0,0 +1,113 @@
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .analytics import daily_stats
+from .models import ArchivedCheckInRecord, CheckInRecord
+
+# Archived rows keep the names as plain text, so they need no lookup rows
+ARCHIVED_FIELDS = {
+    'id': 'id',
+    'company': 'company__name',
+    'name': 'visitor__name',
+    'reason': 'reason__label',
+    'check_in_time': 'check_in_time',
+    'check_out_time': 'check_out_time',
+    'status': 'status',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+def month_start(day):
+    return timezone.make_aware(datetime.combine(day.replace(day=1), time.min))
+
+
+def next_month(start):
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def ensure_partition(start):
+    """Create the archive partition holding the month beginning at ``start``.
+
+    A no-op outside PostgreSQL, where the archive is a plain table.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    table = ArchivedCheckInRecord._meta.db_table
+    partition = f"{table}_y{start.year}m{start.month:02d}"
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(partition)} PARTITION OF {qn(table)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, next_month(start)]
+        )
+
+
+def archive_month(start, batch_size=1000):
+    """Move checked-out records last active in the month starting at ``start``.
+
+    A record is one visitor's long-lived registration, reused on every
+    re-check-in, so it only leaves once its last change (``updated_at``) is
+    in a closed month. Works in primary-key batches, one short transaction
+    each, so the hot table is never locked for long. Visitors still on site
+    stay where they are. Returns the number of records moved.
+    """
+    end = next_month(start)
+    candidates = CheckInRecord.objects.filter(status='checked-out', updated_at__gte=start, updated_at__lt=end)
+    first_created = candidates.order_by('created_at').values_list('created_at', flat=True).first()
+    if first_created is None:
+        return 0
+
+    # The archive is partitioned by created_at, which may be months earlier
+    month = month_start(timezone.localtime(first_created).date())
+    while month < end:
+        ensure_partition(month)
+        month = next_month(month)
+    # Analytics join events to live records, so settle the daily stats of
+    # the records' lifetime before they leave the hot table
+    day = timezone.localtime(first_created).date()
+    while day < end.date():
+        daily_stats(day)
+        day += timedelta(days=1)
+
+    moved = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                candidates.filter(id__gt=last_id)
+                .select_for_update(of=('self',))
+                .order_by('id')
+                .values_list(*ARCHIVED_FIELDS.values())[:batch_size]
+            )
+            if not batch:
+                return moved
+            ArchivedCheckInRecord.objects.bulk_create(
+                ArchivedCheckInRecord(**dict(zip(ARCHIVED_FIELDS, row))) for row in batch
+            )
+            CheckInRecord.objects.filter(id__in=[row[0] for row in batch]).delete()
+        moved += len(batch)
+        last_id = batch[-1][0]
+
+
+def closed_months(before):
+    """Month starts, oldest first, that have checked-out records last active before ``before``"""
+    oldest = (
+        CheckInRecord.objects.filter(status='checked-out', updated_at__lt=before)
+        .order_by('updated_at')
+        .values_list('updated_at', flat=True)
+        .first()
+    )
+    months = []
+    if oldest is None:
+        return months
+    start = month_start(timezone.localtime(oldest).date())
+    while start < before:
+        months.append(start)
+        start = next_month(start)
+    return months
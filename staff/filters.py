@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import CheckInRecord
+
+
+def parse_bound(value, end=False):
+    """Parse an ISO date or datetime query value into an aware datetime.
+
+    A bare date used as an ``end`` bound is pushed to the following midnight
+    so ``date_to=2025-10-02`` still includes the whole of that day.
+    """
+    day = parse_date(value)
+    if day is not None:
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f"'{value}' is not a valid date or datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_day(value, default=None):
+    """Parse an optional ISO date query value"""
+    if not value:
+        return default
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"'{value}' is not a valid date")
+    return day
+
+
+def filter_checkin_records(queryset, params):
+    """Apply the depot listing filters (status, company, date range).
+
+    Raises ``ValueError`` with a client-facing message on bad input.
+    """
+    record_status = params.get('status')
+    if record_status:
+        if record_status not in dict(CheckInRecord.STATUS_CHOICES):
+            raise ValueError(f"Unknown status '{record_status}'")
+        queryset = queryset.filter(status=record_status)
+
+    company = params.get('company')
+    if company:
+        queryset = queryset.filter(company__name=company)
+
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    start = parse_bound(date_from) if date_from else None
+    end = parse_bound(date_to, end=True) if date_to else None
+    return queryset.created_between(start, end)
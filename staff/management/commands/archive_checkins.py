@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from staff.archive import archive_month, closed_months, month_start
+
+
+class Command(BaseCommand):
+    help = 'Move checked-out depot check-in records from closed months into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help='Archive months before this one (YYYY-MM); defaults to the current month',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Records moved per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['before']:
+            day = parse_date(f"{options['before']}-01")
+            if day is None:
+                raise CommandError('--before must look like YYYY-MM')
+        else:
+            day = timezone.localdate()
+        before = month_start(day)
+        if before > month_start(timezone.localdate()):
+            raise CommandError('Only closed months can be archived')
+
+        started = time.monotonic()
+        total = 0
+        for start in closed_months(before):
+            moved = archive_month(start, batch_size=options['batch_size'])
+            total += moved
+            if moved:
+                self.stdout.write(f"{start:%Y-%m}: archived {moved} record(s)")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Archived {total} record(s) in {time.monotonic() - started:.2f}s")
+        )
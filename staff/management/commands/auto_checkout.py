@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from staff.filters import parse_bound
+from staff.services import check_out_stale
+
+
+class Command(BaseCommand):
+    help = 'Check out depot visitors who are still checked in long after checking in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.DEPOT_AUTO_CHECKOUT_HOURS,
+            help='Hours since check-in after which a visitor counts as stale '
+                 '(default DEPOT_AUTO_CHECKOUT_HOURS)',
+        )
+        parser.add_argument(
+            '--before',
+            help='Explicit cutoff (ISO date or datetime); overrides --older-than',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Records checked out per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = parse_bound(options['before'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        else:
+            cutoff = timezone.now() - timedelta(hours=options['older_than'])
+
+        started = time.monotonic()
+        checked_out, batches = check_out_stale(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Checked out {checked_out} visitor(s) checked in before "
+                f"{timezone.localtime(cutoff):%Y-%m-%d %H:%M} "
+                f"in {batches} batch(es), {time.monotonic() - started:.2f}s"
+            )
+        )
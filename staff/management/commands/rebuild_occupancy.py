@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from staff.models import Company, DepotOccupancy, Reason
+from staff.services import compute_occupancy, rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify) the live depot occupancy projection from check-in records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report drift between the projection and the records, do not rewrite',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            expected = rebuild_occupancy()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✓ Rebuilt occupancy: {sum(expected.values())} on site in {len(expected)} group(s)"
+                )
+            )
+            return
+
+        expected = compute_occupancy()
+        actual = {
+            (row.company_id, row.reason_id): row.count
+            for row in DepotOccupancy.objects.filter(count__gt=0)
+        }
+        drift = {
+            group: (actual.get(group, 0), expected.get(group, 0))
+            for group in set(expected) | set(actual)
+            if actual.get(group, 0) != expected.get(group, 0)
+        }
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS(f"✓ Occupancy is consistent ({sum(expected.values())} on site)"))
+            return
+
+        companies = Company.objects.in_bulk({company_id for company_id, _ in drift})
+        reasons = Reason.objects.in_bulk({reason_id for _, reason_id in drift})
+        for (company_id, reason_id), (have, want) in sorted(drift.items()):
+            self.stdout.write(f"{companies[company_id]} / {reasons[reason_id]}: projection {have}, records {want}")
+        self.stdout.write(
+            self.style.ERROR(f"✗ {len(drift)} group(s) drifted; run without --verify to rebuild")
+        )
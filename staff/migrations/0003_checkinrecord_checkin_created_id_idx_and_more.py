@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0002_remove_checkinrecord_employee_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkinrecord',
+            index=models.Index(fields=['-created_at', '-id'], name='checkin_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkinrecord',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='checkin_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkinrecord',
+            index=models.Index(fields=['company', '-created_at', '-id'], name='checkin_company_created_idx'),
+        ),
+    ]
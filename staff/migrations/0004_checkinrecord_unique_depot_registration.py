@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_registrations(apps, schema_editor):
+    """Keep the most recently updated row of each (company, name, reason)"""
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    duplicates = (
+        CheckInRecord.objects.values('company', 'name', 'reason')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        ids = list(
+            CheckInRecord.objects.filter(
+                company=group['company'], name=group['name'], reason=group['reason']
+            ).order_by('-updated_at', '-id').values_list('id', flat=True)
+        )
+        CheckInRecord.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0003_checkinrecord_checkin_created_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_registrations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='checkinrecord',
+            constraint=models.UniqueConstraint(fields=('company', 'name', 'reason'), name='unique_depot_registration'),
+        ),
+    ]
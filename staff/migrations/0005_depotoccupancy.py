@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_occupancy(apps, schema_editor):
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    DepotOccupancy = apps.get_model('staff', 'DepotOccupancy')
+    groups = (
+        CheckInRecord.objects.filter(status='checked-in')
+        .values('company', 'reason')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    DepotOccupancy.objects.bulk_create(DepotOccupancy(**group) for group in groups)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0004_checkinrecord_unique_depot_registration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company', models.CharField(max_length=100)),
+                ('reason', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'staff_depotoccupancy',
+                'ordering': ['company', 'reason'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'reason'), name='unique_occupancy_group')],
+            },
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
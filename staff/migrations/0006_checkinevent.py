@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_events(apps, schema_editor):
+    """Seed the log with what the current records still remember"""
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    CheckInEvent = apps.get_model('staff', 'CheckInEvent')
+    events = []
+    for record in CheckInRecord.objects.exclude(check_in_time=None).order_by('id').iterator(chunk_size=1000):
+        events.append(CheckInEvent(record_id=record.id, event_type=1, occurred_at=record.check_in_time))
+        if record.status == 'checked-out' and record.check_out_time:
+            events.append(CheckInEvent(record_id=record.id, event_type=2, occurred_at=record.check_out_time))
+    events.sort(key=lambda event: event.occurred_at)
+    CheckInEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0005_depotoccupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.PositiveSmallIntegerField(choices=[(1, 'checkin'), (2, 'checkout'), (3, 'recheckin')])),
+                ('occurred_at', models.DateTimeField()),
+                ('record', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='staff.checkinrecord')),
+            ],
+            options={
+                'db_table': 'staff_checkinevent',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(seed_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+POSTGRES_ARCHIVE_TABLE = """
+CREATE TABLE staff_checkinrecord_archive (
+    id bigint NOT NULL,
+    company varchar(100) NOT NULL,
+    name varchar(100) NOT NULL,
+    reason varchar(100) NOT NULL,
+    check_in_time timestamp with time zone NULL,
+    check_out_time timestamp with time zone NULL,
+    status varchar(20) NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    updated_at timestamp with time zone NOT NULL,
+    archived_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at)
+"""
+
+
+def create_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # Partitioned tables need the partition key in the primary key
+        schema_editor.execute(POSTGRES_ARCHIVE_TABLE)
+    else:
+        schema_editor.create_model(apps.get_model('staff', 'ArchivedCheckInRecord'))
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('staff', 'ArchivedCheckInRecord'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0006_checkinevent'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.CreateModel(
+                name='ArchivedCheckInRecord',
+                fields=[
+                    ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                    ('company', models.CharField(max_length=100)),
+                    ('name', models.CharField(max_length=100)),
+                    ('reason', models.CharField(max_length=100)),
+                    ('check_in_time', models.DateTimeField(blank=True, null=True)),
+                    ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                    ('status', models.CharField(choices=[('checked-in', 'Checked In'), ('checked-out', 'Checked Out')], max_length=20)),
+                    ('created_at', models.DateTimeField()),
+                    ('updated_at', models.DateTimeField()),
+                    ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ],
+                options={
+                    'db_table': 'staff_checkinrecord_archive',
+                    'ordering': ['-created_at'],
+                },
+            ),
+        ]),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
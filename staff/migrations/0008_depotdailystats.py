@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0007_archivedcheckinrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepotDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('payload', models.JSONField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'staff_depotdailystats',
+                'ordering': ['-day'],
+            },
+        ),
+    ]
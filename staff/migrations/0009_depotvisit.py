@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_visits(apps, schema_editor):
+    """Pair every arrival in the event log with the checkout that ends it"""
+    CheckInEvent = apps.get_model('staff', 'CheckInEvent')
+    DepotVisit = apps.get_model('staff', 'DepotVisit')
+    visits = []
+    open_visits = {}
+    events = CheckInEvent.objects.order_by('occurred_at', 'id').values_list('record_id', 'event_type', 'occurred_at')
+    for record_id, event_type, occurred_at in events.iterator(chunk_size=2000):
+        if event_type == 2:
+            visit = open_visits.pop(record_id, None)
+            if visit is not None:
+                visit.ended_at = occurred_at
+        else:
+            visit = DepotVisit(record_id=record_id, started_at=occurred_at)
+            open_visits[record_id] = visit
+            visits.append(visit)
+    DepotVisit.objects.bulk_create(visits, batch_size=1000)
+
+
+def create_span_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX visit_span_gist ON staff_depotvisit "
+            "USING gist (tstzrange(started_at, ended_at, '[)'))"
+        )
+
+
+def drop_span_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS visit_span_gist")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0008_depotdailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepotVisit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('record', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='visits', to='staff.checkinrecord')),
+            ],
+            options={
+                'db_table': 'staff_depotvisit',
+                'ordering': ['started_at'],
+                'indexes': [models.Index(fields=['started_at'], name='visit_started_idx'), models.Index(fields=['ended_at'], name='visit_ended_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('ended_at__isnull', True), ('ended_at__gte', models.F('started_at')), _connector='OR'), name='visit_ends_after_start')],
+            },
+        ),
+        migrations.RunPython(build_visits, migrations.RunPython.noop),
+        migrations.RunPython(create_span_index, drop_span_index),
+    ]
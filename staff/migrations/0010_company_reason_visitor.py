@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0009_depotvisit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Companies',
+                'db_table': 'staff_company',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Reason',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'db_table': 'staff_reason',
+                'ordering': ['label'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Visitor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='visitors', to='staff.company')),
+            ],
+            options={
+                'db_table': 'staff_visitor',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'name'), name='unique_visitor_per_company')],
+            },
+        ),
+        migrations.AddField(
+            model_name='checkinrecord',
+            name='company_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='staff.company'),
+        ),
+        migrations.AddField(
+            model_name='checkinrecord',
+            name='visitor',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='checkin_records', to='staff.visitor'),
+        ),
+        migrations.AddField(
+            model_name='checkinrecord',
+            name='reason_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='staff.reason'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:29
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_lookups(apps, schema_editor):
+    """Point every record at deduplicated Company/Visitor/Reason rows, in batches"""
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    Company = apps.get_model('staff', 'Company')
+    Reason = apps.get_model('staff', 'Reason')
+    Visitor = apps.get_model('staff', 'Visitor')
+
+    last_id = 0
+    while True:
+        records = list(
+            CheckInRecord.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'company', 'name', 'reason')[:BATCH_SIZE]
+        )
+        if not records:
+            return
+        last_id = records[-1].id
+
+        company_names = {record.company for record in records}
+        Company.objects.bulk_create([Company(name=name) for name in company_names], ignore_conflicts=True)
+        companies = dict(Company.objects.filter(name__in=company_names).values_list('name', 'id'))
+
+        labels = {record.reason for record in records}
+        Reason.objects.bulk_create([Reason(label=label) for label in labels], ignore_conflicts=True)
+        reasons = dict(Reason.objects.filter(label__in=labels).values_list('label', 'id'))
+
+        pairs = {(companies[record.company], record.name) for record in records}
+        Visitor.objects.bulk_create(
+            [Visitor(company_id=company_id, name=name) for company_id, name in pairs],
+            ignore_conflicts=True,
+        )
+        visitors = {
+            (company_id, name): visitor_id
+            for visitor_id, company_id, name in Visitor.objects.filter(
+                company_id__in={company_id for company_id, _ in pairs},
+                name__in={name for _, name in pairs},
+            ).values_list('id', 'company_id', 'name')
+        }
+
+        for record in records:
+            record.company_ref_id = companies[record.company]
+            record.reason_ref_id = reasons[record.reason]
+            record.visitor_id = visitors[(record.company_ref_id, record.name)]
+        CheckInRecord.objects.bulk_update(records, ['company_ref', 'reason_ref', 'visitor'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0010_company_reason_visitor'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lookups, migrations.RunPython.noop),
+    ]
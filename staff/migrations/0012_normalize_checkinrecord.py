@@ -0,0 +1,112 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def restore_names(apps, schema_editor):
+    """Reverse only: copy the names back into the re-added text columns"""
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    records = CheckInRecord.objects.select_related('company_ref', 'visitor', 'reason_ref')
+    for record in records.iterator(chunk_size=1000):
+        record.company = record.company_ref.name
+        record.name = record.visitor.name
+        record.reason = record.reason_ref.label
+        record.save(update_fields=['company', 'name', 'reason'])
+
+
+def build_occupancy(apps, schema_editor):
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    DepotOccupancy = apps.get_model('staff', 'DepotOccupancy')
+    groups = (
+        CheckInRecord.objects.filter(status='checked-in')
+        .values('company_id', 'reason_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    DepotOccupancy.objects.bulk_create(DepotOccupancy(**group) for group in groups)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0011_backfill_lookups'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='checkinrecord',
+            name='unique_depot_registration',
+        ),
+        migrations.RemoveIndex(
+            model_name='checkinrecord',
+            name='checkin_company_created_idx',
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_names),
+        migrations.RemoveField(
+            model_name='checkinrecord',
+            name='company',
+        ),
+        migrations.RemoveField(
+            model_name='checkinrecord',
+            name='name',
+        ),
+        migrations.RemoveField(
+            model_name='checkinrecord',
+            name='reason',
+        ),
+        migrations.RenameField(
+            model_name='checkinrecord',
+            old_name='company_ref',
+            new_name='company',
+        ),
+        migrations.RenameField(
+            model_name='checkinrecord',
+            old_name='reason_ref',
+            new_name='reason',
+        ),
+        migrations.AlterField(
+            model_name='checkinrecord',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='checkin_records', to='staff.company'),
+        ),
+        migrations.AlterField(
+            model_name='checkinrecord',
+            name='visitor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='checkin_records', to='staff.visitor'),
+        ),
+        migrations.AlterField(
+            model_name='checkinrecord',
+            name='reason',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='checkin_records', to='staff.reason'),
+        ),
+        migrations.AddConstraint(
+            model_name='checkinrecord',
+            constraint=models.UniqueConstraint(fields=('visitor', 'reason'), name='unique_depot_registration'),
+        ),
+        migrations.AddIndex(
+            model_name='checkinrecord',
+            index=models.Index(fields=['company', '-created_at', '-id'], name='checkin_company_created_idx'),
+        ),
+        # The occupancy projection is rebuilt from the records below
+        migrations.DeleteModel(
+            name='DepotOccupancy',
+        ),
+        migrations.CreateModel(
+            name='DepotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='staff.company')),
+                ('reason', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='staff.reason')),
+            ],
+            options={
+                'db_table': 'staff_depotoccupancy',
+                'ordering': ['company', 'reason'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'reason'), name='unique_occupancy_group')],
+            },
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:31
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_name_keys(apps, schema_editor):
+    Visitor = apps.get_model('staff', 'Visitor')
+    last_id = 0
+    while True:
+        visitors = list(Visitor.objects.filter(id__gt=last_id).order_by('id').only('id', 'name')[:1000])
+        if not visitors:
+            return
+        for visitor in visitors:
+            visitor.name_key = ' '.join(visitor.name.split()).casefold()
+        Visitor.objects.bulk_update(visitors, ['name_key'])
+        last_id = visitors[-1].id
+
+
+def fill_last_seen(apps, schema_editor):
+    """Latest activity of each visitor's live and archived registrations"""
+    Visitor = apps.get_model('staff', 'Visitor')
+    CheckInRecord = apps.get_model('staff', 'CheckInRecord')
+    ArchivedCheckInRecord = apps.get_model('staff', 'ArchivedCheckInRecord')
+    live = dict(
+        CheckInRecord.objects.order_by().values('visitor_id').annotate(seen=Max('updated_at')).values_list('visitor_id', 'seen')
+    )
+    archived = {
+        (company, name): seen
+        for company, name, seen in ArchivedCheckInRecord.objects.order_by().values('company', 'name')
+        .annotate(seen=Max('updated_at')).values_list('company', 'name', 'seen')
+    }
+    last_id = 0
+    while True:
+        visitors = list(Visitor.objects.filter(id__gt=last_id).select_related('company').order_by('id')[:1000])
+        if not visitors:
+            return
+        for visitor in visitors:
+            seen = [at for at in (live.get(visitor.id), archived.get((visitor.company.name, visitor.name))) if at]
+            visitor.last_seen = max(seen, default=None)
+        Visitor.objects.bulk_update(visitors, ['last_seen'])
+        last_id = visitors[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0012_normalize_checkinrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitor',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.RunPython(fill_last_seen, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['name_key', 'last_seen'], name='visitor_name_seen_idx', opclasses=['varchar_pattern_ops', 'timestamptz_ops']),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0013_visitor_name_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedcheckinrecord',
+            index=models.Index(fields=['company', 'name'], name='archive_visitor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkinevent',
+            index=models.Index(fields=['record', 'occurred_at', 'id', 'event_type'], name='event_record_history_idx'),
+        ),
+        # Drop the plain record_id index only once its replacement exists
+        migrations.AlterField(
+            model_name='checkinevent',
+            name='record',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='staff.checkinrecord'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0014_event_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_id', models.CharField(max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('check_in_time', models.DateTimeField(blank=True, null=True)),
+                ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('checked-in', 'Checked In'), ('checked-out', 'Checked Out')], default='checked-out', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'staff_employeeattendance',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['employee_id', '-created_at', '-id'], name='attendance_employee_idx'), models.Index(fields=['-created_at', '-id'], name='attendance_created_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'checked-in')), fields=('employee_id',), name='unique_open_attendance')],
+            },
+        ),
+    ]
@@ -1,4 +1,110 @@
-from django.db import models
+from datetime import datetime, time, timedelta
+
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+
+class CheckInRecordQuerySet(models.QuerySet):
+    def created_between(self, start=None, end=None):
+        """Filter on the half-open ``[start, end)`` created_at range"""
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(created_at__gte=start)
+        if end is not None:
+            queryset = queryset.filter(created_at__lt=end)
+        return queryset
+
+    def created_on(self, day):
+        """Records created on ``day``, as an index-friendly range rather than ``__date``"""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return self.created_between(start, start + timedelta(days=1))
+
+    def created_today(self):
+        return self.created_on(timezone.localdate())
+
+    def with_names(self):
+        """Join the lookup tables the serialized record reads its names from"""
+        return self.select_related('company', 'visitor', 'reason')
+
+
+class Company(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        db_table = 'staff_company'
+        ordering = ['name']
+        verbose_name_plural = 'Companies'
+
+    def __str__(self):
+        return self.name
+
+
+class Reason(models.Model):
+    label = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        db_table = 'staff_reason'
+        ordering = ['label']
+
+    def __str__(self):
+        return self.label
+
+
+def normalize_name(name):
+    """Case- and whitespace-insensitive search key for a visitor name"""
+    return ' '.join(name.split()).casefold()
+
+
+class VisitorQuerySet(models.QuerySet):
+    def name_prefix(self, prefix):
+        """Visitors whose normalized name starts with ``prefix``, as an index range scan.
+
+        PostgreSQL gets ``LIKE 'prefix%'`` against the ``varchar_pattern_ops``
+        index; elsewhere the prefix becomes a ``[prefix, prefix + U+FFFF)``
+        range, which a plain (binary-collated) B-tree serves directly.
+        """
+        key = normalize_name(prefix)
+        if connections[self.db].vendor == 'postgresql':
+            return self.filter(name_key__startswith=key)
+        return self.filter(name_key__gte=key, name_key__lt=key + '\uffff')
+
+
+class Visitor(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, related_name='visitors')
+    name = models.CharField(max_length=100)
+    name_key = models.CharField(max_length=100, editable=False, default='')
+    # Last check-in, checkout or re-checkin under any reason; survives archiving
+    last_seen = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = VisitorQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'staff_visitor'
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'name'], name='unique_visitor_per_company'),
+        ]
+        indexes = [
+            # Serves the name_key prefix range scan; the matches are then sorted
+            # by last_seen, which the index orders only within one name_key
+            models.Index(
+                fields=['name_key', 'last_seen'], name='visitor_name_seen_idx',
+                opclasses=['varchar_pattern_ops', 'timestamptz_ops'],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.company})"
+
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
 
 class CheckInRecord(models.Model):
     STATUS_CHOICES = [
@@ -6,18 +112,262 @@ class CheckInRecord(models.Model):
         ('checked-out', 'Checked Out'),
     ]
 
-    company = models.CharField(max_length=100, default='Unknown')
-    name = models.CharField(max_length=100, default='Unknown')
-    reason = models.CharField(max_length=100, default='Unknown')
+    # company duplicates visitor.company so per-company filters and
+    # grouping need no join
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, related_name='checkin_records')
+    visitor = models.ForeignKey(Visitor, on_delete=models.PROTECT, related_name='checkin_records')
+    reason = models.ForeignKey(Reason, on_delete=models.PROTECT, related_name='checkin_records')
     check_in_time = models.DateTimeField(null=True, blank=True)
     check_out_time = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='checked-out')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CheckInRecordQuerySet.as_manager()
+
     class Meta:
         db_table = 'staff_checkinrecord'
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['visitor', 'reason'],
+                name='unique_depot_registration',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='checkin_created_id_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='checkin_status_created_idx'),
+            models.Index(fields=['company', '-created_at', '-id'], name='checkin_company_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.visitor.name} ({self.company}) - {self.reason}"
+
+
+class EmployeeAttendanceQuerySet(CheckInRecordQuerySet):
+    def latest_per_employee(self):
+        """Each employee's newest record, newest first, in one query.
+
+        Uses ``DISTINCT ON (employee_id)`` on PostgreSQL and a ``ROW_NUMBER()``
+        window elsewhere; both walk the ``(employee_id, created_at, id)`` index.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            latest = self.order_by('employee_id', '-created_at', '-id').distinct('employee_id')
+            return self.model.objects.filter(pk__in=latest.values('pk')).order_by('-created_at', '-id')
+        return self.annotate(
+            position=models.Window(
+                RowNumber(),
+                partition_by=[models.F('employee_id')],
+                order_by=[models.F('created_at').desc(), models.F('id').desc()],
+            )
+        ).filter(position=1).order_by('-created_at', '-id')
+
+
+class EmployeeAttendance(models.Model):
+    """One staff shift, from check-in to check-out"""
+
+    employee_id = models.CharField(max_length=20)
+    name = models.CharField(max_length=100)
+    check_in_time = models.DateTimeField(null=True, blank=True)
+    check_out_time = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=CheckInRecord.STATUS_CHOICES, default='checked-out')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EmployeeAttendanceQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'staff_employeeattendance'
+        ordering = ['-created_at']
+        constraints = [
+            # At most one open shift per employee
+            models.UniqueConstraint(
+                fields=['employee_id'],
+                condition=models.Q(status='checked-in'),
+                name='unique_open_attendance',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['employee_id', '-created_at', '-id'], name='attendance_employee_idx'),
+            models.Index(fields=['-created_at', '-id'], name='attendance_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.employee_id}) - {self.status}"
+
+
+class ArchivedCheckInRecord(models.Model):
+    """Checked-out CheckInRecord rows last active in a closed month.
+
+    A row moves back to CheckInRecord when its visitor returns.
+
+    On PostgreSQL the table is range-partitioned by month on ``created_at``
+    (partitions are created by ``archive_checkins``); elsewhere it is a plain
+    table. Rows keep their original ids.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    company = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    reason = models.CharField(max_length=100)
+    check_in_time = models.DateTimeField(null=True, blank=True)
+    check_out_time = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=CheckInRecord.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CheckInRecordQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'staff_checkinrecord_archive'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'name'], name='archive_visitor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.company}) - {self.reason} [archived]"
+
+
+class DepotOccupancy(models.Model):
+    """Live head count per (company, reason), maintained alongside CheckInRecord.
+
+    Only groups with someone on site have a row, so reading the whole table
+    is the cheap way to answer "who is in the depot right now".
+    """
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    reason = models.ForeignKey(Reason, on_delete=models.CASCADE, related_name='+')
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'staff_depotoccupancy'
+        ordering = ['company', 'reason']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'reason'], name='unique_occupancy_group'),
+        ]
+
+    def __str__(self):
+        return f"{self.company} / {self.reason}: {self.count}"
+
+
+class CheckInEvent(models.Model):
+    """Append-only log of depot check-in state changes.
+
+    Ids follow insertion, not commit: a transaction that took a lower id can
+    become visible after a higher one, so readers tailing the log by id must
+    allow for late arrivals (see ``depot_event_stream``).
+    """
+
+    CHECK_IN = 1
+    CHECK_OUT = 2
+    RE_CHECK_IN = 3
+    EVENT_TYPE_CHOICES = [
+        (CHECK_IN, 'checkin'),
+        (CHECK_OUT, 'checkout'),
+        (RE_CHECK_IN, 'recheckin'),
+    ]
+
+    # No database FK so events outlive the records they describe
+    record = models.ForeignKey(
+        CheckInRecord, on_delete=models.DO_NOTHING, db_constraint=False,
+        db_index=False, null=True, related_name='events'
+    )
+    event_type = models.PositiveSmallIntegerField(choices=EVENT_TYPE_CHOICES)
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'staff_checkinevent'
+        ordering = ['id']
+        indexes = [
+            # Covers history reads, so they are index-only range scans
+            models.Index(fields=['record', 'occurred_at', 'id', 'event_type'], name='event_record_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} #{self.record_id} at {self.occurred_at}"
+
+
+class DepotVisitQuerySet(models.QuerySet):
+    """Interval queries over visits.
+
+    On PostgreSQL these match the GiST index on
+    ``tstzrange(started_at, ended_at, '[)')`` (a NULL end is unbounded);
+    elsewhere they fall back to the B-tree indexes on either end.
+    """
+
+    def _span(self):
+        table = connections[self.db].ops.quote_name(self.model._meta.db_table)
+        return f"tstzrange({table}.started_at, {table}.ended_at, '[)')"
+
+    def _uses_ranges(self):
+        return connections[self.db].vendor == 'postgresql'
+
+    def covering(self, moment):
+        """Visits during which someone was on site at ``moment``"""
+        if self._uses_ranges():
+            return self.filter(RawSQL(f"{self._span()} @> %s::timestamptz", [moment], output_field=models.BooleanField()))
+        return self.filter(
+            models.Q(started_at__lte=moment),
+            models.Q(ended_at__isnull=True) | models.Q(ended_at__gt=moment),
+        )
+
+    def overlapping(self, start, end):
+        """Visits that overlap the half-open ``[start, end)`` interval"""
+        if self._uses_ranges():
+            return self.filter(RawSQL(
+                f"{self._span()} && tstzrange(%s::timestamptz, %s::timestamptz, '[)')",
+                [start, end], output_field=models.BooleanField()
+            ))
+        return self.filter(
+            models.Q(started_at__lt=end),
+            models.Q(ended_at__isnull=True) | models.Q(ended_at__gt=start),
+        )
+
+
+class DepotVisit(models.Model):
+    """One on-site interval, from a (re-)check-in to the matching checkout"""
+
+    record = models.ForeignKey(
+        CheckInRecord, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, related_name='visits'
+    )
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    objects = DepotVisitQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'staff_depotvisit'
+        ordering = ['started_at']
+        constraints = [
+            # The span index's tstzrange() rejects an end before the start
+            models.CheckConstraint(
+                condition=models.Q(ended_at__isnull=True) | models.Q(ended_at__gte=models.F('started_at')),
+                name='visit_ends_after_start',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['started_at'], name='visit_started_idx'),
+            models.Index(fields=['ended_at'], name='visit_ended_idx'),
+        ]
+
+    def __str__(self):
+        return f"Visit #{self.record_id} {self.started_at} - {self.ended_at or 'now'}"
+
+
+class DepotDailyStats(models.Model):
+    """Cached visit analytics for one closed day"""
+
+    day = models.DateField(unique=True)
+    payload = models.JSONField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'staff_depotdailystats'
+        ordering = ['-day']
 
     def __str__(self):
-        return f"{self.name} ({self.company}) - {self.reason}"
+        return f"Depot stats for {self.day}"
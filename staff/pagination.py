@@ -0,0 +1,67 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+class KeysetPagination:
+    """Keyset (cursor) pagination over ``(created_at, id)``, newest first.
+
+    Each page is a bounded range scan on the ``(created_at, id)`` index
+    instead of an ``OFFSET`` or a full-table read, and no ``COUNT(*)`` is run.
+    """
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 50
+    max_limit = 200
+
+    def get_limit(self, request):
+        raw = request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return self.default_limit
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise InvalidCursor(f"'{self.limit_query_param}' must be an integer")
+        return max(1, min(limit, self.max_limit))
+
+    def encode_cursor(self, record):
+        position = f"{record.created_at.isoformat()}|{record.pk}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+        if created_at is None:
+            raise InvalidCursor('Invalid cursor')
+        return created_at, pk
+
+    def paginate_queryset(self, queryset, request):
+        """Return ``(records, next_cursor)`` for the page requested"""
+        limit = self.get_limit(request)
+        queryset = queryset.order_by('-created_at', '-id')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        # Fetch one extra row to learn whether another page exists
+        records = list(queryset[:limit + 1])
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = self.encode_cursor(records[-1])
+        return records, next_cursor
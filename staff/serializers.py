@@ -1,9 +1,22 @@
 from rest_framework import serializers
-from .models import CheckInRecord
+from .models import CheckInEvent, CheckInRecord, EmployeeAttendance
 
 class CheckInRecordSerializer(serializers.ModelSerializer):
+    company = serializers.CharField(source='company.name', read_only=True)
+    name = serializers.CharField(source='visitor.name', read_only=True)
+    reason = serializers.CharField(source='reason.label', read_only=True)
+
     class Meta:
         model = CheckInRecord
+        fields = [
+            'id', 'company', 'name', 'reason', 'check_in_time', 'check_out_time',
+            'status', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+class EmployeeAttendanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EmployeeAttendance
         fields = '__all__'
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -17,4 +30,33 @@ class CheckOutSerializer(serializers.Serializer):
 class DepotCheckInSerializer(serializers.Serializer):
     company = serializers.CharField(max_length=100)
     name = serializers.CharField(max_length=100)
-    reason = serializers.CharField(max_length=100)
\ No newline at end of file
+    reason = serializers.CharField(max_length=100)
+
+class DepotBatchOperationSerializer(serializers.Serializer):
+    OPERATION_CHOICES = ['checkin', 'checkout', 'recheckin']
+
+    op = serializers.ChoiceField(choices=OPERATION_CHOICES)
+    company = serializers.CharField(max_length=100, required=False)
+    name = serializers.CharField(max_length=100, required=False)
+    reason = serializers.CharField(max_length=100, required=False)
+    record_id = serializers.IntegerField(required=False)
+    ref = serializers.CharField(max_length=64, required=False, help_text='Client id for a check-in, usable as record_ref later in the batch')
+    record_ref = serializers.CharField(max_length=64, required=False)
+    occurred_at = serializers.DateTimeField(required=False, help_text='When the kiosk recorded the action; defaults to now, future times are clamped to now')
+
+    def validate(self, attrs):
+        if attrs['op'] == 'checkin':
+            missing = [field for field in ('company', 'name', 'reason') if not attrs.get(field)]
+            if missing:
+                raise serializers.ValidationError({field: 'This field is required.' for field in missing})
+        elif ('record_id' in attrs) == ('record_ref' in attrs):
+            raise serializers.ValidationError('Provide exactly one of record_id or record_ref.')
+        return attrs
+
+class CheckInEventSerializer(serializers.ModelSerializer):
+    event_type = serializers.CharField(source='get_event_type_display', read_only=True)
+    record = CheckInRecordSerializer(read_only=True)
+
+    class Meta:
+        model = CheckInEvent
+        fields = ['id', 'event_type', 'occurred_at', 'record']
@@ -0,0 +1,520 @@
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, DateTimeField, F, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import ArchivedCheckInRecord, CheckInEvent, CheckInRecord, Company, DepotOccupancy, DepotVisit, Reason, Visitor, normalize_name
+
+
+class CheckInError(Exception):
+    """Base class for depot check-in state errors"""
+
+
+class AlreadyRegistered(CheckInError):
+    pass
+
+
+class InvalidTransition(CheckInError):
+    pass
+
+
+@dataclass(frozen=True)
+class Transition:
+    """A move between two check-in states that stamps one time field"""
+    name: str
+    source: str
+    target: str
+    time_field: str
+    conflict_message: str
+    event_type: int
+
+    @property
+    def occupancy_delta(self):
+        return 1 if self.target == 'checked-in' else -1
+
+
+CHECK_OUT = Transition(
+    name='checkout',
+    source='checked-in',
+    target='checked-out',
+    time_field='check_out_time',
+    conflict_message='This visitor is already checked out',
+    event_type=CheckInEvent.CHECK_OUT,
+)
+RE_CHECK_IN = Transition(
+    name='recheckin',
+    source='checked-out',
+    target='checked-in',
+    time_field='check_in_time',
+    conflict_message='This visitor is already checked in',
+    event_type=CheckInEvent.RE_CHECK_IN,
+)
+
+TRANSITIONS = {transition.name: transition for transition in (CHECK_OUT, RE_CHECK_IN)}
+
+
+# Inserts whichever lookup rows are missing and returns all three ids in one
+# round trip. A data-modifying CTE's rows are invisible to the rest of the
+# statement's snapshot, hence each "inserted UNION ALL existing" pair.
+RESOLVE_NAMES_SQL = """
+WITH new_company AS (
+    INSERT INTO {company} (name) VALUES (%(company)s) ON CONFLICT (name) DO NOTHING RETURNING id
+), company AS (
+    SELECT id FROM new_company UNION ALL SELECT id FROM {company} WHERE name = %(company)s LIMIT 1
+), new_reason AS (
+    INSERT INTO {reason} (label) VALUES (%(reason)s) ON CONFLICT (label) DO NOTHING RETURNING id
+), reason AS (
+    SELECT id FROM new_reason UNION ALL SELECT id FROM {reason} WHERE label = %(reason)s LIMIT 1
+), new_visitor AS (
+    INSERT INTO {visitor} (company_id, name, name_key)
+    SELECT id, %(name)s, %(name_key)s FROM company
+    ON CONFLICT (company_id, name) DO NOTHING RETURNING id
+), visitor AS (
+    SELECT id FROM new_visitor
+    UNION ALL
+    SELECT v.id FROM {visitor} v JOIN company c ON v.company_id = c.id WHERE v.name = %(name)s
+    LIMIT 1
+)
+SELECT (SELECT id FROM company), (SELECT id FROM visitor), (SELECT id FROM reason)
+"""
+
+
+def resolve_names(company, name, reason):
+    """Return the ``(Company, Visitor, Reason)`` rows for the given names, creating any that are new.
+
+    One statement on PostgreSQL; elsewhere the fixed-count bulk path. Either
+    way concurrent first registrations of a name cannot conflict.
+    """
+    ids = None
+    if connection.vendor == 'postgresql':
+        qn = connection.ops.quote_name
+        sql = RESOLVE_NAMES_SQL.format(
+            company=qn(Company._meta.db_table), reason=qn(Reason._meta.db_table), visitor=qn(Visitor._meta.db_table)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'company': company, 'name': name, 'name_key': normalize_name(name), 'reason': reason})
+            ids = cursor.fetchone()
+    if not ids or None in ids:
+        # Not PostgreSQL, or a row committed concurrently after our snapshot
+        ids = resolve_names_bulk({(company, name, reason)})[(company, name, reason)]
+    company_id, visitor_id, reason_id = ids
+    alias = connection.alias
+    company_obj = Company.from_db(alias, ['id', 'name'], [company_id, company])
+    visitor = Visitor.from_db(alias, ['id', 'company_id', 'name', 'name_key'], [visitor_id, company_id, name, normalize_name(name)])
+    visitor.company = company_obj
+    return company_obj, visitor, Reason.from_db(alias, ['id', 'label'], [reason_id, reason])
+
+
+def resolve_names_bulk(triples):
+    """Map each ``(company, name, reason)`` triple to ``(company_id, visitor_id, reason_id)``.
+
+    Uses a fixed number of queries however many triples there are; missing
+    lookup rows are inserted with ``ignore_conflicts`` and then read back.
+    """
+    if not triples:
+        return {}
+    company_names = {company for company, _, _ in triples}
+    Company.objects.bulk_create([Company(name=company) for company in company_names], ignore_conflicts=True)
+    companies = dict(Company.objects.filter(name__in=company_names).values_list('name', 'id'))
+
+    labels = {reason for _, _, reason in triples}
+    Reason.objects.bulk_create([Reason(label=label) for label in labels], ignore_conflicts=True)
+    reasons = dict(Reason.objects.filter(label__in=labels).values_list('label', 'id'))
+
+    pairs = {(companies[company], name) for company, name, _ in triples}
+    Visitor.objects.bulk_create(
+        [Visitor(company_id=company_id, name=name, name_key=normalize_name(name)) for company_id, name in pairs],
+        ignore_conflicts=True,
+    )
+    match = Q()
+    for company_id, name in pairs:
+        match |= Q(company_id=company_id, name=name)
+    visitors = {
+        (company_id, name): visitor_id
+        for visitor_id, company_id, name in Visitor.objects.filter(match).values_list('id', 'company_id', 'name')
+    }
+    return {
+        (company, name, reason): (companies[company], visitors[(companies[company], name)], reasons[reason])
+        for company, name, reason in triples
+    }
+
+
+def restore_archived(archived):
+    """Move the registrations in the ``archived`` queryset back into the hot
+    table, checked out and under their old ids; returns the restored records.
+
+    Nothing is restored if the visitor has registered again since.
+    """
+    if not archived.exists():
+        return []
+    try:
+        with transaction.atomic():
+            rows = list(archived.select_for_update())
+            if not rows:
+                return []
+            lookups = resolve_names_bulk({(row.company, row.name, row.reason) for row in rows})
+            records = []
+            for row in rows:
+                company_id, visitor_id, reason_id = lookups[(row.company, row.name, row.reason)]
+                records.append(CheckInRecord(
+                    id=row.id, company_id=company_id, visitor_id=visitor_id, reason_id=reason_id,
+                    check_in_time=row.check_in_time, check_out_time=row.check_out_time, status=row.status,
+                ))
+            CheckInRecord.objects.bulk_create(records)
+            for row in rows:
+                # auto_now_add/auto_now stamped the insert; keep the originals
+                CheckInRecord.objects.filter(pk=row.id).update(created_at=row.created_at, updated_at=row.updated_at)
+            ArchivedCheckInRecord.objects.filter(id__in=[row.id for row in rows]).delete()
+    except IntegrityError:
+        return []
+    return records
+
+
+def register_visitor(company, name, reason):
+    """Create a checked-in record for a new (company, name, reason).
+
+    The unique constraint on (visitor, reason) rejects repeat registrations
+    in the INSERT itself, so concurrent kiosks cannot both get in. A
+    registration archived from a closed month is restored instead of
+    duplicated, and counts as already registered.
+    """
+    archived = ArchivedCheckInRecord.objects.filter(company=company, name=name, reason=reason)
+    if restore_archived(archived):
+        raise AlreadyRegistered('You are aleady registered!')
+    try:
+        with transaction.atomic():
+            company, visitor, reason = resolve_names(company, name, reason)
+            record = CheckInRecord.objects.create(
+                company=company,
+                visitor=visitor,
+                reason=reason,
+                check_in_time=timezone.now(),
+                status='checked-in'
+            )
+            adjust_occupancy(company.pk, reason.pk, 1)
+            log_events([(record.pk, CheckInEvent.CHECK_IN, record.check_in_time)])
+    except IntegrityError:
+        raise AlreadyRegistered('You are aleady registered!')
+    return record
+
+
+def apply_transition(record_id, transition):
+    """Move one record along ``transition`` in a single statement.
+
+    Runs ``UPDATE ... WHERE id = %s AND status = %s RETURNING *`` so the
+    status check and the write cannot interleave with another terminal.
+    Raises ``CheckInRecord.DoesNotExist`` or ``InvalidTransition`` when no
+    row was affected.
+    """
+    now = timezone.now()
+    qn = connection.ops.quote_name
+    sql = (
+        f"UPDATE {qn(CheckInRecord._meta.db_table)} "
+        f"SET {qn('status')} = %s, {qn(transition.time_field)} = %s, {qn('updated_at')} = %s "
+        f"WHERE {qn('id')} = %s AND {qn('status')} = %s "
+        f"RETURNING *"
+    )
+    db_now = connection.ops.adapt_datetimefield_value(now)
+    params = [transition.target, db_now, db_now, record_id, transition.source]
+    with transaction.atomic():
+        records = list(CheckInRecord.objects.raw(sql, params))
+        if records:
+            record = records[0]
+            adjust_occupancy(record.company_id, record.reason_id, transition.occupancy_delta)
+            log_events([(record.pk, transition.event_type, now)])
+            return record
+
+    # Nothing matched: only now pay for a lookup to tell the two cases apart
+    if CheckInRecord.objects.filter(id=record_id).exists():
+        raise InvalidTransition(transition.conflict_message)
+    # A returning visitor's registration may have been archived meanwhile
+    if restore_archived(ArchivedCheckInRecord.objects.filter(id=record_id, status=transition.source)):
+        return apply_transition(record_id, transition)
+    raise CheckInRecord.DoesNotExist
+
+
+def apply_transition_to_queryset(queryset, transition):
+    """Set-based variant of ``apply_transition``; returns the affected row count"""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(status=transition.source)
+            .select_for_update()
+            .values_list('id', 'company_id', 'reason_id')
+        )
+        updated = CheckInRecord.objects.filter(
+            id__in=[row[0] for row in rows], status=transition.source
+        ).update(**{
+            'status': transition.target,
+            transition.time_field: now,
+            'updated_at': now,
+        })
+        groups = Counter((company_id, reason_id) for _, company_id, reason_id in rows)
+        for (company_id, reason_id), count in groups.items():
+            adjust_occupancy(company_id, reason_id, count * transition.occupancy_delta)
+        log_events([(row[0], transition.event_type, now) for row in rows])
+    return updated
+
+
+def check_out_stale(cutoff, queryset=None, batch_size=1000):
+    """Check out every record still checked in since before ``cutoff``.
+
+    Walks the stale rows in primary-key chunks, each applied as one set-based
+    transition in its own short transaction. ``queryset`` narrows the
+    candidates (e.g. an admin selection). Returns ``(checked_out, batches)``.
+    """
+    stale = (queryset if queryset is not None else CheckInRecord.objects.all()).filter(
+        status=CHECK_OUT.source, check_in_time__lt=cutoff
+    )
+    checked_out = 0
+    batches = 0
+    last_id = 0
+    while True:
+        ids = list(stale.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return checked_out, batches
+        # Re-filter under the row locks in case someone checked out meanwhile
+        checked_out += apply_transition_to_queryset(stale.filter(id__in=ids), CHECK_OUT)
+        batches += 1
+        last_id = ids[-1]
+
+
+def apply_batch(operations):
+    """Apply queued kiosk operations in order, inside one transaction.
+
+    ``operations`` is a list of ``(index, data)`` pairs validated by
+    ``DepotBatchOperationSerializer``. The batch is replayed in memory against
+    the current state, then written with one bulk insert, one bulk update and
+    one bulk event insert. Returns ``(index, record, error)`` triples; a
+    failed item only fails itself, including one whose ``occurred_at`` falls
+    before the record's previous transition; future times are clamped to now.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        triples = {
+            (op['company'], op['name'], op['reason'])
+            for _, op in operations if op['op'] == 'checkin'
+        }
+        archived = Q()
+        for company, name, reason in triples:
+            archived |= Q(company=company, name=name, reason=reason)
+        record_ids = {op['record_id'] for _, op in operations if 'record_id' in op}
+        if record_ids:
+            archived |= Q(id__in=record_ids)
+        if archived:
+            # Archived registrations come back before the batch is planned
+            restore_archived(ArchivedCheckInRecord.objects.filter(archived))
+
+        lookups = resolve_names_bulk(triples)
+        registered = set()
+        if lookups:
+            match = Q()
+            for _, visitor_id, reason_id in lookups.values():
+                match |= Q(visitor_id=visitor_id, reason_id=reason_id)
+            registered = set(CheckInRecord.objects.filter(match).values_list('visitor_id', 'reason_id'))
+
+        existing = CheckInRecord.objects.select_for_update().in_bulk(record_ids)
+        initial_status = {pk: record.status for pk, record in existing.items()}
+
+        new_records = []
+        refs = {}
+        changed = {}
+        events = []
+        outcomes = []
+        for index, op in operations:
+            # A kiosk clock running ahead must not stamp the future
+            at = min(op.get('occurred_at') or now, now)
+            if op['op'] == 'checkin':
+                company_id, visitor_id, reason_id = lookups[(op['company'], op['name'], op['reason'])]
+                if (visitor_id, reason_id) in registered:
+                    outcomes.append((index, op['op'], None, 'You are aleady registered!'))
+                    continue
+                if op.get('ref') in refs:
+                    outcomes.append((index, op['op'], None, f"Duplicate ref '{op['ref']}' in batch"))
+                    continue
+                record = CheckInRecord(
+                    company_id=company_id, visitor_id=visitor_id, reason_id=reason_id,
+                    check_in_time=at, status='checked-in'
+                )
+                registered.add((visitor_id, reason_id))
+                new_records.append(record)
+                if 'ref' in op:
+                    refs[op['ref']] = record
+                events.append((record, CheckInEvent.CHECK_IN, at))
+                outcomes.append((index, op['op'], record, None))
+                continue
+
+            transition = TRANSITIONS[op['op']]
+            if 'record_id' in op:
+                record = existing.get(op['record_id'])
+            else:
+                record = refs.get(op['record_ref'])
+            if record is None:
+                outcomes.append((index, op['op'], None, 'Check-in record not found'))
+                continue
+            if record.status != transition.source:
+                outcomes.append((index, op['op'], None, transition.conflict_message))
+                continue
+            previous = last_transition_time(record)
+            if previous is not None and at < previous:
+                outcomes.append((index, op['op'], None, 'occurred_at is before the previous check-in or check-out'))
+                continue
+            record.status = transition.target
+            setattr(record, transition.time_field, at)
+            if record.pk:
+                record.updated_at = now
+                changed[record.pk] = record
+            events.append((record, transition.event_type, at))
+            outcomes.append((index, op['op'], record, None))
+
+        rejected = _bulk_register(new_records)
+
+        CheckInRecord.objects.bulk_update(
+            changed.values(), ['status', 'check_in_time', 'check_out_time', 'updated_at']
+        )
+
+        deltas = Counter()
+        inserted = [record for record in new_records if id(record) not in rejected]
+        for record in [*changed.values(), *inserted]:
+            was_in = initial_status.get(record.pk) == 'checked-in'
+            is_in = record.status == 'checked-in'
+            if was_in != is_in:
+                deltas[(record.company_id, record.reason_id)] += 1 if is_in else -1
+        for (company_id, reason_id), delta in deltas.items():
+            if delta:
+                adjust_occupancy(company_id, reason_id, delta)
+
+        log_events([
+            (record.pk, event_type, at)
+            for record, event_type, at in events if id(record) not in rejected
+        ])
+
+    results = []
+    for index, op_name, record, error in outcomes:
+        if record is not None and id(record) in rejected:
+            # Lost a race with another kiosk registering the same visitor
+            record = None
+            error = 'You are aleady registered!' if op_name == 'checkin' else 'Check-in record not found'
+        results.append((index, record, error))
+    return results
+
+
+def last_transition_time(record):
+    """When ``record`` last changed state, or None if it never did"""
+    return max((at for at in (record.check_in_time, record.check_out_time) if at is not None), default=None)
+
+
+def _bulk_register(records):
+    """Insert new registrations, falling back to row-by-row on a conflict.
+
+    Returns the ``id()`` of each record that could not be inserted because a
+    concurrent request registered the same visitor after the batch was planned.
+    """
+    try:
+        with transaction.atomic():
+            CheckInRecord.objects.bulk_create(records)
+        return set()
+    except IntegrityError:
+        pass
+
+    rejected = set()
+    for record in records:
+        # A rolled-back bulk insert may already have assigned some keys
+        record.pk = None
+        try:
+            with transaction.atomic():
+                record.save(force_insert=True)
+        except IntegrityError:
+            rejected.add(id(record))
+    return rejected
+
+
+def log_events(entries):
+    """Append ``(record_id, event_type, occurred_at)`` entries, in order, to the
+    event log, open or close the matching visits and bump the visitors'
+    ``last_seen``. Call inside the transaction that changed the records.
+    """
+    CheckInEvent.objects.bulk_create(
+        CheckInEvent(record_id=record_id, event_type=event_type, occurred_at=at)
+        for record_id, event_type, at in entries
+    )
+    if entries:
+        visitor_ids = dict(
+            CheckInRecord.objects.filter(pk__in={record_id for record_id, _, _ in entries}).values_list('id', 'visitor_id')
+        )
+        latest = {}
+        for record_id, _, at in entries:
+            visitor_id = visitor_ids[record_id]
+            latest[visitor_id] = max(at, latest.get(visitor_id, at))
+        if len(set(latest.values())) == 1:
+            seen = Value(next(iter(latest.values())))
+        else:
+            seen = Case(*[When(pk=visitor_id, then=Value(at)) for visitor_id, at in latest.items()], output_field=DateTimeField())
+        Visitor.objects.filter(pk__in=latest).update(last_seen=Greatest(Coalesce('last_seen', seen), seen))
+
+    new_visits = []
+    opened = {}
+    closing = {}
+    for record_id, event_type, at in entries:
+        if event_type != CheckInEvent.CHECK_OUT:
+            visit = DepotVisit(record_id=record_id, started_at=at)
+            new_visits.append(visit)
+            opened[record_id] = visit
+        elif record_id in opened:
+            visit = opened.pop(record_id)
+            visit.ended_at = max(at, visit.started_at)
+        else:
+            closing[record_id] = at
+
+    if closing:
+        ends = set(closing.values())
+        if len(ends) == 1:
+            # A set-based transition stamps every row with the same time
+            ended_at = Value(ends.pop())
+        else:
+            ended_at = Case(*[When(record_id=record_id, then=Value(at)) for record_id, at in closing.items()])
+        # A visit never ends before it started (clock skew, backdated times)
+        DepotVisit.objects.filter(record_id__in=closing, ended_at=None).update(
+            ended_at=Greatest(ended_at, F('started_at'), output_field=DateTimeField())
+        )
+    DepotVisit.objects.bulk_create(new_visits)
+
+
+def adjust_occupancy(company_id, reason_id, delta):
+    """Add ``delta`` to one occupancy group; call inside the record's transaction"""
+    group = DepotOccupancy.objects.filter(company_id=company_id, reason_id=reason_id)
+    updated = group.update(count=F('count') + delta, updated_at=timezone.now())
+    if not updated:
+        DepotOccupancy.objects.get_or_create(company_id=company_id, reason_id=reason_id)
+        group.update(count=F('count') + delta)
+    if delta < 0:
+        # Keep only groups that have someone on site
+        group.filter(count__lte=0).delete()
+
+
+def compute_occupancy():
+    """Recount occupancy from CheckInRecord; returns ``{(company_id, reason_id): count}``"""
+    groups = (
+        CheckInRecord.objects.filter(status='checked-in')
+        .values('company_id', 'reason_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return {(group['company_id'], group['reason_id']): group['count'] for group in groups}
+
+
+def rebuild_occupancy():
+    """Replace the occupancy projection with a fresh recount"""
+    with transaction.atomic():
+        # Lock the checked-in rows so concurrent checkouts wait for the rebuild
+        list(CheckInRecord.objects.filter(status='checked-in').select_for_update().values_list('id'))
+        expected = compute_occupancy()
+        DepotOccupancy.objects.all().delete()
+        DepotOccupancy.objects.bulk_create(
+            DepotOccupancy(company_id=company_id, reason_id=reason_id, count=count)
+            for (company_id, reason_id), count in expected.items()
+        )
+    return expected
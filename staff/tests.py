@@ -1,3 +1,743 @@
-from django.test import TestCase
+import asyncio
+from datetime import datetime, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import views
+from .archive import archive_month, closed_months, month_start
+from .models import (
+    ArchivedCheckInRecord, CheckInEvent, CheckInRecord, Company, DepotDailyStats, DepotOccupancy, DepotVisit, EmployeeAttendance,
+    Reason, Visitor,
+)
+from .services import (
+    CHECK_OUT, RE_CHECK_IN, AlreadyRegistered, InvalidTransition, apply_batch, apply_transition, apply_transition_to_queryset,
+    check_out_stale, compute_occupancy, log_events, rebuild_occupancy, register_visitor, resolve_names, resolve_names_bulk,
+)
+
+
+def drain(stream):
+    """Everything an async iterator yields"""
+    async def collect():
+        return [chunk async for chunk in stream]
+    return asyncio.run(collect())
+
+
+def stream_ids(generator):
+    """The ``id:`` lines and payloads a server-sent event generator yields"""
+    return [chunk for chunk in drain(generator) if chunk.startswith('id:')]
+
+
+def occupancy_rows():
+    """The occupancy projection in ``compute_occupancy`` form"""
+    return {(company, reason): count for company, reason, count in DepotOccupancy.objects.values_list('company', 'reason', 'count')}
+
+
+def event_types(record_id):
+    return list(CheckInEvent.objects.filter(record_id=record_id).order_by('id').values_list('event_type', flat=True))
+
+
+class DepotCheckInTestMixin:
+    def register(self, name, company='Acme', reason='safety'):
+        response = self.client.post('/api/depot/checkin/', {'company': company, 'name': name, 'reason': reason})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['record']
+
+
+class DepotCheckInListTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.ids = [self.register(name)['id'] for name in ('Ann Lee', 'Bob Ray', 'Cy Dee', 'Di Fox', 'Ed Gray')]
+
+    def get(self, **params):
+        return self.client.get('/api/depot/checkin/', params)
+
+    def test_cursor_walks_every_record_newest_first(self):
+        seen = []
+        params = {'limit': 2}
+        while True:
+            body = self.get(**params).json()
+            self.assertLessEqual(body['page_size'], 2)
+            self.assertEqual(body['page_size'], len(body['records']))
+            seen += [record['id'] for record in body['records']]
+            if not body['next_cursor']:
+                break
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(seen, self.ids[::-1])
+
+    def test_same_created_at_is_ordered_by_id(self):
+        CheckInRecord.objects.update(created_at=timezone.now())
+        first = self.get(limit=3).json()
+        rest = self.get(limit=3, cursor=first['next_cursor']).json()
+        self.assertEqual([record['id'] for record in first['records'] + rest['records']], self.ids[::-1])
+
+    def test_filters(self):
+        self.register('Fay Hill', company='Other')
+        CheckInRecord.objects.filter(pk=self.ids[0]).update(status='checked-out')
+        CheckInRecord.objects.filter(pk=self.ids[1]).update(created_at=timezone.now() - timedelta(days=3))
+
+        self.assertEqual([record['id'] for record in self.get(status='checked-out').json()['records']], [self.ids[0]])
+        self.assertEqual(len(self.get(company='Acme').json()['records']), 5)
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual([record['id'] for record in self.get(date_to=yesterday).json()['records']], [self.ids[1]])
+        self.assertEqual(len(self.get(date_from=timezone.localdate().isoformat()).json()['records']), 5)
+
+    def test_bad_input_is_rejected(self):
+        for params in ({'cursor': 'not-a-cursor'}, {'limit': 'ten'}, {'status': 'gone'}, {'date_from': 'soon'}):
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+
+class DepotRegistrationTests(DepotCheckInTestMixin, TestCase):
+    def test_repeat_registration_is_rejected(self):
+        self.register('Ann Lee')
+        response = self.client.post('/api/depot/checkin/', {'company': 'Acme', 'name': 'Ann Lee', 'reason': 'safety'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'You are aleady registered!')
+        self.assertEqual(CheckInRecord.objects.count(), 1)
+
+        # Another reason is another registration
+        self.register('Ann Lee', reason='delivery')
+        self.assertEqual(CheckInRecord.objects.count(), 2)
+
+    def test_database_rejects_duplicates(self):
+        self.register('Ann Lee')
+        record = CheckInRecord.objects.get()
+        record.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            record.save()
+
+
+class DepotTransitionTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.record_id = self.register('Ann Lee')['id']
+
+    def post(self, action, record_id=None):
+        return self.client.post(f'/api/depot/checkin/{record_id or self.record_id}/{action}/')
+
+    def test_checkout_then_re_check_in(self):
+        response = self.post('checkout')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['record']['status'], 'checked-out')
+        record = CheckInRecord.objects.get(pk=self.record_id)
+        self.assertIsNotNone(record.check_out_time)
+
+        response = self.post('checkin')
+        self.assertEqual(response.status_code, 200)
+        record.refresh_from_db()
+        self.assertEqual(record.status, 'checked-in')
+        self.assertGreaterEqual(record.check_in_time, record.check_out_time)
+
+    def test_conflicts_and_missing_records(self):
+        response = self.post('checkin')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], RE_CHECK_IN.conflict_message)
+
+        self.post('checkout')
+        response = self.post('checkout')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], CHECK_OUT.conflict_message)
+
+        self.assertEqual(self.post('checkout', record_id=self.record_id + 100).status_code, 404)
+
+    def test_service_reports_conflict_without_writing(self):
+        before = CheckInRecord.objects.get(pk=self.record_id)
+        with self.assertRaisesMessage(InvalidTransition, RE_CHECK_IN.conflict_message):
+            apply_transition(self.record_id, RE_CHECK_IN)
+        self.assertEqual(CheckInRecord.objects.get(pk=self.record_id).updated_at, before.updated_at)
+        with self.assertRaises(CheckInRecord.DoesNotExist):
+            apply_transition(self.record_id + 100, CHECK_OUT)
+
+    def test_queryset_transition_skips_records_in_the_wrong_state(self):
+        other_id = self.register('Bob Ray')['id']
+        apply_transition(other_id, CHECK_OUT)
+
+        self.assertEqual(apply_transition_to_queryset(CheckInRecord.objects.all(), CHECK_OUT), 1)
+        self.assertEqual(set(CheckInRecord.objects.values_list('status', flat=True)), {'checked-out'})
+
+    def test_admin_cannot_edit_state_directly(self):
+        readonly = admin.site._registry[CheckInRecord].get_readonly_fields(None)
+        for field in ('status', 'check_in_time', 'check_out_time'):
+            self.assertIn(field, readonly)
+
+
+class DepotOccupancyTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.ann = self.register('Ann Lee')['id']
+        self.bob = self.register('Bob Ray')['id']
+        self.register('Cy Dee', company='Other', reason='delivery')
+
+    def occupancy(self):
+        response = self.client.get('/api/depot/occupancy/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return body['total'], body['by_company'], body['by_reason']
+
+    def test_transitions_move_the_head_count(self):
+        self.assertEqual(self.occupancy(), (3, {'Acme': 2, 'Other': 1}, {'safety': 2, 'delivery': 1}))
+
+        self.client.post(f'/api/depot/checkin/{self.ann}/checkout/')
+        self.assertEqual(self.occupancy(), (2, {'Acme': 1, 'Other': 1}, {'safety': 1, 'delivery': 1}))
+        # A refused transition changes nothing
+        self.client.post(f'/api/depot/checkin/{self.ann}/checkout/')
+        self.assertEqual(self.occupancy()[0], 2)
+
+        self.client.post(f'/api/depot/checkin/{self.bob}/checkout/')
+        self.assertEqual(self.occupancy(), (1, {'Other': 1}, {'delivery': 1}))
+        self.assertEqual(DepotOccupancy.objects.count(), 1)
+
+        self.client.post(f'/api/depot/checkin/{self.ann}/checkin/')
+        self.assertEqual(self.occupancy(), (2, {'Acme': 1, 'Other': 1}, {'safety': 1, 'delivery': 1}))
+
+    def test_admin_set_based_transition_adjusts_groups(self):
+        apply_transition_to_queryset(CheckInRecord.objects.all(), CHECK_OUT)
+        self.assertEqual(self.occupancy(), (0, {}, {}))
+        self.assertFalse(DepotOccupancy.objects.exists())
+
+    def test_rebuild_command_repairs_drift(self):
+        DepotOccupancy.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_occupancy', '--verify', stdout=out)
+        self.assertIn('drifted', out.getvalue())
+
+        call_command('rebuild_occupancy', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_occupancy', '--verify', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+        self.assertEqual(self.occupancy()[0], 3)
+
+
+class DepotEventStreamTests(DepotCheckInTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.record = register_visitor('Acme', 'Ann Lee', 'safety')
+
+    def test_backlog_after_last_event_id(self):
+        self.client.post(f'/api/depot/checkin/{self.record.pk}/checkout/')
+        self.client.post(f'/api/depot/checkin/{self.record.pk}/checkin/')
+
+        response = self.client.get('/api/depot/events/', {'last_event_id': 0})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(drain(response.streaming_content)).decode()
+        self.assertEqual(
+            [line for line in body.split('\n') if line.startswith('event:')],
+            ['event: checkin', 'event: checkout', 'event: recheckin'],
+        )
+
+        response = self.client.get('/api/depot/events/', HTTP_LAST_EVENT_ID='abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_late_commit_is_sent_after_higher_ids(self):
+        first = CheckInEvent.objects.get()
+        # Event 2 stands in for a transaction that has its id but has not committed yet
+        CheckInEvent.objects.bulk_create([
+            CheckInEvent(id=first.id + 2, record_id=self.record.pk, event_type=CheckInEvent.CHECK_OUT, occurred_at=timezone.now())
+        ])
+
+        sent = stream_ids(views._depot_events(first.id, [], 0))
+        self.assertEqual(len(sent), 1)
+        cursor = sent[0].split('\n')[0][len('id: '):]
+        self.assertEqual(cursor, f'{first.id + 2}:{first.id + 1}')
+
+        CheckInEvent.objects.create(
+            id=first.id + 1, record_id=self.record.pk, event_type=CheckInEvent.CHECK_OUT, occurred_at=timezone.now()
+        )
+        last, gaps = views._parse_stream_cursor(cursor)
+        sent = stream_ids(views._depot_events(last, gaps, 0))
+        self.assertEqual(len(sent), 1)
+        self.assertIn(f'"id": {first.id + 1}', sent[0])
+        self.assertTrue(sent[0].startswith(f'id: {first.id + 2}\n'))
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(views._parse_stream_cursor('42'), (42, []))
+        self.assertEqual(views._parse_stream_cursor(views._format_stream_cursor(42, {40: 0, 38: 0})), (42, [38, 40]))
+        with self.assertRaises(ValueError):
+            views._parse_stream_cursor('abc')
+
+
+class DepotBatchTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.record_id = self.register('Ann Lee')['id']
+
+    def post(self, operations):
+        response = self.client.post('/api/depot/checkin/batch/', {'operations': operations}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_check_in_and_out_by_ref(self):
+        body = self.post([
+            {'op': 'checkin', 'company': 'Acme', 'name': 'Bob Ray', 'reason': 'safety', 'ref': 'k1'},
+            {'op': 'checkout', 'record_ref': 'k1'},
+            {'op': 'checkout', 'record_id': self.record_id},
+        ])
+
+        self.assertEqual((body['applied'], body['failed']), (3, 0))
+        created_id = body['results'][0]['record']['id']
+        self.assertEqual(body['results'][1]['record']['id'], created_id)
+        self.assertEqual(CheckInRecord.objects.get(pk=created_id).status, 'checked-out')
+        self.assertEqual(event_types(created_id), [CheckInEvent.CHECK_IN, CheckInEvent.CHECK_OUT])
+        self.assertEqual(occupancy_rows(), {})
+
+    def test_bad_items_fail_alone(self):
+        body = self.post([
+            {'op': 'checkin', 'company': 'Acme', 'name': 'Ann Lee', 'reason': 'safety'},
+            {'op': 'recheckin', 'record_id': self.record_id},
+            {'op': 'checkout', 'record_id': self.record_id + 100},
+            {'op': 'checkout'},
+            {'op': 'checkin', 'company': 'Acme', 'name': 'Bob Ray', 'reason': 'safety', 'ref': 'k1'},
+            {'op': 'checkin', 'company': 'Acme', 'name': 'Cy Dee', 'reason': 'safety', 'ref': 'k1'},
+            {'op': 'checkout', 'record_id': self.record_id},
+        ])
+
+        errors = [result.get('error') for result in body['results']]
+        self.assertEqual(errors, [
+            'You are aleady registered!',
+            RE_CHECK_IN.conflict_message,
+            'Check-in record not found',
+            None,
+            None,
+            "Duplicate ref 'k1' in batch",
+            None,
+        ])
+        self.assertIn('errors', body['results'][3])
+        self.assertEqual((body['applied'], body['failed']), (2, 5))
+        self.assertEqual(CheckInRecord.objects.get(pk=self.record_id).status, 'checked-out')
+        self.assertEqual(CheckInRecord.objects.count(), 2)
+        self.assertEqual(occupancy_rows(), compute_occupancy())
+
+    def test_rejects_empty_or_oversized_batches(self):
+        response = self.client.post('/api/depot/checkin/batch/', {'operations': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        operations = [{'op': 'checkout', 'record_id': self.record_id}] * (views.DEPOT_BATCH_MAX_OPERATIONS + 1)
+        response = self.client.post('/api/depot/checkin/batch/', {'operations': operations}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DepotBatchTimeTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.record = register_visitor('Acme', 'Ann Lee', 'safety')
+
+    def test_checkout_before_check_in_fails_only_that_item(self):
+        early = self.record.check_in_time - timedelta(hours=1)
+        results = apply_batch([
+            (0, {'op': 'checkout', 'record_id': self.record.pk, 'occurred_at': early}),
+            (1, {'op': 'checkin', 'company': 'Acme', 'name': 'Bob Ray', 'reason': 'safety'}),
+        ])
+
+        (_, _, error), (_, created, created_error) = results
+        self.assertIn('before the previous', error)
+        self.assertIsNone(created_error)
+        self.record.refresh_from_db()
+        self.assertEqual(self.record.status, 'checked-in')
+        self.assertIsNone(self.record.check_out_time)
+        self.assertTrue(CheckInRecord.objects.filter(pk=created.pk).exists())
+
+    def test_future_time_is_clamped_to_now(self):
+        before = timezone.now()
+        apply_batch([(0, {'op': 'checkout', 'record_id': self.record.pk, 'occurred_at': before + timedelta(days=1)})])
+
+        self.record.refresh_from_db()
+        self.assertLessEqual(self.record.check_out_time, timezone.now())
+        self.assertGreaterEqual(self.record.check_out_time, before)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.this_month = month_start(timezone.localdate())
+        self.last_month = month_start((self.this_month - timedelta(days=1)).date())
+        self.record = register_visitor('Acme', 'Ann Lee', 'safety')
+        apply_transition(self.record.pk, CHECK_OUT)
+
+    def age(self, created_at, updated_at):
+        CheckInRecord.objects.filter(pk=self.record.pk).update(created_at=created_at, updated_at=updated_at)
+
+    def test_recently_active_record_stays(self):
+        # Registered last month, but back on site this month
+        self.age(self.last_month + timedelta(days=2), timezone.now())
+
+        self.assertEqual(archive_month(self.last_month), 0)
+        self.assertTrue(CheckInRecord.objects.filter(pk=self.record.pk).exists())
+
+    def test_visitor_on_site_stays(self):
+        apply_transition(self.record.pk, RE_CHECK_IN)
+        self.age(self.last_month, self.last_month + timedelta(days=3))
+
+        self.assertEqual(archive_month(self.last_month), 0)
+
+    def test_idle_record_is_archived_and_restored_on_re_check_in(self):
+        created = self.last_month - timedelta(days=20)
+        self.age(created, self.last_month + timedelta(days=3))
+
+        self.assertIn(self.last_month, closed_months(self.this_month))
+        self.assertEqual(archive_month(self.last_month), 1)
+        self.assertFalse(CheckInRecord.objects.filter(pk=self.record.pk).exists())
+        self.assertTrue(ArchivedCheckInRecord.objects.filter(pk=self.record.pk).exists())
+
+        record = apply_transition(self.record.pk, RE_CHECK_IN)
+        self.assertEqual(record.pk, self.record.pk)
+        self.assertEqual(record.status, 'checked-in')
+        self.assertFalse(ArchivedCheckInRecord.objects.exists())
+        self.assertEqual(CheckInRecord.objects.get(pk=self.record.pk).created_at, created)
+        self.assertEqual(
+            event_types(self.record.pk), [CheckInEvent.CHECK_IN, CheckInEvent.CHECK_OUT, CheckInEvent.RE_CHECK_IN]
+        )
+
+    def test_registering_again_restores_instead_of_duplicating(self):
+        self.age(self.last_month, self.last_month + timedelta(days=3))
+        archive_month(self.last_month)
+
+        with self.assertRaises(AlreadyRegistered):
+            register_visitor('Acme', 'Ann Lee', 'safety')
+        self.assertEqual(list(CheckInRecord.objects.values_list('pk', flat=True)), [self.record.pk])
+
+    def test_batch_re_check_in_restores_archived_record(self):
+        self.age(self.last_month, self.last_month + timedelta(days=3))
+        archive_month(self.last_month)
+
+        [(_, record, error)] = apply_batch([(0, {'op': 'recheckin', 'record_id': self.record.pk})])
+        self.assertIsNone(error)
+        self.assertEqual(record.pk, self.record.pk)
+        self.assertEqual(CheckInRecord.objects.get(pk=self.record.pk).status, 'checked-in')
+
+    def test_command_archives_closed_months_only(self):
+        self.age(self.last_month, self.last_month + timedelta(days=3))
+        with self.assertRaises(CommandError):
+            call_command('archive_checkins', '--before', (self.this_month + timedelta(days=40)).strftime('%Y-%m'))
+
+        call_command('archive_checkins', stdout=StringIO())
+        self.assertFalse(CheckInRecord.objects.exists())
+        self.assertEqual(ArchivedCheckInRecord.objects.count(), 1)
+
+
+@override_settings(TIME_ZONE='Europe/Berlin')
+class DepotAnalyticsTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localdate() - timedelta(days=2)
+        ann = register_visitor('Acme', 'Ann Lee', 'safety')
+        bob = register_visitor('Acme', 'Bob Ray', 'safety')
+        cy = register_visitor('Other', 'Cy Dee', 'delivery')
+        CheckInEvent.objects.all().delete()
+        CheckInRecord.objects.filter(pk__in=[ann.pk, bob.pk]).update(status='checked-out')
+        rebuild_occupancy()
+        CheckInEvent.objects.bulk_create([
+            CheckInEvent(record_id=record.pk, event_type=event_type, occurred_at=self.at(hour, minute))
+            for record, event_type, hour, minute in [
+                (ann, CheckInEvent.CHECK_IN, 9, 10),
+                (ann, CheckInEvent.CHECK_OUT, 9, 20),
+                (bob, CheckInEvent.CHECK_IN, 9, 30),
+                (cy, CheckInEvent.CHECK_IN, 10, 5),
+                (bob, CheckInEvent.CHECK_OUT, 11, 45),
+                (ann, CheckInEvent.RE_CHECK_IN, 14, 0),
+                (ann, CheckInEvent.CHECK_OUT, 14, 40),
+            ]
+        ])
+
+    def at(self, hour, minute):
+        return timezone.make_aware(datetime.combine(self.day, time(hour, minute)))
+
+    def get(self, **params):
+        return self.client.get('/api/depot/analytics/', params)
+
+    def test_day_aggregates(self):
+        response = self.get(date_from=self.day.isoformat(), date_to=self.day.isoformat())
+        self.assertEqual(response.status_code, 200)
+        [stats] = response.json()['days']
+
+        self.assertEqual(stats['visits'], 4)
+        self.assertEqual(stats['per_company'], {'Acme': 3, 'Other': 1})
+        self.assertEqual((stats['opening_occupancy'], stats['closing_occupancy'], stats['peak_occupancy']), (0, 1, 2))
+        levels = {hour['hour']: (hour['peak'], hour['end']) for hour in stats['hourly_occupancy']}
+        self.assertEqual(len(levels), 24)
+        self.assertEqual(levels[8], (0, 0))
+        self.assertEqual(levels[9], (1, 1))
+        self.assertEqual(levels[10], (2, 2))
+        self.assertEqual(levels[11], (1, 1))
+        self.assertEqual(levels[13], (1, 1))
+        self.assertEqual(levels[14], (2, 1))
+        self.assertEqual(stats['dwell'], {
+            '<15m': 1, '15-30m': 0, '30-60m': 1, '1-2h': 0, '2-4h': 1, '4-8h': 0, '8h+': 0, 'open': 1,
+        })
+
+    def test_closed_days_are_cached(self):
+        self.get(date_from=self.day.isoformat(), date_to=self.day.isoformat())
+        self.assertTrue(DepotDailyStats.objects.filter(day=self.day).exists())
+        self.assertFalse(DepotDailyStats.objects.filter(day=timezone.localdate()).exists())
+
+        CheckInEvent.objects.all().delete()
+        body = self.get(date_from=self.day.isoformat(), date_to=self.day.isoformat()).json()
+        self.assertEqual(body['totals']['visits'], 4)
+        self.assertEqual(body['totals']['peak_occupancy'], 2)
+
+    def test_bad_ranges(self):
+        self.assertEqual(self.get(date_from='2025-01-02', date_to='2025-01-01').status_code, 400)
+        self.assertEqual(self.get(date_from='2020-01-01', date_to='2025-01-01').status_code, 400)
+        self.assertEqual(self.get(date_to='soon').status_code, 400)
+
+
+class DepotRollCallTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localdate() - timedelta(days=1)
+        self.ann = register_visitor('Acme', 'Ann Lee', 'safety')
+        self.bob = register_visitor('Other', 'Bob Ray', 'delivery')
+        DepotVisit.objects.filter(record_id=self.ann.pk).update(started_at=self.at(8), ended_at=self.at(10))
+        DepotVisit.objects.filter(record_id=self.bob.pk).update(started_at=self.at(9, 30))
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.day, time(hour, minute)))
+
+    def names(self, **params):
+        response = self.client.get('/api/depot/rollcall/', params)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], len(body['visitors']))
+        return [visitor['name'] for visitor in body['visitors']]
+
+    def test_point_in_time(self):
+        self.assertEqual(self.names(at=self.at(7).isoformat()), [])
+        self.assertEqual(self.names(at=self.at(9).isoformat()), ['Ann Lee'])
+        self.assertEqual(self.names(at=self.at(9, 45).isoformat()), ['Ann Lee', 'Bob Ray'])
+        # Visits are half-open: gone at the moment they check out
+        self.assertEqual(self.names(at=self.at(10).isoformat()), ['Bob Ray'])
+        self.assertEqual(self.names(), ['Bob Ray'])
+
+    def test_overlapping_range(self):
+        day = self.day.isoformat()
+        self.assertEqual(self.names(date_from=day, date_to=day), ['Ann Lee', 'Bob Ray'])
+        self.assertEqual(self.client.get('/api/depot/rollcall/', {'date_from': day}).status_code, 400)
+
+    def test_each_stay_is_its_own_visit(self):
+        apply_transition(self.bob.pk, CHECK_OUT)
+        apply_transition(self.bob.pk, RE_CHECK_IN)
+        apply_transition(self.bob.pk, CHECK_OUT)
+        visits = DepotVisit.objects.filter(record_id=self.bob.pk).order_by('started_at')
+        self.assertEqual(visits.count(), 2)
+        self.assertTrue(all(visit.ended_at is not None for visit in visits))
+
+
+class DepotVisitTests(TestCase):
+    def setUp(self):
+        self.record = register_visitor('Acme', 'Ann Lee', 'safety')
+
+    def test_database_rejects_visit_ending_before_start(self):
+        visit = DepotVisit.objects.get(record_id=self.record.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DepotVisit.objects.filter(pk=visit.pk).update(ended_at=visit.started_at - timedelta(minutes=1))
+
+    def test_backdated_checkout_closes_visit_at_its_start(self):
+        visit = DepotVisit.objects.get(record_id=self.record.pk)
+        log_events([(self.record.pk, CheckInEvent.CHECK_OUT, visit.started_at - timedelta(minutes=5))])
+
+        visit.refresh_from_db()
+        self.assertEqual(visit.ended_at, visit.started_at)
+
+
+class DepotLookupTests(DepotCheckInTestMixin, TestCase):
+    def test_registrations_share_lookup_rows(self):
+        self.register('Ann Lee')
+        self.register('Bob Ray')
+        record = self.register('Ann Lee', reason='delivery')
+
+        self.assertEqual((record['company'], record['name'], record['reason']), ('Acme', 'Ann Lee', 'delivery'))
+        self.assertEqual(Company.objects.count(), 1)
+        self.assertEqual(Visitor.objects.count(), 2)
+        self.assertEqual(Reason.objects.count(), 2)
+
+    def test_single_and_bulk_resolution_agree(self):
+        company, visitor, reason = resolve_names('Acme', 'Ann Lee', 'safety')
+        triple = ('Acme', 'Ann Lee', 'safety')
+
+        self.assertEqual(resolve_names_bulk({triple}), {triple: (company.pk, visitor.pk, reason.pk)})
+        self.assertEqual(resolve_names_bulk({triple}), {triple: (company.pk, visitor.pk, reason.pk)})
+        self.assertEqual(Visitor.objects.count(), 1)
+
+    def test_batch_resolves_names_in_a_fixed_number_of_queries(self):
+        def batch_queries(names):
+            operations = [
+                (index, {'op': 'checkin', 'company': 'Acme', 'name': name, 'reason': 'safety'})
+                for index, name in enumerate(names)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                apply_batch(operations)
+            return len(queries)
+
+        self.register('Ann Lee')
+        self.assertEqual(batch_queries(['a', 'b']), batch_queries([f'c{n}' for n in range(10)]))
+
+
+class VisitorAutocompleteTests(TestCase):
+    def suggest(self, prefix, limit=10):
+        response = self.client.get('/api/depot/visitors/autocomplete/', {'q': prefix, 'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return [(result['name'], result['reason']) for result in response.json()['results']]
+
+    def test_most_recent_visitor_wins_regardless_of_alphabetical_position(self):
+        for name in ('Sam Abbot', 'Sam Baker', 'Sam Zane'):
+            register_visitor('Acme', name, 'safety')
+        zane = CheckInRecord.objects.get(visitor__name='Sam Zane')
+        apply_transition(zane.pk, CHECK_OUT)
+
+        self.assertEqual(self.suggest('sam', limit=1), [('Sam Zane', 'safety')])
+
+    def test_archived_registrations_still_match(self):
+        record = register_visitor('Acme', 'Ann Lee', 'safety')
+        apply_transition(record.pk, CHECK_OUT)
+        last_month = month_start((month_start(timezone.localdate()) - timedelta(days=1)).date())
+        CheckInRecord.objects.filter(pk=record.pk).update(created_at=last_month, updated_at=last_month)
+        archive_month(last_month)
+
+        self.assertEqual(self.suggest('ann'), [('Ann Lee', 'safety')])
+
+    def test_last_seen_is_tracked_per_visitor(self):
+        ann = register_visitor('Acme', 'Ann Lee', 'safety')
+        bob = register_visitor('Acme', 'Bob Ray', 'safety')
+        earlier = timezone.now() + timedelta(minutes=1)
+        later = earlier + timedelta(hours=1)
+        log_events([
+            (ann.pk, CheckInEvent.CHECK_OUT, earlier),
+            (bob.pk, CheckInEvent.CHECK_OUT, later),
+            (ann.pk, CheckInEvent.RE_CHECK_IN, earlier - timedelta(minutes=30)),
+        ])
+
+        self.assertEqual(Visitor.objects.get(pk=ann.visitor_id).last_seen, earlier)
+        self.assertEqual(Visitor.objects.get(pk=bob.visitor_id).last_seen, later)
+
+
+class DepotHistoryTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.safety = self.register('Ann Lee')['id']
+        self.client.post(f'/api/depot/checkin/{self.safety}/checkout/')
+        self.delivery = self.register('Ann Lee', reason='delivery')['id']
+        self.client.post(f'/api/depot/checkin/{self.safety}/checkin/')
+
+    def test_record_history_oldest_first(self):
+        body = self.client.get(f'/api/depot/checkin/{self.safety}/history/').json()
+
+        self.assertEqual(body['record']['reason'], 'safety')
+        self.assertEqual([event['event_type'] for event in body['events']], ['checkin', 'checkout', 'recheckin'])
+        self.assertEqual(self.client.get('/api/depot/checkin/999/history/').status_code, 404)
+
+    def test_visitor_timeline_spans_reasons(self):
+        visitor_id = CheckInRecord.objects.get(pk=self.safety).visitor_id
+        body = self.client.get(f'/api/depot/visitors/{visitor_id}/timeline/').json()
+
+        self.assertEqual(body['visitor']['name'], 'Ann Lee')
+        self.assertEqual(
+            [(event['reason'], event['event_type']) for event in body['events']],
+            [('safety', 'checkin'), ('safety', 'checkout'), ('delivery', 'checkin'), ('safety', 'recheckin')],
+        )
+
+    def test_timeline_range_and_bad_input(self):
+        visitor_id = CheckInRecord.objects.get(pk=self.safety).visitor_id
+        url = f'/api/depot/visitors/{visitor_id}/timeline/'
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+
+        self.assertEqual(self.client.get(url, {'date_to': yesterday}).json()['count'], 0)
+        self.assertEqual(self.client.get(url, {'date_from': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/depot/visitors/999/timeline/').status_code, 404)
+
+    def test_archived_record_keeps_its_history(self):
+        self.client.post(f'/api/depot/checkin/{self.safety}/checkout/')
+        last_month = month_start((month_start(timezone.localdate()) - timedelta(days=1)).date())
+        CheckInRecord.objects.filter(pk=self.safety).update(created_at=last_month, updated_at=last_month)
+        archive_month(last_month)
+
+        body = self.client.get(f'/api/depot/checkin/{self.safety}/history/').json()
+        self.assertTrue(body['record']['archived'])
+        self.assertEqual(body['count'], 4)
+
+
+class AutoCheckoutTests(DepotCheckInTestMixin, TestCase):
+    def setUp(self):
+        self.ids = [self.register(name)['id'] for name in ('Ann Lee', 'Bob Ray', 'Cy Dee')]
+        CheckInRecord.objects.update(check_in_time=timezone.now() - timedelta(hours=20))
+        self.fresh = self.register('Di Fox')['id']
+
+    def checked_in(self):
+        return set(CheckInRecord.objects.filter(status='checked-in').values_list('id', flat=True))
+
+    def test_check_out_stale_in_batches(self):
+        apply_transition(self.ids[0], CHECK_OUT)
+
+        self.assertEqual(check_out_stale(timezone.now() - timedelta(hours=12), batch_size=1), (2, 2))
+        self.assertEqual(self.checked_in(), {self.fresh})
+        self.assertEqual(sum(occupancy_rows().values()), 1)
+        self.assertEqual(DepotVisit.objects.filter(ended_at=None).count(), 1)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('auto_checkout', '--older-than', '12', stdout=out)
+        self.assertIn('Checked out 3 visitor(s)', out.getvalue())
+        self.assertEqual(self.checked_in(), {self.fresh})
+
+        with self.assertRaises(CommandError):
+            call_command('auto_checkout', '--before', 'soon', stdout=StringIO())
+
+    def test_admin_action_only_touches_stale_selection(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        response = self.client.post('/admin/staff/checkinrecord/', {
+            'action': 'check_out_stale_selected',
+            '_selected_action': [self.ids[0], self.fresh],
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.checked_in(), {self.ids[1], self.ids[2], self.fresh})
+
+
+class AttendanceTests(DepotCheckInTestMixin, TestCase):
+    def check_in(self, employee_id, name=None):
+        data = {'employee_id': employee_id, **({'name': name} if name else {})}
+        return self.client.post('/api/staff/checkin/', data)
+
+    def check_out(self, employee_id):
+        return self.client.post('/api/staff/checkout/', {'employee_id': employee_id})
+
+    def test_shift_check_in_and_out(self):
+        self.assertEqual(self.check_in('E1', 'Eve').status_code, 200)
+        self.assertEqual(self.check_in('E1').status_code, 400)
+        self.assertEqual(self.check_out('E1').status_code, 200)
+        self.assertEqual(self.check_out('E1').status_code, 400)
+        self.assertEqual(self.check_in('E1').status_code, 200)
+
+        statuses = [row['status'] for row in self.client.get('/api/staff/attendance/').json()]
+        self.assertEqual(statuses, ['checked-in', 'checked-out'])
+
+    def test_status_board_shows_each_employees_latest_shift(self):
+        self.check_in('E1', 'Eve')
+        self.check_out('E1')
+        self.check_in('E1', 'Eve')
+        self.check_in('E2', 'Max')
+
+        board = self.client.get('/api/staff/status/').json()
+        self.assertEqual([(row['employee_id'], row['status']) for row in board], [('E2', 'checked-in'), ('E1', 'checked-in')])
+
+    def test_database_allows_one_open_shift(self):
+        self.check_in('E1', 'Eve')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EmployeeAttendance.objects.create(employee_id='E1', name='Eve', status='checked-in')
+
+    def test_stale_shift_is_closed_at_the_end_of_its_day(self):
+        self.check_in('E1', 'Eve')
+        opened = timezone.now() - timedelta(days=2)
+        EmployeeAttendance.objects.update(created_at=opened, check_in_time=opened)
+
+        body = self.check_in('E1').json()
+        stale = EmployeeAttendance.objects.get(pk=body['closed_stale_shift']['id'])
+        self.assertEqual(stale.status, 'checked-out')
+        self.assertEqual(
+            stale.check_out_time,
+            timezone.make_aware(datetime.combine(timezone.localtime(opened).date() + timedelta(days=1), time.min)),
+        )
+        self.assertEqual(body['record']['status'], 'checked-in')
+
+    def test_checkin_records_still_lists_todays_visitors(self):
+        self.register('Ann Lee')
+        self.check_in('E1', 'Eve')
+
+        self.assertEqual([row['name'] for row in self.client.get('/api/staff/checkin-records/').json()], ['Ann Lee'])
@@ -3,10 +3,19 @@ from . import views
 
 urlpatterns = [
     path('checkin-records/', views.checkin_records, name='checkin_records'),
+    path('attendance/', views.attendance_records, name='attendance_records'),
     path('checkin/', views.check_in, name='check_in'),
     path('checkout/', views.check_out, name='check_out'),
     path('status/', views.staff_status, name='staff_status'),
     path('depot/checkin/', views.depot_checkin, name='depot_checkin'),
+    path('depot/checkin/batch/', views.depot_checkin_batch, name='depot_checkin_batch'),
     path('depot/checkin/<int:record_id>/checkout/', views.depot_checkout, name='depot_checkout'),
     path('depot/checkin/<int:record_id>/checkin/', views.depot_recheckin, name='depot_recheckin'),
+    path('depot/checkin/<int:record_id>/history/', views.depot_checkin_history, name='depot_checkin_history'),
+    path('depot/occupancy/', views.depot_occupancy, name='depot_occupancy'),
+    path('depot/analytics/', views.depot_analytics, name='depot_analytics'),
+    path('depot/rollcall/', views.depot_rollcall, name='depot_rollcall'),
+    path('depot/visitors/autocomplete/', views.depot_visitor_autocomplete, name='depot_visitor_autocomplete'),
+    path('depot/visitors/<int:visitor_id>/timeline/', views.depot_visitor_timeline, name='depot_visitor_timeline'),
+    path('depot/events/', views.depot_event_stream, name='depot_event_stream'),
 ]
\ No newline at end of file
@@ -1,20 +1,37 @@
+import asyncio
+import json
+from collections import Counter
+from datetime import datetime, time, timedelta
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q
-from .models import CheckInRecord
-from .serializers import CheckInRecordSerializer, CheckInSerializer, CheckOutSerializer, DepotCheckInSerializer
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from .analytics import range_stats
+from .filters import filter_checkin_records, parse_bound, parse_day
+from .models import ArchivedCheckInRecord, CheckInEvent, CheckInRecord, DepotOccupancy, DepotVisit, EmployeeAttendance, Visitor
+from .pagination import KeysetPagination
+from .serializers import CheckInEventSerializer, CheckInRecordSerializer, CheckInSerializer, EmployeeAttendanceSerializer, CheckOutSerializer, DepotBatchOperationSerializer, DepotCheckInSerializer
+from .services import CHECK_OUT, RE_CHECK_IN, AlreadyRegistered, InvalidTransition, apply_batch, apply_transition, register_visitor
 
 @api_view(['GET'])
 def checkin_records(request):
     """Get today's check-in records"""
-    today = timezone.now().date()
-    records = CheckInRecord.objects.filter(created_at__date=today)
+    records = CheckInRecord.objects.created_today().with_names()
     serializer = CheckInRecordSerializer(records, many=True)
     return Response(serializer.data)
 
+@api_view(['GET'])
+def attendance_records(request):
+    """Get today's employee attendance records"""
+    records = EmployeeAttendance.objects.created_today()
+    serializer = EmployeeAttendanceSerializer(records, many=True)
+    return Response(serializer.data)
+
 @api_view(['POST'])
 def check_in(request):
     """Check in an employee"""
@@ -22,33 +39,42 @@ def check_in(request):
     if serializer.is_valid():
         employee_id = serializer.validated_data['employee_id']
         name = serializer.validated_data.get('name', f'Employee {employee_id}')
-        
-        # Check if user is already checked in today
-        today = timezone.now().date()
-        existing_record = CheckInRecord.objects.filter(
-            employee_id=employee_id, 
-            status='checked-in',
-            created_at__date=today
-        ).first()
-        
-        if existing_record:
+
+        today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        try:
+            with transaction.atomic():
+                # A shift left open on an earlier day was never checked out;
+                # close it at the end of the day it was opened
+                stale = EmployeeAttendance.objects.select_for_update().filter(
+                    employee_id=employee_id,
+                    status='checked-in',
+                    created_at__lt=today,
+                ).first()
+                if stale is not None:
+                    opened = timezone.localtime(stale.created_at).date()
+                    stale.check_out_time = timezone.make_aware(datetime.combine(opened + timedelta(days=1), time.min))
+                    stale.status = 'checked-out'
+                    stale.save(update_fields=['check_out_time', 'status', 'updated_at'])
+                # The partial unique constraint rejects a second open shift
+                record = EmployeeAttendance.objects.create(
+                    employee_id=employee_id,
+                    name=name,
+                    check_in_time=timezone.now(),
+                    status='checked-in'
+                )
+        except IntegrityError:
             return Response({
                 'error': f'Employee {employee_id} is already checked in'
             }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Create new check-in record
-        record = CheckInRecord.objects.create(
-            employee_id=employee_id,
-            name=name,
-            check_in_time=timezone.now(),
-            status='checked-in'
-        )
-        
-        return Response({
+
+        response = {
             'message': f'Check-in successful for {name}',
-            'record': CheckInRecordSerializer(record).data
-        })
-    
+            'record': EmployeeAttendanceSerializer(record).data
+        }
+        if stale is not None:
+            response['closed_stale_shift'] = EmployeeAttendanceSerializer(stale).data
+        return Response(response)
+
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -57,61 +83,64 @@ def check_out(request):
     serializer = CheckOutSerializer(data=request.data)
     if serializer.is_valid():
         employee_id = serializer.validated_data['employee_id']
-        
-        # Find the checked-in record for today
-        today = timezone.now().date()
-        record = CheckInRecord.objects.filter(
-            employee_id=employee_id, 
-            status='checked-in',
-            created_at__date=today
-        ).first()
-        
-        if not record:
-            return Response({
-                'error': f'Employee {employee_id} is not currently checked in'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update record with check-out time
-        record.check_out_time = timezone.now()
-        record.status = 'checked-out'
-        record.save()
-        
+
+        with transaction.atomic():
+            # Find the checked-in record for today
+            record = EmployeeAttendance.objects.created_today().select_for_update().filter(
+                employee_id=employee_id,
+                status='checked-in'
+            ).first()
+
+            if not record:
+                return Response({
+                    'error': f'Employee {employee_id} is not currently checked in'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Update record with check-out time
+            record.check_out_time = timezone.now()
+            record.status = 'checked-out'
+            record.save(update_fields=['check_out_time', 'status', 'updated_at'])
+
         return Response({
             'message': f'Check-out successful for {record.name}',
-            'record': CheckInRecordSerializer(record).data
+            'record': EmployeeAttendanceSerializer(record).data
         })
-    
+
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 def staff_status(request):
-    """Get current staff status (who's checked in/out today)"""
-    today = timezone.now().date()
-    records = CheckInRecord.objects.filter(created_at__date=today).order_by('-created_at')
-
-    # Get latest record for each employee
-    employee_status = {}
-    for record in records:
-        if record.employee_id not in employee_status:
-            employee_status[record.employee_id] = record
-
-    serializer = CheckInRecordSerializer(list(employee_status.values()), many=True)
+    """Get current staff status (each employee's latest record today)"""
+    records = EmployeeAttendance.objects.created_today().latest_per_employee()
+    serializer = EmployeeAttendanceSerializer(records, many=True)
     return Response(serializer.data)
 
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
 def depot_checkin(request):
     """
-    GET: Get all check-in records (both checked-in and checked-out)
+    GET: Get check-in records (both checked-in and checked-out), newest first.
+         Keyset-paginated via ``cursor``/``limit``; filterable by ``status``,
+         ``company`` and a ``date_from``/``date_to`` created_at range.
     POST: Check in a visitor to the depot
     """
     if request.method == 'GET':
-        # Get all check-in records
-        all_records = CheckInRecord.objects.all().order_by('-created_at')
-        serializer = CheckInRecordSerializer(all_records, many=True)
+        paginator = KeysetPagination()
+        try:
+            records = filter_checkin_records(CheckInRecord.objects.with_names(), request.query_params)
+            page, next_cursor = paginator.paginate_queryset(records, request)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = CheckInRecordSerializer(page, many=True)
         return Response({
             'success': True,
-            'count': all_records.count(),
+            # Records on this page; the total is not counted
+            'page_size': len(page),
+            'next_cursor': next_cursor,
             'records': serializer.data
         })
 
@@ -122,28 +151,14 @@ def depot_checkin(request):
             name = serializer.validated_data['name']
             reason = serializer.validated_data['reason']
 
-            # Check if a record with the same name, company, and reason already exists (regardless of status)
-            existing_record = CheckInRecord.objects.filter(
-                company=company,
-                name=name,
-                reason=reason
-            ).first()
-
-            if existing_record:
+            try:
+                record = register_visitor(company, name, reason)
+            except AlreadyRegistered as e:
                 return Response({
                     'success': False,
-                    'error': 'You are aleady registered!'
+                    'error': str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create new check-in record
-            record = CheckInRecord.objects.create(
-                company=company,
-                name=name,
-                reason=reason,
-                check_in_time=timezone.now(),
-                status='checked-in'
-            )
-
             return Response({
                 'success': True,
                 'message': f'Check-in successful for {name}',
@@ -155,62 +170,479 @@ def depot_checkin(request):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def depot_checkout(request, record_id):
-    """Check out a visitor from the depot"""
+def _depot_transition(record_id, transition, message):
     try:
-        record = CheckInRecord.objects.get(id=record_id)
+        record = apply_transition(record_id, transition)
     except CheckInRecord.DoesNotExist:
         return Response({
             'success': False,
             'error': 'Check-in record not found'
         }, status=status.HTTP_404_NOT_FOUND)
-
-    # Check if already checked out
-    if record.status == 'checked-out':
+    except InvalidTransition as e:
         return Response({
             'success': False,
-            'error': 'This visitor is already checked out'
+            'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Update record with check-out time
-    record.check_out_time = timezone.now()
-    record.status = 'checked-out'
-    record.save()
-
+    # RETURNING gives back ids only; join the names in one more query
+    record = CheckInRecord.objects.with_names().get(pk=record.pk)
     return Response({
         'success': True,
-        'message': f'Check-out successful for {record.name}',
+        'message': f'{message} successful for {record.visitor.name}',
         'record': CheckInRecordSerializer(record).data
     })
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def depot_checkout(request, record_id):
+    """Check out a visitor from the depot"""
+    return _depot_transition(record_id, CHECK_OUT, 'Check-out')
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def depot_recheckin(request, record_id):
     """Re-check in a visitor who was previously checked out"""
+    return _depot_transition(record_id, RE_CHECK_IN, 'Re-check-in')
+
+# Upper bound on queued kiosk actions replayed in one request
+DEPOT_BATCH_MAX_OPERATIONS = 500
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def depot_checkin_batch(request):
+    """
+    Replay an ordered list of check-in, checkout and re-checkin operations.
+
+    Body: ``{"operations": [{"op": "checkin", "company", "name", "reason",
+    "ref"?}, {"op": "checkout" | "recheckin", "record_id" | "record_ref"}]}``,
+    each with an optional ``occurred_at``. All valid operations are applied
+    in one transaction; each item gets its own result and a bad item does not
+    abort the rest.
+    """
+    operations = request.data.get('operations') if isinstance(request.data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return Response({
+            'success': False,
+            'error': "'operations' must be a non-empty list"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > DEPOT_BATCH_MAX_OPERATIONS:
+        return Response({
+            'success': False,
+            'error': f'At most {DEPOT_BATCH_MAX_OPERATIONS} operations per batch'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    results = {}
+    valid = []
+    for index, item in enumerate(operations):
+        serializer = DepotBatchOperationSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'success': False, 'errors': serializer.errors}
+
+    outcomes = apply_batch(valid)
+    named = CheckInRecord.objects.with_names().in_bulk(
+        {record.pk for _, record, _ in outcomes if record is not None}
+    )
+    for index, record, error in outcomes:
+        if error:
+            results[index] = {'index': index, 'success': False, 'error': error}
+        else:
+            results[index] = {'index': index, 'success': True, 'record': CheckInRecordSerializer(named[record.pk]).data}
+
+    applied = sum(1 for result in results.values() if result['success'])
+    return Response({
+        'success': True,
+        'applied': applied,
+        'failed': len(operations) - applied,
+        'results': [results[index] for index in range(len(operations))]
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def depot_occupancy(request):
+    """Get how many visitors are on site now, per company and per reason"""
+    groups = [
+        {'company': company, 'reason': reason, 'count': count}
+        for company, reason, count in DepotOccupancy.objects.values_list('company__name', 'reason__label', 'count')
+    ]
+    by_company = Counter()
+    by_reason = Counter()
+    for group in groups:
+        by_company[group['company']] += group['count']
+        by_reason[group['reason']] += group['count']
+
+    return Response({
+        'success': True,
+        'total': sum(by_company.values()),
+        'by_company': dict(by_company),
+        'by_reason': dict(by_reason),
+        'groups': groups
+    })
+
+# Longest date range the analytics endpoint will compute in one request
+DEPOT_ANALYTICS_MAX_DAYS = 366
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def depot_analytics(request):
+    """
+    Get depot visit analytics for ``date_from``..``date_to`` (inclusive dates,
+    default the last 7 days): per-day hourly occupancy curves, dwell-time
+    distributions and per-company visit counts, plus range totals.
+    """
+    today = timezone.localdate()
     try:
-        record = CheckInRecord.objects.get(id=record_id)
-    except CheckInRecord.DoesNotExist:
+        last_day = parse_day(request.query_params.get('date_to'), today)
+        first_day = parse_day(request.query_params.get('date_from'), last_day - timedelta(days=6))
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if first_day > last_day:
+        return Response({
+            'success': False,
+            'error': 'date_from must not be after date_to'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if (last_day - first_day).days >= DEPOT_ANALYTICS_MAX_DAYS:
+        return Response({
+            'success': False,
+            'error': f'At most {DEPOT_ANALYTICS_MAX_DAYS} days per request'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': True,
+        'date_from': first_day,
+        'date_to': last_day,
+        **range_stats(first_day, last_day)
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def depot_rollcall(request):
+    """
+    Get everyone who was on site at ``at`` (ISO datetime, default now), or
+    every visit overlapping ``date_from``..``date_to`` when those are given.
+    """
+    params = request.query_params
+    try:
+        if params.get('date_from') or params.get('date_to'):
+            if not (params.get('date_from') and params.get('date_to')):
+                raise ValueError('Provide both date_from and date_to')
+            start = parse_bound(params['date_from'])
+            end = parse_bound(params['date_to'], end=True)
+            visits = DepotVisit.objects.overlapping(start, end)
+            window = {'date_from': start, 'date_to': end}
+        else:
+            moment = parse_bound(params['at']) if params.get('at') else timezone.now()
+            visits = DepotVisit.objects.covering(moment)
+            window = {'at': moment}
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    visits = list(
+        visits.select_related('record__company', 'record__visitor', 'record__reason').order_by('started_at')
+    )
+    # Records of closed months live in the archive table, names as plain text
+    archived = ArchivedCheckInRecord.objects.in_bulk(
+        [visit.record_id for visit in visits if visit.record is None]
+    )
+    roll = []
+    for visit in visits:
+        if visit.record is not None:
+            names = (visit.record.company.name, visit.record.visitor.name, visit.record.reason.label)
+        elif visit.record_id in archived:
+            record = archived[visit.record_id]
+            names = (record.company, record.name, record.reason)
+        else:
+            names = (None, None, None)
+        roll.append({
+            'record_id': visit.record_id,
+            'company': names[0],
+            'name': names[1],
+            'reason': names[2],
+            'started_at': visit.started_at,
+            'ended_at': visit.ended_at,
+        })
+
+    return Response({
+        'success': True,
+        **window,
+        'count': len(roll),
+        'visitors': roll
+    })
+
+# Autocomplete page size
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 25
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def depot_visitor_autocomplete(request):
+    """
+    Suggest previous visitors whose name starts with ``q`` (case- and
+    whitespace-insensitive), as company/name/reason triples, most recently
+    seen first, archived registrations included. ``limit`` caps the results
+    (default 10, max 25).
+    """
+    prefix = request.query_params.get('q', '').strip()
+    try:
+        limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': "'limit' must be an integer"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+    if not prefix:
+        return Response({'success': True, 'count': 0, 'results': []})
+
+    # Prefix matches from the name_key index, top-N sorted by last_seen
+    visitors = list(
+        Visitor.objects.name_prefix(prefix).select_related('company')
+        .order_by(F('last_seen').desc(nulls_last=True), '-id')[:limit]
+    )
+    registrations = {visitor.id: [] for visitor in visitors}
+    records = (
+        CheckInRecord.objects.filter(visitor__in=registrations)
+        .values_list('visitor_id', 'reason__label', 'updated_at')
+    )
+    for visitor_id, reason, seen in records:
+        registrations[visitor_id].append((seen, reason))
+    if visitors:
+        by_name = {(visitor.company.name, visitor.name): visitor.id for visitor in visitors}
+        match = Q()
+        for company, name in by_name:
+            match |= Q(company=company, name=name)
+        for company, name, reason, seen in ArchivedCheckInRecord.objects.filter(match).values_list(
+            'company', 'name', 'reason', 'updated_at'
+        ):
+            registrations[by_name[(company, name)]].append((seen, reason))
+
+    results = [{
+        'visitor_id': visitor.id,
+        'company': visitor.company.name,
+        'name': visitor.name,
+        'reason': reason,
+        'last_seen': seen,
+    } for visitor in visitors for seen, reason in sorted(registrations[visitor.id], reverse=True)][:limit]
+
+    return Response({
+        'success': True,
+        'count': len(results),
+        'results': results
+    })
+
+EVENT_TYPE_LABELS = dict(CheckInEvent.EVENT_TYPE_CHOICES)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def depot_checkin_history(request, record_id):
+    """Get every check-in, checkout and re-checkin of one record, oldest first"""
+    events = list(
+        CheckInEvent.objects.filter(record_id=record_id)
+        .order_by('occurred_at', 'id')
+        .values_list('id', 'event_type', 'occurred_at')
+    )
+    record = CheckInRecord.objects.with_names().filter(pk=record_id).first()
+    if record is not None:
+        record_data = CheckInRecordSerializer(record).data
+    else:
+        archived = ArchivedCheckInRecord.objects.filter(pk=record_id).first()
+        record_data = archived and {
+            'id': archived.id,
+            'company': archived.company,
+            'name': archived.name,
+            'reason': archived.reason,
+            'status': archived.status,
+            'archived': True,
+        }
+    if record_data is None and not events:
         return Response({
             'success': False,
             'error': 'Check-in record not found'
         }, status=status.HTTP_404_NOT_FOUND)
 
-    # Check if already checked in
-    if record.status == 'checked-in':
+    return Response({
+        'success': True,
+        'record': record_data,
+        'count': len(events),
+        'events': [
+            {'id': event_id, 'event_type': EVENT_TYPE_LABELS[event_type], 'occurred_at': occurred_at}
+            for event_id, event_type, occurred_at in events
+        ]
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def depot_visitor_timeline(request, visitor_id):
+    """
+    Get one visitor's events across all their registrations (one per reason),
+    oldest first, including archived months. Optionally limited to a
+    ``date_from``..``date_to`` range.
+    """
+    visitor = Visitor.objects.select_related('company').filter(pk=visitor_id).first()
+    if visitor is None:
         return Response({
             'success': False,
-            'error': 'This visitor is already checked in'
+            'error': 'Visitor not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    params = request.query_params
+    try:
+        start = parse_bound(params['date_from']) if params.get('date_from') else None
+        end = parse_bound(params['date_to'], end=True) if params.get('date_to') else None
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Update record to checked-in status
-    record.check_in_time = timezone.now()
-    record.status = 'checked-in'
-    record.save()
+    reasons = dict(CheckInRecord.objects.filter(visitor=visitor).values_list('id', 'reason__label'))
+    reasons.update(
+        ArchivedCheckInRecord.objects.filter(company=visitor.company.name, name=visitor.name).values_list('id', 'reason')
+    )
+    events = CheckInEvent.objects.filter(record_id__in=reasons)
+    if start is not None:
+        events = events.filter(occurred_at__gte=start)
+    if end is not None:
+        events = events.filter(occurred_at__lt=end)
+    events = events.order_by('occurred_at', 'id').values_list('id', 'record_id', 'event_type', 'occurred_at')
+
+    timeline = [{
+        'id': event_id,
+        'record_id': record_id,
+        'reason': reasons[record_id],
+        'event_type': EVENT_TYPE_LABELS[event_type],
+        'occurred_at': occurred_at,
+    } for event_id, record_id, event_type, occurred_at in events]
 
     return Response({
         'success': True,
-        'message': f'Re-check-in successful for {record.name}',
-        'record': CheckInRecordSerializer(record).data
+        'visitor': {'id': visitor.id, 'company': visitor.company.name, 'name': visitor.name},
+        'count': len(timeline),
+        'events': timeline
     })
+
+# Server-sent event stream settings
+EVENT_STREAM_POLL_SECONDS = 1
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+EVENT_STREAM_MAX_SECONDS = 300
+EVENT_STREAM_BATCH_SIZE = 100
+# Event ids are allocated at INSERT, not COMMIT: an id skipped over may still
+# commit later. Skipped ids are re-checked for this long (and at most this
+# many are tracked) before they are taken to be rolled back.
+EVENT_STREAM_GAP_SECONDS = 60
+EVENT_STREAM_MAX_GAPS = 100
+
+def _parse_stream_cursor(value):
+    """Split ``'<last id>[:<gap id>,...]'`` into the last id and the gap ids"""
+    last, _, gaps = value.partition(':')
+    return int(last), sorted(int(gap) for gap in gaps.split(',') if gap)
+
+def _format_stream_cursor(last_event_id, gaps):
+    if not gaps:
+        return str(last_event_id)
+    return f"{last_event_id}:{','.join(str(gap) for gap in sorted(gaps))}"
+
+async def _depot_events(last_event_id, gap_ids, max_seconds):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    last_sent = loop.time()
+    # Ids skipped over, with when they were first seen missing
+    gaps = dict.fromkeys(gap_ids, loop.time())
+    # Tell EventSource how soon to reconnect once we close the stream
+    yield f'retry: {EVENT_STREAM_POLL_SECONDS * 1000}\n\n'
+
+    while True:
+        pending = Q(id__gt=last_event_id)
+        if gaps:
+            pending |= Q(id__in=list(gaps))
+        events = [
+            event async for event in CheckInEvent.objects
+            .filter(pending)
+            .select_related('record__company', 'record__visitor', 'record__reason')
+            .order_by('id')[:EVENT_STREAM_BATCH_SIZE]
+        ]
+        now = loop.time()
+        for event in events:
+            if event.id in gaps:
+                # A slower transaction committed after later ids were sent
+                del gaps[event.id]
+            else:
+                for missing in range(max(last_event_id + 1, event.id - EVENT_STREAM_MAX_GAPS), event.id):
+                    gaps[missing] = now
+                last_event_id = event.id
+            # The id carries the open gaps, so a resumed stream re-checks them too
+            cursor = _format_stream_cursor(last_event_id, gaps)
+            data = json.dumps(CheckInEventSerializer(event).data)
+            yield f'id: {cursor}\nevent: {event.get_event_type_display()}\ndata: {data}\n\n'
+
+        for gap, seen in list(gaps.items()):
+            if now - seen >= EVENT_STREAM_GAP_SECONDS:
+                del gaps[gap]
+        for gap in sorted(gaps)[:-EVENT_STREAM_MAX_GAPS]:
+            del gaps[gap]
+
+        if events:
+            last_sent = now
+            if len(events) == EVENT_STREAM_BATCH_SIZE:
+                continue
+        if now >= deadline:
+            return
+        if now - last_sent >= EVENT_STREAM_HEARTBEAT_SECONDS:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        await asyncio.sleep(EVENT_STREAM_POLL_SECONDS)
+
+async def depot_event_stream(request):
+    """
+    Stream check-in, checkout and re-checkin events as server-sent events.
+
+    Resumes after the standard ``Last-Event-ID`` header (or ``last_event_id``
+    query parameter); without either, only events committed from now on are
+    sent. An event whose transaction commits after later events were sent
+    still goes out, late, so event ids may arrive out of order; the stream's
+    ``id:`` is a cursor (the last event id plus any ids still awaited), not
+    the event's own id. Connections are recycled every few minutes and
+    EventSource resumes transparently. Served as a long-lived stream under
+    ASGI only; under WSGI the backlog is returned at once and the client
+    reconnects to poll.
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if cursor is None:
+        last_event_id = await CheckInEvent.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+        # Lower ids may belong to transactions still in flight
+        recent = {
+            event_id async for event_id in CheckInEvent.objects
+            .filter(id__gt=last_event_id - EVENT_STREAM_MAX_GAPS)
+            .values_list('id', flat=True)
+        }
+        gap_ids = [
+            event_id for event_id in range(max(1, last_event_id - EVENT_STREAM_MAX_GAPS + 1), last_event_id)
+            if event_id not in recent
+        ]
+    else:
+        try:
+            last_event_id, gap_ids = _parse_stream_cursor(cursor)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': 'Last-Event-ID is not a valid event stream cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    max_seconds = EVENT_STREAM_MAX_SECONDS if isinstance(request, ASGIRequest) else 0
+    response = StreamingHttpResponse(
+        _depot_events(last_event_id, gap_ids[-EVENT_STREAM_MAX_GAPS:], max_seconds),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
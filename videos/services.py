@@ -1,4 +1,6 @@
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from django.conf import settings
@@ -19,6 +21,7 @@ class YouTubeService:
         self.api_key = settings.YOUTUBE_API_KEY
         self.channel_id = settings.YOUTUBE_CHANNEL_ID
         self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        self._local = threading.local()
 
     def get_channel_id(self) -> Optional[str]:
         """Get the channel ID - now directly from settings"""
@@ -51,36 +54,46 @@ class YouTubeService:
 
             uploads_playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
 
-            # Get videos from the uploads playlist
-            videos = []
+            # Page through the uploads playlist on this thread while the
+            # detail lookups for earlier pages run on the pool. Results are
+            # collected in page order, so the output order is deterministic.
+            pages = []
             next_page_token = None
-
-            while len(videos) < max_results:
-                request = self.youtube.playlistItems().list(
-                    part='snippet',
-                    playlistId=uploads_playlist_id,
-                    maxResults=min(50, max_results - len(videos)),
-                    pageToken=next_page_token
-                )
-                response = request.execute()
-
-                video_ids = [item['snippet']['resourceId']['videoId'] for item in response['items']]
-
-                # Get detailed video information
-                video_details_request = self.youtube.videos().list(
-                    part='snippet,contentDetails,statistics',
-                    id=','.join(video_ids)
-                )
-                video_details_response = video_details_request.execute()
-
-                for video in video_details_response['items']:
-                    video_data = self._parse_video_data(video)
-                    if video_data:
-                        videos.append(video_data)
-
-                next_page_token = response.get('nextPageToken')
-                if not next_page_token:
-                    break
+            exhausted = False
+            # One request slot stays with the playlist paging on this thread
+            pool = ThreadPoolExecutor(
+                max_workers=max(settings.YOUTUBE_MAX_CONCURRENT_REQUESTS - 1, 1), thread_name_prefix='youtube'
+            )
+            try:
+                while True:
+                    # Ids still being looked up count as videos; private or
+                    # deleted ones drop out, and the shortfall is paged for
+                    expected = sum(len(page.result()) if page.done() else len(ids) for page, ids in pages)
+                    if expected < max_results and not exhausted:
+                        request = self.youtube.playlistItems().list(
+                            part='snippet',
+                            playlistId=uploads_playlist_id,
+                            maxResults=min(50, max_results - expected),
+                            pageToken=next_page_token
+                        )
+                        response = request.execute()
+
+                        video_ids = [item['snippet']['resourceId']['videoId'] for item in response['items']]
+                        if video_ids:
+                            pages.append((pool.submit(self._get_video_details, video_ids), video_ids))
+
+                        next_page_token = response.get('nextPageToken')
+                        exhausted = not next_page_token
+                        continue
+
+                    outstanding = [page for page, _ in pages if not page.done()]
+                    if not outstanding:
+                        break
+                    wait(outstanding, return_when=FIRST_COMPLETED)
+
+                videos = [video for page, _ in pages for video in page.result()][:max_results]
+            finally:
+                pool.shutdown(cancel_futures=True)
 
             logger.info(f"Fetched {len(videos)} videos from YouTube")
             return videos
@@ -89,6 +102,29 @@ class YouTubeService:
             logger.error(f"Error fetching videos from YouTube: {e}")
             return []
 
+    def _client(self):
+        """A YouTube client for the current thread; the API client is not thread-safe"""
+        client = getattr(self._local, 'youtube', None)
+        if client is None:
+            client = self._local.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        return client
+
+    def _get_video_details(self, video_ids: List[str]) -> List[Dict]:
+        """Fetch and parse details for up to 50 videos, in the order of ``video_ids``"""
+        response = self._client().videos().list(
+            part='snippet,contentDetails,statistics',
+            id=','.join(video_ids)
+        ).execute()
+
+        # Private or deleted videos are missing from the response
+        found = {video['id']: video for video in response['items']}
+        videos = []
+        for video_id in video_ids:
+            video_data = self._parse_video_data(found[video_id]) if video_id in found else None
+            if video_data:
+                videos.append(video_data)
+        return videos
+
     def _parse_video_data(self, video: Dict) -> Optional[Dict]:
         """Parse video data from YouTube API response"""
         try:
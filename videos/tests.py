@@ -1,3 +1,83 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+from googleapiclient.errors import HttpError
+
+from .services import YouTubeService
+
+
+class FakeYouTube:
+    """Stands in for the googleapiclient resource; ``missing`` ids are private videos"""
+
+    def __init__(self, playlist, missing=(), fail_details=False):
+        self.playlist = playlist
+        self.missing = set(missing)
+        self.fail_details = fail_details
+        self.page_sizes = []
+
+    def _call(self, result):
+        return mock.Mock(execute=mock.Mock(side_effect=result))
+
+    def channels(self):
+        return mock.Mock(list=lambda **kwargs: self._call(
+            lambda: {'items': [{'contentDetails': {'relatedPlaylists': {'uploads': 'UU1'}}}]}
+        ))
+
+    def playlistItems(self):
+        def page(part, playlistId, maxResults, pageToken):
+            start = int(pageToken or 0)
+            self.page_sizes.append(maxResults)
+            ids = self.playlist[start:start + maxResults]
+            response = {'items': [{'snippet': {'resourceId': {'videoId': video_id}}} for video_id in ids]}
+            if start + maxResults < len(self.playlist):
+                response['nextPageToken'] = str(start + maxResults)
+            return response
+        return mock.Mock(list=lambda **kwargs: self._call(lambda: page(**kwargs)))
+
+    def videos(self):
+        def details(part, id):
+            if self.fail_details:
+                raise HttpError(mock.Mock(status=403, reason='quotaExceeded'), b'')
+            # The API returns found videos in no particular order
+            ids = [video_id for video_id in reversed(id.split(',')) if video_id not in self.missing]
+            return {'items': [self.video(video_id) for video_id in ids]}
+        return mock.Mock(list=lambda **kwargs: self._call(lambda: details(**kwargs)))
+
+    @staticmethod
+    def video(video_id):
+        return {
+            'id': video_id,
+            'snippet': {
+                'title': f'Video {video_id}', 'thumbnails': {}, 'publishedAt': '2026-10-01T08:00:00Z',
+                'channelTitle': 'Rhomberg Sersa',
+            },
+            'contentDetails': {'duration': 'PT1M'},
+            'statistics': {'viewCount': '3'},
+        }
+
+
+@override_settings(YOUTUBE_CHANNEL_ID='UC1', YOUTUBE_MAX_CONCURRENT_REQUESTS=3)
+class ChannelVideosTests(SimpleTestCase):
+    def fetch(self, fake, max_results):
+        with mock.patch('videos.services.build', return_value=fake):
+            return [video['video_id'] for video in YouTubeService().get_channel_videos(max_results)]
+
+    def test_pages_in_playlist_order(self):
+        playlist = [f'v{number}' for number in range(120)]
+        self.assertEqual(self.fetch(FakeYouTube(playlist), 120), playlist)
+
+    def test_pages_past_private_videos_until_enough_are_parsed(self):
+        playlist = [f'v{number}' for number in range(60)]
+        fake = FakeYouTube(playlist, missing={'v1', 'v3', 'v5'})
+
+        self.assertEqual(self.fetch(fake, 50), [video_id for video_id in playlist if video_id not in fake.missing][:50])
+        self.assertGreater(len(fake.page_sizes), 1)
+
+    def test_stops_when_the_playlist_is_exhausted(self):
+        fake = FakeYouTube(['v1', 'v2', 'v3'], missing={'v2'})
+        self.assertEqual(self.fetch(fake, 50), ['v1', 'v3'])
+        self.assertEqual(fake.page_sizes, [50])
+
+    def test_api_error_returns_nothing(self):
+        with self.assertLogs('videos.services', 'ERROR'):
+            self.assertEqual(self.fetch(FakeYouTube(['v1'], fail_details=True), 50), [])